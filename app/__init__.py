@@ -1,3 +1,96 @@
+from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from app.database import RoutingSession
 
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+def create_app(config=None):
+    """
+    Build and configure the Flask app.
+
+    Settings come from the environment, then from `config` (a dict) on top.
+    Nothing here touches the database or MongoDB: connections open on first
+    use and the schema is created with `flask schema create`.
+    """
+    from dotenv import load_dotenv
+    from flask_login import LoginManager
+    from app.config import config_from_env
+
+    load_dotenv()
+    app = Flask(__name__)
+    app.config.update(config_from_env())
+    app.config.update(config or {})
+
+    from app.database import configure_database, init_database
+    configure_database(app)
+    db.init_app(app)
+    init_database(app, db)
+
+    from app.db_mongo import init_mongo
+    from app.passwords import init_passwords
+    from app.fanout import init_fanout
+    from app.tags import init_tags
+    from app.votes import init_votes
+    from app.principals import principals, init_principals
+    from app.tokens import tokens, init_tokens
+    from app.ownership import init_ownership
+    from app.cache import init_cache
+    from app.metrics import init_metrics
+    init_mongo(app)
+    init_passwords(app)
+    init_fanout(app)
+    init_tags(app)
+    init_votes(app)
+
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+
+    @login_manager.user_loader
+    def load_user(user_id):
+        return principals.load(int(user_id))
+
+    @login_manager.request_loader
+    def load_user_from_request(request):
+        return tokens.from_request(request)
+
+    from app.pages import pages_bp
+    from app.auth.routes import auth_bp
+    from app.api.games import games_bp
+    from app.api.reviews import reviews_bp
+    from app.api.admin import admin_bp
+    from app.api.purchases import purchases_bp
+
+    app.register_blueprint(pages_bp)
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(games_bp)
+    app.register_blueprint(reviews_bp)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(purchases_bp)
+
+    init_metrics(app)
+    init_cache(app)
+    init_ownership(app)
+    init_principals(app)
+    init_tokens(app)
+
+    from app.schema import schema_cli
+    from app.ratings import ratings_cli
+    from app.analytics import analytics_cli
+    from app.search import search_cli
+    from app.ownership import ownership_cli
+    from app.idempotency import idempotency_cli
+    from app.tokens import tokens_cli
+    from app.votes import votes_cli
+    from app.db_mongo import mongo_cli
+    app.cli.add_command(schema_cli)
+    app.cli.add_command(ratings_cli)
+    app.cli.add_command(analytics_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(ownership_cli)
+    app.cli.add_command(idempotency_cli)
+    app.cli.add_command(tokens_cli)
+    app.cli.add_command(votes_cli)
+    app.cli.add_command(mongo_cli)
+
+    return app
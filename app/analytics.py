@@ -0,0 +1,25 @@
+import os
+import click
+from datetime import datetime, timedelta
+from flask.cli import with_appcontext
+
+DEFAULT_HOURLY_RETENTION = int(os.environ.get('ANALYTICS_HOURLY_RETENTION_HOURS', 72))
+
+
+@click.group('analytics')
+def analytics_cli():
+    """Maintain time-bucketed game analytics"""
+
+
+@analytics_cli.command('compact')
+@click.option('--retention-hours', default=DEFAULT_HOURLY_RETENTION, show_default=True,
+              help='Keep hourly buckets this recent; older hours survive only as daily totals')
+@with_appcontext
+def compact_command(retention_hours):
+    """Delete hourly buckets past the retention window"""
+    from app.api.games import game_analytics
+
+    game_analytics.buffer.flush()
+    before = datetime.utcnow() - timedelta(hours=retention_hours)
+    deleted = game_analytics.compact_hourly(before)
+    click.echo(f'Removed {deleted} hourly buckets older than {before.isoformat()}')
@@ -0,0 +1,165 @@
+import atexit
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+log = logging.getLogger('gaming.counter_buffer')
+
+
+class FlushBatch(dict):
+    """
+    {key: {field: n}} handed to a flush function, with an id.
+
+    A batch that failed is retried as is, with the same id, before anything
+    newer is flushed, so a store can make its writes idempotent by
+    recording which batch ids it has applied.
+    """
+
+    def __init__(self, counts):
+        super().__init__(counts)
+        self.id = uuid.uuid4().hex
+
+
+class CounterBuffer:
+    """
+    In-process aggregator for counter increments.
+
+    Increments are summed per (key, field) and handed to flush_fn as
+    {key: {field: n}} every interval_ms, or as soon as max_events have been
+    buffered. At most max_keys distinct keys are held; past that the caller
+    flushes inline so memory stays bounded; a failure there is logged, not
+    raised, since the caller is serving a request and the counts are kept
+    for the next attempt. A failed batch is kept whole and retried before
+    newer counts; while it keeps failing, increments for new keys past
+    max_keys are dropped and counted in `dropped`. Pending counts are
+    flushed at exit.
+    """
+
+    def __init__(self, flush_fn, interval_ms=1000, max_events=5000, max_keys=10000):
+        self.flush_fn = flush_fn
+        self.interval = interval_ms / 1000.0
+        self.max_events = max_events
+        self.max_keys = max_keys
+        self.dropped = 0
+        self._pending = defaultdict(lambda: defaultdict(int))
+        self._retry = None
+        self._events = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        atexit.register(self.close)
+
+    def add(self, key, field, amount=1):
+        """Buffer an increment. Never touches the backing store unless full."""
+        self._ensure_thread()
+        with self._lock:
+            if key not in self._pending and len(self._pending) >= self.max_keys:
+                # Only reachable while flushes are failing
+                self.dropped += amount
+                return
+            new_key = key not in self._pending
+            self._pending[key][field] += amount
+            self._events += 1
+            full = self._events >= self.max_events or (new_key and len(self._pending) >= self.max_keys)
+
+        if full:
+            try:
+                self.flush()
+            except Exception:
+                # flush() kept the batch; the background flusher retries it. Wait
+                # for another max_events before trying inline again, so an
+                # outage doesn't cost every caller a failed write.
+                with self._lock:
+                    self._events = 0
+                log.warning('Inline counter flush failed; %d keys kept for retry',
+                            len(self._pending), exc_info=True)
+
+    def pending(self, key):
+        """Counts for a key that have not been flushed yet (including a batch awaiting retry)"""
+        return self.snapshot().get(key, {})
+
+    def snapshot(self):
+        """Copy of every pending count as {key: {field: n}}"""
+        with self._lock:
+            counts = {key: dict(fields) for key, fields in self._pending.items()}
+            for key, fields in (self._retry or {}).items():
+                merged = counts.setdefault(key, {})
+                for field, amount in fields.items():
+                    merged[field] = merged.get(field, 0) + amount
+            return counts
+
+    def flush(self):
+        """Write out everything buffered so far. Returns the number of keys written."""
+        with self._flush_lock:
+            written = 0
+            if self._retry is not None:
+                # Raises again while the store is still failing, keeping it for next time
+                self.flush_fn(self._retry)
+                written = len(self._retry)
+                with self._lock:
+                    self._retry = None
+
+            with self._lock:
+                batch = FlushBatch(
+                    (key, dict(fields)) for key, fields in self._pending.items()
+                )
+                self._pending.clear()
+                self._events = 0
+
+            if not batch:
+                return written
+
+            try:
+                self.flush_fn(batch)
+            except Exception:
+                with self._lock:
+                    self._retry = batch
+                raise
+            return written + len(batch)
+
+    def discard(self):
+        """Drop everything buffered without writing it (the backing rows are gone)"""
+        with self._lock:
+            self._pending.clear()
+            self._retry = None
+            self._events = 0
+
+    def close(self):
+        """Stop the background flusher and write out what is left"""
+        thread = self._thread
+        self._thread = None
+        self._wakeup.set()
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout=self.interval + 1)
+        try:
+            self.flush()
+        except Exception:
+            pass
+
+    def _ensure_thread(self):
+        # Started lazily, and again after a fork (gunicorn workers don't inherit threads)
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._wakeup.clear()
+            self._thread = threading.Thread(target=self._run, name='analytics-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        me = threading.current_thread()
+        while self._thread is me:
+            self._wakeup.wait(self.interval)
+            if self._thread is not me:
+                break
+            try:
+                self.flush()
+            except Exception:
+                time.sleep(self.interval)
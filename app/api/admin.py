@@ -2,6 +2,11 @@ from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from app import db
 from app.models import User, Game
+from app.search import search_index
+from app.api.games import game_metadata
+from app.cache import catalog_cache
+from app.tokens import tokens
+from app.versions import bump, metadata_scope, reviews_scope, game_write_scopes
 from datetime import datetime
 from functools import wraps
 
@@ -75,6 +80,8 @@ def update_user_role(user_id):
             return jsonify({'error': f'Role must be one of: {valid_roles}'}), 400
         
         user.role = data['role']
+        # Outstanding tokens carry the old role; make their owner sign in again
+        tokens.revoke(user.id)
         db.session.commit()
         
         return jsonify({'message': f'User role changed to {data["role"]}', 'user': user.to_dict()}), 200
@@ -95,6 +102,8 @@ def suspend_user(user_id):
         
         user = User.query.get_or_404(user_id)
         user.is_active = False
+        # Suspension ends token sessions as well as cookie sessions
+        tokens.revoke(user.id)
         db.session.commit()
         
         return jsonify({'message': 'User suspended'}), 200
@@ -112,6 +121,9 @@ def unsuspend_user(user_id):
     try:
         user = User.query.get_or_404(user_id)
         user.is_active = True
+        # Suspension already revoked every token; bumping the epoch again
+        # makes workers holding the suspended principal reload it
+        tokens.revoke(user.id)
         db.session.commit()
         
         return jsonify({'message': 'User unsuspended'}), 200
@@ -150,7 +162,9 @@ def feature_game(game_id):
     try:
         game = Game.query.get_or_404(game_id)
         game.is_featured = True
+        bump(*game_write_scopes(game_id, game.genre))
         db.session.commit()
+        catalog_cache.invalidate_game(game_id, game.genre)
         
         return jsonify({'message': 'Game featured'}), 200
     
@@ -167,7 +181,9 @@ def unfeature_game(game_id):
     try:
         game = Game.query.get_or_404(game_id)
         game.is_featured = False
+        bump(*game_write_scopes(game_id, game.genre))
         db.session.commit()
+        catalog_cache.invalidate_game(game_id, game.genre)
         
         return jsonify({'message': 'Game unfeatured'}), 200
     
@@ -183,8 +199,14 @@ def remove_game(game_id):
     """Remove a game from platform"""
     try:
         game = Game.query.get_or_404(game_id)
+        genre = game.genre
         db.session.delete(game)
+        search_index.remove_game(game_id)
+        bump(*game_write_scopes(game_id, genre), metadata_scope(game_id), reviews_scope(game_id))
         db.session.commit()
+        catalog_cache.invalidate_game(game_id, genre)
+        # Left behind while Mongo is down; tag index rebuilds skip games missing from SQL
+        game_metadata.delete_metadata(game_id)
         
         return jsonify({'message': 'Game removed'}), 200
     
@@ -193,6 +215,14 @@ def remove_game(game_id):
         return jsonify({'error': str(e)}), 500
 
 
+@admin_bp.route('/cache', methods=['GET'])
+@login_required
+@admin_required
+def get_cache_stats():
+    """Get catalog cache hit/miss statistics"""
+    return jsonify(catalog_cache.stats()), 200
+
+
 @admin_bp.route('/stats', methods=['GET'])
 @login_required
 @admin_required
@@ -1,36 +1,129 @@
-from flask import Blueprint, request, jsonify
+import os
+from flask import Blueprint, request, jsonify, current_app
 from flask_login import login_required, current_user
 from app import db
 from app.models import User, Game, Order
-from app.models_mongo import GameMetadata, GameAnalytics
-from datetime import datetime
+from app.models_mongo import GameMetadata, GameAnalytics, METADATA_FIELDS, GRANULARITIES, HOURLY, DAILY
+from app.pagination import keyset_paginate, InvalidCursor
+from app.analytics_buffer import CounterBuffer
+from app.search import search_index
+from app.tags import tag_index, parse_tags
+from app.loaders import load_by_ids
+from app.cache import catalog_cache
+from app.database import read_only
+from app.fanout import fanout, mongo_deadline
+from app.ratings import get_rating_summary
+from app.versions import bump, conditional, game_scope, metadata_scope, reviews_scope, listing_scope, game_write_scopes
+from datetime import datetime, timedelta, timezone
 
 games_bp = Blueprint('games', __name__, url_prefix='/api/games')
 
 game_metadata = GameMetadata()
 game_analytics = GameAnalytics()
+game_analytics.buffer = CounterBuffer(
+    game_analytics.write_increments,
+    interval_ms=int(os.environ.get('ANALYTICS_FLUSH_INTERVAL_MS', 1000)),
+    max_events=int(os.environ.get('ANALYTICS_FLUSH_MAX_EVENTS', 5000)),
+    max_keys=int(os.environ.get('ANALYTICS_BUFFER_MAX_KEYS', 10000))
+)
+
+# Largest ids= list /api/games/metadata accepts
+MAX_BULK_METADATA = 100
 
 # EXISTING GAME ROUTES (SQL)
 
 @games_bp.route('', methods=['GET'])
+@read_only
+@conditional(lambda: [listing_scope(request.args.get('genre'))])
 def get_games():
-    """Get all games with pagination"""
+    """
+    Get all games with pagination
+    
+    Passing `cursor` or `limit` switches to keyset pagination ordered by id:
+    /api/games?limit=20 for the first page, then ?cursor=<next_cursor>.
+    The total is only counted when `include_total=true`.
+    """
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
         genre = request.args.get('genre')
+        params = {
+            name: request.args.get(name)
+            for name in ('page', 'per_page', 'cursor', 'limit', 'include_total')
+            if name in request.args
+        }
         
-        query = Game.query
+        result = catalog_cache.listing(genre, params, lambda: list_games(genre))
+        return jsonify(result), 200
+    
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def list_games(genre):
+    """Build the /api/games payload for the current request args"""
+    query = Game.query
+    
+    if genre:
+        query = query.filter_by(genre=genre)
+    
+    if 'cursor' in request.args or 'limit' in request.args:
+        limit = request.args.get('limit', 10, type=int)
+        items, next_cursor = keyset_paginate(
+            query, Game.id,
+            cursor=request.args.get('cursor'),
+            limit=limit
+        )
         
-        if genre:
-            query = query.filter_by(genre=genre)
+        result = {
+            'games': [g.to_dict() for g in items],
+            'next_cursor': next_cursor
+        }
+        if request.args.get('include_total', '').lower() in ('1', 'true', 'yes'):
+            result['total'] = query.order_by(None).count()
         
-        pagination = query.paginate(page=page, per_page=per_page)
+        return result
+    
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 10, type=int)
+    pagination = query.paginate(page=page, per_page=per_page)
+    
+    return {
+        'games': [g.to_dict() for g in pagination.items],
+        'total': pagination.total,
+        'pages': pagination.pages,
+        'current_page': page
+    }
+
+
+@games_bp.route('/search', methods=['GET'])
+@read_only
+def search_games():
+    """
+    Full-text search over title, description and tags, best match first
+    
+    /api/games/search?q=space shooter&genre=Action&min_price=0&max_price=20&page=1&per_page=20
+    """
+    try:
+        q = request.args.get('q', '').strip()
+        if not q:
+            return jsonify({'error': 'Query parameter q is required'}), 400
+        
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+        
+        games, total = search_index.search(
+            q,
+            genre=request.args.get('genre'),
+            min_price=request.args.get('min_price', type=float),
+            max_price=request.args.get('max_price', type=float),
+            limit=per_page,
+            offset=(page - 1) * per_page
+        )
         
         return jsonify({
-            'games': [g.to_dict() for g in pagination.items],
-            'total': pagination.total,
-            'pages': pagination.pages,
+            'games': [g.to_dict() for g in games],
+            'total': total,
             'current_page': page
         }), 200
     
@@ -38,16 +131,104 @@ def get_games():
         return jsonify({'error': str(e)}), 500
 
 
+@games_bp.route('/tags', methods=['GET'])
+def browse_tags():
+    """
+    Browse games by metadata tags
+    
+    all, any and not take comma-separated tags, e.g.
+    /api/games/tags?all=rpg,coop&not=early-access. Results are ordered by
+    game id; `facets` counts each tag across the whole result, not just the page.
+    """
+    try:
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+        
+        tag_index.refresh(game_metadata, live_ids=lambda: {game_id for (game_id,) in db.session.query(Game.id)})
+        result = tag_index.browse(
+            all_of=parse_tags(request.args.get('all')),
+            any_of=parse_tags(request.args.get('any')),
+            none_of=parse_tags(request.args.get('not')),
+            page=page,
+            per_page=per_page,
+            facet_limit=request.args.get('facets', 20, type=int)
+        )
+        
+        games = load_by_ids(Game, result['ids'])
+        return jsonify({
+            'games': [games[i].to_dict() for i in result['ids'] if i in games],
+            'total': result['total'],
+            'pages': (result['total'] + per_page - 1) // per_page,
+            'current_page': page,
+            'facets': result['facets']
+        }), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @games_bp.route('/<int:game_id>', methods=['GET'])
+@conditional(lambda game_id: [game_scope(game_id)])
 def get_game(game_id):
     """Get single game"""
     try:
-        game = Game.query.get_or_404(game_id)
-        return jsonify(game.to_dict()), 200
+        result = catalog_cache.game(game_id, lambda: Game.query.get_or_404(game_id).to_dict())
+        return jsonify(result), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 404
 
 
+@games_bp.route('/<int:game_id>/full', methods=['GET'])
+def get_game_full(game_id):
+    """
+    Get a game with its metadata, analytics and rating summary in one call
+    
+    The four lookups run concurrently, each with its own timeout. Sources
+    that time out or fail are null in the payload and listed in `errors`.
+    """
+    try:
+        sql_timeout = current_app.config.get('GAME_DETAIL_SQL_TIMEOUT_MS', 1000) / 1000.0
+        mongo_timeout = current_app.config.get('GAME_DETAIL_MONGO_TIMEOUT_MS', 500) / 1000.0
+        
+        results, errors = fanout.gather(current_app._get_current_object(), {
+            'game': (lambda: catalog_cache.game(game_id, lambda: load_game_dict(game_id)), sql_timeout),
+            'metadata': (mongo_deadline(lambda: load_metadata_dict(game_id), mongo_timeout), mongo_timeout),
+            'analytics': (mongo_deadline(lambda: load_analytics_dict(game_id), mongo_timeout), mongo_timeout),
+            'rating': (lambda: get_rating_summary(game_id).to_dict(), sql_timeout)
+        })
+        
+        if 'game' not in errors and results.get('game') is None:
+            return jsonify({'error': 'Game not found'}), 404
+        
+        return jsonify({
+            'game': results.get('game'),
+            'metadata': results.get('metadata'),
+            'analytics': results.get('analytics'),
+            'rating': results.get('rating'),
+            'errors': errors
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def load_game_dict(game_id):
+    game = db.session.get(Game, game_id)
+    return game.to_dict() if game else None
+
+
+def load_metadata_dict(game_id):
+    metadata = game_metadata.get_metadata(game_id)
+    if metadata:
+        metadata.pop('_id', None)
+    return metadata
+
+
+def load_analytics_dict(game_id):
+    stats = game_analytics.get_stats(game_id) or {'views': 0, 'downloads': 0}
+    stats.pop('_id', None)
+    return stats
+
+
 @games_bp.route('', methods=['POST'])
 @login_required
 def create_game():
@@ -70,7 +251,11 @@ def create_game():
         )
         
         db.session.add(game)
+        db.session.flush()
+        search_index.index_game(game)
+        bump(*game_write_scopes(game.id, game.genre))
         db.session.commit()
+        catalog_cache.invalidate_game(game.id, game.genre)
         
         return jsonify(game.to_dict()), 201
     
@@ -90,6 +275,7 @@ def update_game(game_id):
             return jsonify({'error': 'You can only edit your own games'}), 403
         
         data = request.get_json()
+        old_genre = game.genre
         
         if 'title' in data:
             game.title = data['title']
@@ -100,7 +286,10 @@ def update_game(game_id):
         if 'price' in data:
             game.price = data['price']
         
+        search_index.index_game(game)
+        bump(*game_write_scopes(game_id, old_genre, game.genre))
         db.session.commit()
+        catalog_cache.invalidate_game(game_id, old_genre, game.genre)
         
         return jsonify(game.to_dict()), 200
     
@@ -119,8 +308,14 @@ def delete_game(game_id):
         if game.developer_id != current_user.id:
             return jsonify({'error': 'You can only delete your own games'}), 403
         
+        genre = game.genre
         db.session.delete(game)
+        search_index.remove_game(game_id)
+        bump(*game_write_scopes(game_id, genre), metadata_scope(game_id), reviews_scope(game_id))
         db.session.commit()
+        catalog_cache.invalidate_game(game_id, genre)
+        # Left behind while Mongo is down; tag index rebuilds skip games missing from SQL
+        game_metadata.delete_metadata(game_id)
         
         return jsonify({'message': 'Game deleted'}), 200
     
@@ -150,6 +345,13 @@ def add_game_metadata(game_id):
             'system_requirements': data.get('system_requirements', {}),
             'developer_notes': data.get('developer_notes', '')
         })
+        if result is None:
+            # Nothing was written, so the search index and caches stay as they are
+            return jsonify({'error': 'Metadata is temporarily unavailable'}), 503
+        
+        search_index.set_tags(game_id, data.get('tags', []))
+        bump(metadata_scope(game_id))
+        db.session.commit()
         
         return jsonify({
             'message': 'Metadata saved to MongoDB',
@@ -159,7 +361,42 @@ def add_game_metadata(game_id):
         return jsonify({'error': str(e)}), 500
 
 
+@games_bp.route('/metadata', methods=['GET'])
+def get_games_metadata():
+    """
+    Get metadata for many games with one MongoDB query
+    
+    /api/games/metadata?ids=1,2,3&fields=tags,system_requirements returns
+    {"metadata": {"1": {...}, "2": null, ...}}; null means no metadata.
+    Up to MAX_BULK_METADATA ids; fields defaults to all of METADATA_FIELDS.
+    """
+    try:
+        ids = list(dict.fromkeys(int(i) for i in request.args.get('ids', '').split(',') if i.strip()))
+    except ValueError:
+        return jsonify({'error': 'ids must be comma-separated integers'}), 400
+    
+    if not ids:
+        return jsonify({'error': 'ids is required'}), 400
+    if len(ids) > MAX_BULK_METADATA:
+        return jsonify({'error': f'at most {MAX_BULK_METADATA} ids per request'}), 400
+    
+    fields = [f for f in request.args.get('fields', '').split(',') if f.strip()] or list(METADATA_FIELDS)
+    unknown = set(fields) - set(METADATA_FIELDS)
+    if unknown:
+        return jsonify({'error': f'fields must be among: {list(METADATA_FIELDS)}'}), 400
+    
+    try:
+        found = catalog_cache.metadata_many(ids, fields, lambda missing: game_metadata.get_many(missing, fields))
+        if found is None:
+            return jsonify({'error': 'Metadata is temporarily unavailable'}), 503
+        
+        return jsonify({'metadata': {str(i): found.get(i) for i in ids}}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @games_bp.route('/<int:game_id>/metadata', methods=['GET'])
+@conditional(lambda game_id: [metadata_scope(game_id)])
 def get_game_metadata(game_id):
     """Get game metadata from MongoDB"""
     try:
@@ -176,8 +413,17 @@ def get_game_metadata(game_id):
 
 @games_bp.route('/<int:game_id>/analytics', methods=['GET'])
 def get_game_analytics(game_id):
-    """Get game analytics from MongoDB"""
+    """
+    Get game analytics from MongoDB
+    
+    With from/to/granularity query args, returns pre-aggregated hour or day
+    buckets for that range instead of lifetime totals, e.g.
+    /api/games/1/analytics?from=2026-01-01&to=2026-01-08&granularity=day
+    """
     try:
+        if any(arg in request.args for arg in ('from', 'to', 'granularity')):
+            return get_game_analytics_range(game_id)
+        
         stats = game_analytics.get_stats(game_id)
         
         if stats:
@@ -189,6 +435,46 @@ def get_game_analytics(game_id):
         return jsonify({'error': str(e)}), 500
 
 
+def get_game_analytics_range(game_id):
+    granularity = request.args.get('granularity', DAILY)
+    if granularity not in GRANULARITIES:
+        return jsonify({'error': f'granularity must be one of: {list(GRANULARITIES)}'}), 400
+    
+    try:
+        end = parse_utc(request.args.get('to')) or datetime.utcnow()
+        default_span = timedelta(hours=24) if granularity == HOURLY else timedelta(days=30)
+        start = parse_utc(request.args.get('from')) or end - default_span
+    except ValueError:
+        return jsonify({'error': 'from/to must be ISO 8601 dates'}), 400
+    
+    if start >= end:
+        return jsonify({'error': 'from must be before to'}), 400
+    
+    buckets = game_analytics.get_range(game_id, start, end, granularity)
+    
+    return jsonify({
+        'game_id': game_id,
+        'granularity': granularity,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'buckets': buckets,
+        'totals': {
+            'views': sum(b['views'] for b in buckets),
+            'downloads': sum(b['downloads'] for b in buckets)
+        }
+    }), 200
+
+
+def parse_utc(value):
+    """Parse an ISO 8601 string into a naive UTC datetime (None passes through)"""
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
 @games_bp.route('/<int:game_id>/view', methods=['POST'])
 def record_game_view(game_id):
     """Record a game view (analytics)"""
@@ -1,12 +1,17 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from app.models import db, Order, Game
+from app.loaders import serialize_orders, load_by_ids
+from app.ownership import ownership
+from app.idempotency import idempotent
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime
 
 purchases_bp = Blueprint('purchases', __name__, url_prefix='/api/purchases')
 
 @purchases_bp.route('/checkout', methods=['POST'])
 @login_required
+@idempotent
 def checkout():
     """
     Buy a game
@@ -15,6 +20,8 @@ def checkout():
     {
         "game_id": 1
     }
+    
+    Send an Idempotency-Key header to make retries safe.
     """
     try:
         data = request.get_json()
@@ -22,13 +29,7 @@ def checkout():
         
         game = Game.query.get_or_404(game_id)
         
-        existing = Order.query.filter_by(
-            user_id=current_user.id,
-            game_id=game_id,
-            status='completed'
-        ).first()
-        
-        if existing:
+        if ownership.owns(current_user.id, game_id):
             return jsonify({'error': 'You already own this game'}), 400
         
         order = Order(
@@ -39,7 +40,15 @@ def checkout():
         )
         
         db.session.add(order)
-        db.session.commit()
+        try:
+            db.session.flush()
+            ownership.grant(current_user.id, game_id, order.id)
+            db.session.commit()
+        except IntegrityError:
+            # A unique index caught a concurrent or stale-cache purchase of the same game
+            db.session.rollback()
+            ownership.invalidate(current_user.id)
+            return jsonify({'error': 'You already own this game'}), 400
         
         return jsonify({
             'message': 'Game purchased!',
@@ -52,18 +61,142 @@ def checkout():
         return jsonify({'error': str(e)}), 500
 
 
+# Largest cart accepted by /cart/checkout
+MAX_CART_SIZE = 100
+
+
+class CartConflict(Exception):
+    """Another request bought one of the cart's games while we were checking out"""
+
+
+def purchase_cart(user_id, game_ids):
+    """
+    Buy several games in one transaction with set-based queries.
+    
+    Returns per-item results in request order and the created orders as dicts.
+    Raises CartConflict (after rolling back) if a unique index rejects a
+    game that our ownership check thought was unowned.
+    """
+    games = load_by_ids(Game, game_ids)
+    owned = ownership.owned_ids(user_id)
+    
+    results = []
+    to_buy = []
+    seen = set()
+    for game_id in game_ids:
+        if game_id in seen:
+            results.append({'game_id': game_id, 'status': 'duplicate'})
+        elif game_id not in games:
+            results.append({'game_id': game_id, 'status': 'not_found'})
+        elif game_id in owned:
+            results.append({'game_id': game_id, 'status': 'already_owned'})
+        else:
+            results.append({'game_id': game_id, 'status': 'purchased'})
+            to_buy.append(game_id)
+        seen.add(game_id)
+    
+    if not to_buy:
+        return results, []
+    
+    now = datetime.utcnow()
+    try:
+        db.session.execute(Order.__table__.insert(), [
+            {
+                'user_id': user_id,
+                'game_id': game_id,
+                'amount_paid': games[game_id].price,
+                'status': 'completed',
+                'created_at': now
+            }
+            for game_id in to_buy
+        ])
+        
+        orders = Order.query.filter(
+            Order.user_id == user_id,
+            Order.game_id.in_(to_buy),
+            Order.status == 'completed'
+        ).all()
+        created = {order.game_id: order for order in orders}
+        
+        ownership.grant_many(user_id, {game_id: created[game_id].id for game_id in to_buy})
+        
+        # Serialize before commit expires every loaded object
+        for result in results:
+            if result['status'] == 'purchased':
+                result['order'] = created[result['game_id']].to_dict()
+                result['game'] = games[result['game_id']].to_dict()
+        bought = [result['order'] for result in results if result['status'] == 'purchased']
+        
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        ownership.invalidate(user_id)
+        raise CartConflict()
+    
+    return results, bought
+
+
+@purchases_bp.route('/cart/checkout', methods=['POST'])
+@login_required
+@idempotent
+def cart_checkout():
+    """
+    Buy several games at once
+    
+    Expected data:
+    {
+        "game_ids": [1, 2, 3]
+    }
+    
+    Each item reports purchased, already_owned, not_found or duplicate.
+    Send an Idempotency-Key header to make retries safe.
+    """
+    try:
+        data = request.get_json() or {}
+        game_ids = data.get('game_ids')
+        
+        if not isinstance(game_ids, list) or not game_ids:
+            return jsonify({'error': 'game_ids must be a non-empty list'}), 400
+        if len(game_ids) > MAX_CART_SIZE:
+            return jsonify({'error': f'A cart holds at most {MAX_CART_SIZE} games'}), 400
+        try:
+            game_ids = [int(game_id) for game_id in game_ids]
+        except (TypeError, ValueError):
+            return jsonify({'error': 'game_ids must be integers'}), 400
+        
+        try:
+            results, orders = purchase_cart(current_user.id, game_ids)
+        except CartConflict:
+            # Our cached ownership was stale; retry once against fresh data
+            ownership.owned_ids(current_user.id, refresh=True)
+            results, orders = purchase_cart(current_user.id, game_ids)
+        
+        return jsonify({
+            'message': f'{len(orders)} games purchased' if orders else 'Nothing purchased',
+            'items': results,
+            'total_paid': round(sum(order['amount_paid'] or 0 for order in orders), 2)
+        }), 201 if orders else 400
+    
+    except CartConflict:
+        return jsonify({'error': 'Your library changed during checkout, please retry'}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
 @purchases_bp.route('/<int:order_id>', methods=['GET'])
 @login_required
 def get_order(order_id):
     """Get order details"""
     try:
-        order = Order.query.get_or_404(order_id)
+        row = db.session.query(Order, Game).outerjoin(
+            Game, Game.id == Order.game_id
+        ).filter(Order.id == order_id).first_or_404()
+        order, game = row
         
         if order.user_id != current_user.id:
             return jsonify({'error': 'Unauthorized'}), 403
         
-        game = Game.query.get(order.game_id)
-        
         result = order.to_dict()
         result['game'] = game.to_dict() if game else None
         
@@ -83,12 +216,7 @@ def purchase_history():
             status='completed'
         ).all()
         
-        result = []
-        for order in orders:
-            game = Game.query.get(order.game_id)
-            order_dict = order.to_dict()
-            order_dict['game'] = game.to_dict() if game else None
-            result.append(order_dict)
+        result = serialize_orders(orders)
         
         return jsonify({
             'purchases': result,
@@ -104,16 +232,7 @@ def purchase_history():
 def get_library():
     """Get all games owned by user"""
     try:
-        orders = Order.query.filter_by(
-            user_id=current_user.id,
-            status='completed'
-        ).all()
-        
-        games = []
-        for order in orders:
-            game = Game.query.get(order.game_id)
-            if game:
-                games.append(game.to_dict())
+        games = [game.to_dict() for game in ownership.library(current_user.id)]
         
         return jsonify({
             'games': games,
@@ -1,12 +1,38 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from app import db
-from app.models import User, Game, Order, Review
+from app.models import Game, Review, ReviewVote
+from app.ratings import apply_rating_change, get_rating_summary
+from app.loaders import serialize_reviews
+from app.cache import catalog_cache
+from app.database import read_only
+from app.ownership import ownership
+from app.votes import helpful_votes, AlreadyVoted
+from app.versions import bump, conditional, reviews_scope, game_write_scopes
 from datetime import datetime
 
 reviews_bp = Blueprint('reviews', __name__, url_prefix='/api/reviews')
 
+def bump_review_stamps(game_id, rating_changed=True):
+    """
+    Bump the version stamps a review write makes stale (before commit).
+    
+    Game.rating is part of the game and listing payloads, so those move too
+    when a rating changed. Returns the game's genre for cache invalidation.
+    """
+    scopes = [reviews_scope(game_id)]
+    genre = None
+    if rating_changed:
+        game = db.session.get(Game, game_id)
+        genre = game.genre if game else None
+        scopes.extend(game_write_scopes(game_id, genre))
+    bump(*scopes)
+    return genre
+
+
 @reviews_bp.route('/game/<int:game_id>', methods=['GET'])
+@read_only
+@conditional(lambda game_id: [reviews_scope(game_id)])
 def get_game_reviews(game_id):
     """Get all reviews for a game"""
     try:
@@ -23,16 +49,17 @@ def get_game_reviews(game_id):
         else:
             query = query.order_by(Review.created_at.desc())
         
-        pagination = query.paginate(page=page, per_page=per_page)
-        
-        all_reviews = Review.query.filter_by(game_id=game_id).all()
-        avg_rating = sum(r.rating for r in all_reviews) / len(all_reviews) if all_reviews else 0
+        # The stored summary already knows the review count, so skip paginate's COUNT(*)
+        summary = get_rating_summary(game_id)
+        pagination = query.paginate(page=page, per_page=per_page, count=False)
+        pagination.total = summary.review_count
         
         return jsonify({
-            'reviews': [r.to_dict() for r in pagination.items],
+            'reviews': serialize_reviews(pagination.items),
             'total': pagination.total,
             'pages': pagination.pages,
-            'average_rating': round(avg_rating, 1)
+            'average_rating': round(summary.average_rating, 1),
+            'rating_histogram': summary.histogram()
         }), 200
     
     except Exception as e:
@@ -44,8 +71,7 @@ def get_game_reviews(game_id):
 def create_review(game_id):
     """Create a review for a game"""
     try:
-        order = Order.query.filter_by(user_id=current_user.id, game_id=game_id, status='completed').first()
-        if not order:
+        if not ownership.owns(current_user.id, game_id, verify=True):
             return jsonify({'error': 'You must own this game to review it'}), 403
         
         existing = Review.query.filter_by(game_id=game_id, user_id=current_user.id).first()
@@ -70,7 +96,10 @@ def create_review(game_id):
         )
         
         db.session.add(review)
+        apply_rating_change(game_id, new_rating=rating)
+        genre = bump_review_stamps(game_id)
         db.session.commit()
+        catalog_cache.invalidate_game(game_id, genre)
         
         return jsonify(review.to_dict()), 201
     
@@ -90,6 +119,7 @@ def update_review(review_id):
             return jsonify({'error': 'You can only edit your own reviews'}), 403
         
         data = request.get_json()
+        old_rating = review.rating
         
         if 'rating' in data:
             rating = int(data['rating'])
@@ -104,7 +134,12 @@ def update_review(review_id):
             review.content = data['content']
         
         review.updated_at = datetime.utcnow()
+        apply_rating_change(review.game_id, old_rating=old_rating, new_rating=review.rating)
+        rating_changed = review.rating != old_rating
+        genre = bump_review_stamps(review.game_id, rating_changed)
         db.session.commit()
+        if rating_changed:
+            catalog_cache.invalidate_game(review.game_id, genre)
         
         return jsonify(review.to_dict()), 200
     
@@ -123,8 +158,13 @@ def delete_review(review_id):
         if review.user_id != current_user.id:
             return jsonify({'error': 'You can only delete your own reviews'}), 403
         
+        # SQLite does not enforce the ON DELETE CASCADE
+        ReviewVote.query.filter_by(review_id=review.id).delete(synchronize_session=False)
         db.session.delete(review)
+        apply_rating_change(review.game_id, old_rating=review.rating)
+        genre = bump_review_stamps(review.game_id)
         db.session.commit()
+        catalog_cache.invalidate_game(review.game_id, genre)
         
         return jsonify({'message': 'Review deleted'}), 200
     
@@ -136,13 +176,25 @@ def delete_review(review_id):
 @reviews_bp.route('/<int:review_id>/helpful', methods=['POST'])
 @login_required
 def mark_helpful(review_id):
-    """Mark review as helpful"""
+    """
+    Mark review as helpful
+    
+    Each user counts once (409 on a repeat). The returned count includes
+    votes that are still buffered; review listings catch up when the buffer
+    flushes, within HELPFUL_VOTE_FLUSH_INTERVAL_MS.
+    """
     try:
         review = Review.query.get_or_404(review_id)
-        review.helpful_count += 1
-        db.session.commit()
         
-        return jsonify({'helpful_count': review.helpful_count}), 200
+        try:
+            count = helpful_votes.vote(review, current_user.id)
+        except AlreadyVoted:
+            return jsonify({
+                'error': 'You already marked this review helpful',
+                'helpful_count': helpful_votes.count(review)
+            }), 409
+        
+        return jsonify({'helpful_count': count}), 200
     
     except Exception as e:
         db.session.rollback()
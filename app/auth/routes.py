@@ -2,9 +2,19 @@ from flask import Blueprint, request, jsonify
 from flask_login import login_user, logout_user, login_required, current_user
 from app import db
 from app.models import User
+from app.passwords import passwords, HasherBusy
+from app.principals import principals
+from app.tokens import tokens
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
+
+def hasher_busy():
+    response = jsonify({'error': 'Too many sign-ins right now, please retry'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     """Register a new user"""
@@ -32,7 +42,7 @@ def register():
             username=username,
             display_name=username
         )
-        user.set_password(password)
+        user.password_hash = passwords.hash(password)
         
         db.session.add(user)
         db.session.commit()
@@ -42,33 +52,52 @@ def register():
             'user': user.to_dict()
         }), 201
     
+    except HasherBusy:
+        return hasher_busy()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
+def authenticate(data):
+    """
+    Check login credentials.
+    
+    Returns (user, None) on success or (None, error response).
+    """
+    email_or_username = data.get('email_or_username', '').strip()
+    password = data.get('password', '')
+    
+    if not email_or_username or not password:
+        return None, (jsonify({'error': 'Email/username and password required'}), 400)
+    
+    user = User.query.filter(
+        (User.email == email_or_username.lower()) | 
+        (User.username == email_or_username)
+    ).first()
+    
+    if not user:
+        return None, (jsonify({'error': 'User not found'}), 401)
+    
+    ok, new_hash = passwords.verify(user.password_hash, password)
+    if not ok:
+        return None, (jsonify({'error': 'Wrong password'}), 401)
+    
+    if new_hash:
+        # Hash parameters changed since this password was stored
+        user.password_hash = new_hash
+        db.session.commit()
+    
+    return user, None
+
+
 @auth_bp.route('/login', methods=['POST'])
 def login():
     """Login a user"""
     try:
-        data = request.get_json()
-        
-        email_or_username = data.get('email_or_username', '').strip()
-        password = data.get('password', '')
-        
-        if not email_or_username or not password:
-            return jsonify({'error': 'Email/username and password required'}), 400
-        
-        user = User.query.filter(
-            (User.email == email_or_username.lower()) | 
-            (User.username == email_or_username)
-        ).first()
-        
-        if not user:
-            return jsonify({'error': 'User not found'}), 401
-        
-        if not user.check_password(password):
-            return jsonify({'error': 'Wrong password'}), 401
+        user, error = authenticate(request.get_json())
+        if error:
+            return error
         
         login_user(user)
         
@@ -77,7 +106,82 @@ def login():
             'user': user.to_dict()
         }), 200
     
+    except HasherBusy:
+        return hasher_busy()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@auth_bp.route('/token', methods=['POST'])
+def issue_token():
+    """
+    Get bearer tokens instead of a session cookie
+    
+    Expected data:
+    {
+        "email_or_username": "player1",
+        "password": "..."
+    }
+    
+    Send the access token as "Authorization: Bearer <token>".
+    """
+    try:
+        user, error = authenticate(request.get_json())
+        if error:
+            return error
+        
+        principal = principals.load(user.id)
+        if principal is None:
+            return jsonify({'error': 'Account suspended'}), 403
+        
+        pair = tokens.issue(principal)
+        db.session.commit()
+        return jsonify(pair), 200
+    
+    except HasherBusy:
+        return hasher_busy()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@auth_bp.route('/token/refresh', methods=['POST'])
+def refresh_token():
+    """
+    Trade a refresh token for a new token pair
+    
+    Expected data:
+    {
+        "refresh_token": "..."
+    }
+    
+    Each refresh token works once; keep the one returned.
+    """
+    try:
+        data = request.get_json() or {}
+        pair = tokens.refresh(data.get('refresh_token', ''))
+        if pair is None:
+            return jsonify({'error': 'Invalid or expired refresh token'}), 401
+        
+        return jsonify(pair), 200
+    
     except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+@auth_bp.route('/token/revoke', methods=['POST'])
+@login_required
+def revoke_tokens():
+    """Invalidate every token issued to the current user"""
+    try:
+        tokens.revoke(current_user.id)
+        db.session.commit()
+        return jsonify({'message': 'Tokens revoked'}), 200
+    
+    except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
@@ -0,0 +1,252 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event
+from app.database import primary
+from app.models import Game
+
+
+class MemoryBackend:
+    """Bounded, thread-safe LRU with per-entry TTL (process local)"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._data = OrderedDict()
+        # Counters live outside the LRU so they can never be evicted and reset
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_many(self, keys):
+        """Values for keys, in order, None where missing"""
+        return [self.get(key) for key in keys]
+
+    def set_many(self, values, ttl=None):
+        """Store {key: value}"""
+        for key, value in values.items():
+            self.set(key, value, ttl)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def counter(self, key):
+        return self._counters.get(key, 0)
+
+    def counter_many(self, keys):
+        return [self._counters.get(key, 0) for key in keys]
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._counters.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisBackend:
+    """Shared backend so every worker sees the same entries and invalidations"""
+
+    def __init__(self, url, prefix='gaming:cache:'):
+        import redis  # optional dependency, only needed when CATALOG_CACHE_URL is set
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.evictions = 0
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, json.dumps(value), ex=int(ttl) if ttl else None)
+
+    def get_many(self, keys):
+        """Values for keys, in order, None where missing; one MGET"""
+        if not keys:
+            return []
+        return [json.loads(raw) if raw is not None else None
+                for raw in self.client.mget([self.prefix + key for key in keys])]
+
+    def set_many(self, values, ttl=None):
+        """Store {key: value} in one pipelined round trip"""
+        if not values:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in values.items():
+            pipe.set(self.prefix + key, json.dumps(value), ex=int(ttl) if ttl else None)
+        pipe.execute()
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def counter(self, key):
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def counter_many(self, keys):
+        if not keys:
+            return []
+        return [int(raw or 0) for raw in self.client.mget([self.prefix + key for key in keys])]
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def __len__(self):
+        return sum(1 for _ in self.client.scan_iter(self.prefix + '*'))
+
+
+class CatalogCache:
+    """
+    Read-through cache for game detail and listing responses.
+
+    Keys embed generation numbers read before the loader runs: one per game
+    for detail entries, one per genre (plus one for the unfiltered listing)
+    for listing entries. A write bumps only the generations it can affect, so
+    unrelated genres stay cached, and a read that raced with a write can only
+    store its result under a key nobody will ask for again. Loaders run
+    against the primary, since a lagging replica's answer would be stored
+    under the new generation and served for the whole ttl.
+    """
+
+    def __init__(self, backend=None, ttl=60):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, backend=None, ttl=None):
+        if backend is not None:
+            self.backend = backend
+        if ttl is not None:
+            self.ttl = ttl
+
+    def _generation(self, genre):
+        return self.backend.counter(f'gen:{genre or "*"}')
+
+    def get_or_set(self, key, loader):
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        with primary():
+            value = loader()
+        self.backend.set(key, value, self.ttl)
+        return value
+
+    def game(self, game_id, loader):
+        """Cached detail payload for one game"""
+        version = self.backend.counter(f'gen:game:{game_id}')
+        return self.get_or_set(f'game:{game_id}:{version}', loader)
+
+    def listing(self, genre, params, loader):
+        """Cached listing payload for a genre (None = all games) and its query params"""
+        key = 'list:{}:{}:{}'.format(
+            genre or '*', self._generation(genre), json.dumps(params, sort_keys=True)
+        )
+        return self.get_or_set(key, loader)
+
+    def metadata_many(self, game_ids, fields, loader):
+        """
+        Cached MongoDB metadata for many games, limited to `fields`.
+
+        Entries are per game and field set. loader(missing_ids) is called
+        once for everything not cached and returns {game_id: doc}; games it
+        leaves out have no metadata and map to None. A loader returning None
+        (Mongo down) is passed through and nothing is cached. Generations,
+        entries and the entries written back each take one backend call.
+        """
+        fields_key = ','.join(sorted(fields))
+        versions = self.backend.counter_many([f'gen:meta:{game_id}' for game_id in game_ids])
+        all_keys = [f'meta:{game_id}:{version}:{fields_key}' for game_id, version in zip(game_ids, versions)]
+
+        result, keys = {}, {}
+        for game_id, key, value in zip(game_ids, all_keys, self.backend.get_many(all_keys)):
+            if value is None:
+                keys[game_id] = key
+            else:
+                self.hits += 1
+                # {} marks a game known to have no metadata
+                result[game_id] = value or None
+
+        if keys:
+            self.misses += len(keys)
+            loaded = loader(list(keys))
+            if loaded is None:
+                return None
+            self.backend.set_many({key: loaded.get(game_id) or {} for game_id, key in keys.items()}, self.ttl)
+            for game_id in keys:
+                result[game_id] = loaded.get(game_id)
+        return result
+
+    def invalidate_metadata(self, game_id):
+        """Drop every cached field set of a game's metadata"""
+        self.backend.incr(f'gen:meta:{game_id}')
+
+    def invalidate_game(self, game_id, *genres):
+        """Drop a game's detail entry and every listing it could appear on"""
+        version = self.backend.counter(f'gen:game:{game_id}')
+        self.backend.delete(f'game:{game_id}:{version}')
+        self.backend.incr(f'gen:game:{game_id}')
+        self.backend.incr('gen:*')
+        for genre in {g for g in genres if g}:
+            self.backend.incr(f'gen:{genre}')
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0,
+            'entries': len(self.backend),
+            'evictions': self.backend.evictions,
+            'ttl': self.ttl
+        }
+
+
+catalog_cache = CatalogCache()
+
+# Dropping the games table (tests, reseeding) makes every cached entry meaningless
+event.listen(Game.__table__, 'after_drop', lambda *args, **kwargs: catalog_cache.clear())
+
+
+def init_cache(app):
+    """Configure the catalog cache from app config"""
+    url = app.config.get('CATALOG_CACHE_URL')
+    backend = RedisBackend(url) if url else MemoryBackend(app.config.get('CATALOG_CACHE_SIZE', 10000))
+    catalog_cache.configure(backend=backend, ttl=app.config.get('CATALOG_CACHE_TTL', 60))
@@ -0,0 +1,71 @@
+import os
+
+
+def config_from_env():
+    """Settings read from the environment (and .env) when an app is created"""
+    env = os.environ
+    return {
+        'SECRET_KEY': env.get('SECRET_KEY', 'dev-key'),
+        'SQLALCHEMY_DATABASE_URI': env.get('SQLALCHEMY_DATABASE_URI', 'sqlite:////tmp/gaming.db'),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        # Optional read replica; views marked read_only send their SELECTs there
+        'SQLALCHEMY_REPLICA_URI': env.get('SQLALCHEMY_REPLICA_URI'),
+        # Connection pool (SQLite files are pooled too, so PRAGMAs and page cache persist)
+        'DB_POOL_SIZE': int(env.get('DB_POOL_SIZE', 5)),
+        'DB_MAX_OVERFLOW': int(env.get('DB_MAX_OVERFLOW', 10)),
+        'DB_POOL_RECYCLE': int(env.get('DB_POOL_RECYCLE', 1800)),
+        'DB_POOL_PRE_PING': env.get('DB_POOL_PRE_PING', '1') not in ('0', 'false', 'False'),
+        # Applied to every SQLite connection; WAL lets readers run alongside a writer
+        'SQLITE_JOURNAL_MODE': env.get('SQLITE_JOURNAL_MODE', 'wal'),
+        'SQLITE_SYNCHRONOUS': env.get('SQLITE_SYNCHRONOUS', 'normal'),
+        'SQLITE_MMAP_SIZE': int(env.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'SQLITE_CACHE_SIZE': int(env.get('SQLITE_CACHE_SIZE', -64000)),
+        'SQLITE_BUSY_TIMEOUT_MS': int(env.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        # Requests slower than this are logged with their SQL; empty or 0 disables it
+        'SLOW_REQUEST_MS': int(env.get('SLOW_REQUEST_MS', 500) or 0) or None,
+        # Catalog read cache; set CATALOG_CACHE_URL (redis://...) to share it between workers
+        'CATALOG_CACHE_SIZE': int(env.get('CATALOG_CACHE_SIZE', 10000)),
+        'CATALOG_CACHE_TTL': int(env.get('CATALOG_CACHE_TTL', 60)),
+        'CATALOG_CACHE_URL': env.get('CATALOG_CACHE_URL'),
+        # Per-user owned-game sets cached in each worker
+        'OWNERSHIP_CACHE_SIZE': int(env.get('OWNERSHIP_CACHE_SIZE', 50000)),
+        'OWNERSHIP_CACHE_TTL': int(env.get('OWNERSHIP_CACHE_TTL', 30)),
+        # Logged-in user snapshots. Per worker by default: each worker looks for role, suspension and
+        # token changes made elsewhere once per PRINCIPAL_CACHE_CHECK_MS. Set PRINCIPAL_CACHE_URL
+        # (redis://...) to share them instead, which makes changes apply everywhere at once;
+        # PRINCIPAL_CACHE_CHECK_MS=0 turns the check off.
+        'PRINCIPAL_CACHE_SIZE': int(env.get('PRINCIPAL_CACHE_SIZE', 50000)),
+        'PRINCIPAL_CACHE_TTL': int(env.get('PRINCIPAL_CACHE_TTL', 30)),
+        'PRINCIPAL_CACHE_URL': env.get('PRINCIPAL_CACHE_URL'),
+        'PRINCIPAL_CACHE_CHECK_MS': int(env.get('PRINCIPAL_CACHE_CHECK_MS', 1000)),
+        # Bearer tokens from /auth/token, signed with SECRET_KEY
+        'ACCESS_TOKEN_TTL': int(env.get('ACCESS_TOKEN_TTL', 900)),
+        'REFRESH_TOKEN_TTL': int(env.get('REFRESH_TOKEN_TTL', 30 * 86400)),
+        # Helpful votes are summed in memory and written as one UPDATE per review per flush
+        'HELPFUL_VOTE_FLUSH_INTERVAL_MS': int(env.get('HELPFUL_VOTE_FLUSH_INTERVAL_MS', 1000)),
+        'HELPFUL_VOTE_FLUSH_MAX_EVENTS': int(env.get('HELPFUL_VOTE_FLUSH_MAX_EVENTS', 1000)),
+        'HELPFUL_VOTE_BUFFER_MAX_KEYS': int(env.get('HELPFUL_VOTE_BUFFER_MAX_KEYS', 10000)),
+        # How long a checkout's Idempotency-Key replays its original response
+        'IDEMPOTENCY_KEY_TTL': int(env.get('IDEMPOTENCY_KEY_TTL', 86400)),
+        # A request still unfinished after this long (its worker died) no longer holds its key
+        'IDEMPOTENCY_CLAIM_LEASE': int(env.get('IDEMPOTENCY_CLAIM_LEASE', 45)),
+        # Password hashing runs on this many processes per worker; 0 hashes inline.
+        # Changing the method rehashes each password at its owner's next login.
+        'PASSWORD_HASH_METHOD': env.get('PASSWORD_HASH_METHOD', 'scrypt'),
+        'PASSWORD_HASH_WORKERS': int(env.get('PASSWORD_HASH_WORKERS', 2)),
+        'PASSWORD_HASH_QUEUE': int(env.get('PASSWORD_HASH_QUEUE', 16)),
+        'PASSWORD_HASH_TIMEOUT': float(env.get('PASSWORD_HASH_TIMEOUT', 10)),
+        # Seconds before each worker reloads its tag index from MongoDB (its own saves apply at once)
+        'TAG_INDEX_TTL': int(env.get('TAG_INDEX_TTL', 300)),
+        # /api/games/<id>/full runs its SQL and Mongo lookups concurrently on this many threads
+        'FANOUT_WORKERS': int(env.get('FANOUT_WORKERS', 8)),
+        'GAME_DETAIL_SQL_TIMEOUT_MS': int(env.get('GAME_DETAIL_SQL_TIMEOUT_MS', 1000)),
+        'GAME_DETAIL_MONGO_TIMEOUT_MS': int(env.get('GAME_DETAIL_MONGO_TIMEOUT_MS', 500)),
+        # MongoDB is connected lazily; while health pings fail, metadata and analytics fall back to local mode
+        'MONGO_URI': env.get('MONGO_URI', 'mongodb://localhost:27017/'),
+        'MONGO_MAX_POOL_SIZE': int(env.get('MONGO_MAX_POOL_SIZE', 50)),
+        'MONGO_MIN_POOL_SIZE': int(env.get('MONGO_MIN_POOL_SIZE', 0)),
+        'MONGO_TIMEOUT_MS': int(env.get('MONGO_TIMEOUT_MS', 2000)),
+        'MONGO_HEALTH_INTERVAL': float(env.get('MONGO_HEALTH_INTERVAL', 5)),
+        'MONGO_BREAKER_THRESHOLD': int(env.get('MONGO_BREAKER_THRESHOLD', 2)),
+    }
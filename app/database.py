@@ -0,0 +1,140 @@
+from contextlib import contextmanager
+from functools import partial, wraps
+import sqlalchemy as sa
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+
+# app.extensions key of the optional read replica engine (SQLALCHEMY_REPLICA_URI)
+REPLICA = 'db_replica'
+
+
+class RoutingSession(Session):
+    """
+    Session that sends SELECTs issued inside read_only views to the replica.
+
+    Everything else (flushes, Core inserts/updates, reads in other views)
+    goes to the primary. Without a replica bind this is a plain Session.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and getattr(clause, 'is_select', False)
+            and has_app_context()
+            and g.get('db_read_only', False)
+        ):
+            engine = current_app.extensions.get(REPLICA)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(view):
+    """
+    Let a view's queries be served by the read replica.
+
+    Only for views that never write; results may lag the primary by the
+    replica's replication delay. CatalogCache fills its entries from the
+    primary regardless.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        previous = g.get('db_read_only', False)
+        g.db_read_only = True
+        try:
+            return view(*args, **kwargs)
+        finally:
+            g.db_read_only = previous
+    return wrapper
+
+
+@contextmanager
+def primary():
+    """
+    Send reads in the block to the primary even inside a read_only view.
+
+    For results that outlive the request, such as cache fills: a replica
+    read just after a write could be stored and served long after the
+    replica has caught up.
+    """
+    if not has_app_context():
+        yield
+        return
+    previous = g.get('db_read_only', False)
+    g.db_read_only = False
+    try:
+        yield
+    finally:
+        g.db_read_only = previous
+
+
+def _is_sqlite_file(url):
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def engine_options(uri, config):
+    """Engine options for a database URI, from the DB_* pool settings"""
+    url = sa.engine.make_url(uri)
+    options = {
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', True),
+    }
+    if url.get_backend_name() != 'sqlite' or _is_sqlite_file(url):
+        options['pool_size'] = config.get('DB_POOL_SIZE', 5)
+        options['max_overflow'] = config.get('DB_MAX_OVERFLOW', 10)
+    if _is_sqlite_file(url):
+        # SQLAlchemy 1.4 opens a new SQLite connection per checkout, which throws away
+        # the page cache and mmap every request; pool them like any other database.
+        # The pool hands each connection to one thread at a time.
+        options['poolclass'] = sa.pool.QueuePool
+        options['connect_args'] = {'check_same_thread': False}
+    return options
+
+
+def sqlite_pragmas(config):
+    """PRAGMAs run on every new SQLite connection"""
+    return [
+        ('journal_mode', config.get('SQLITE_JOURNAL_MODE', 'wal')),
+        ('synchronous', config.get('SQLITE_SYNCHRONOUS', 'normal')),
+        ('mmap_size', int(config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))),
+        ('cache_size', int(config.get('SQLITE_CACHE_SIZE', -64000))),
+        ('busy_timeout', int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))),
+    ]
+
+
+def _apply_pragmas(pragmas, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas:
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def configure_database(app):
+    """Fill in engine options before db.init_app"""
+    config = app.config
+    config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(config['SQLALCHEMY_DATABASE_URI'], config))
+
+
+def init_database(app, db):
+    """
+    Create the replica engine, if configured, and install SQLite PRAGMAs.
+
+    The replica is not a Flask-SQLAlchemy bind: binds get their own
+    metadata and create_all would try to build tables there. Nothing
+    connects until the first query.
+    """
+    replica = app.config.get('SQLALCHEMY_REPLICA_URI')
+    if replica:
+        app.extensions[REPLICA] = sa.create_engine(replica, **engine_options(replica, app.config))
+
+    pragmas = sqlite_pragmas(app.config)
+    with app.app_context():
+        engines = list(db.engines.values())
+    if replica:
+        engines.append(app.extensions[REPLICA])
+    for engine in engines:
+        if engine.dialect.name == 'sqlite':
+            sa.event.listen(engine, 'connect', partial(_apply_pragmas, pragmas))
@@ -1,20 +1,214 @@
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
 import os
+import threading
+import click
+from flask.cli import with_appcontext
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+from app.metrics import mongo_listener
 
 MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/')
 MONGO_DB_NAME = 'gaming_platform'
 
-try:
-    mongo_client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-    mongo_client.admin.command('ping')
-    mongo_db = mongo_client[MONGO_DB_NAME]
-    print("✅ MongoDB connected!")
-except ConnectionFailure:
-    print("❌ MongoDB not connected - using local mode only")
-    mongo_db = None
-    mongo_client = None
+UNKNOWN = 'unknown'
+HEALTHY = 'healthy'
+UNHEALTHY = 'unhealthy'
+
+
+class MongoUnavailable(Exception):
+    """A write that cannot be dropped found MongoDB unavailable; the caller keeps it for later"""
+
+
+class MongoConnection:
+    """
+    Lazily created MongoDB client guarded by a circuit breaker.
+
+    Nothing connects at import time. The client is built on first use (or
+    by start()), and a background thread pings the server every
+    health_interval seconds. After failure_threshold failed pings in a row
+    the breaker opens: get_db() returns None at once, so callers take their
+    "Mongo unavailable" path instead of waiting for server selection to time
+    out. The first successful ping closes it again.
+
+    Until the first ping has finished, get_db() waits for it for at most
+    the server selection timeout.
+    """
+
+    def __init__(self, uri=MONGO_URI, db_name=MONGO_DB_NAME, max_pool_size=50, min_pool_size=0,
+                 timeout_ms=2000, health_interval=5, failure_threshold=2):
+        self.uri = uri
+        self.db_name = db_name
+        self.max_pool_size = max_pool_size
+        self.min_pool_size = min_pool_size
+        self.timeout_ms = timeout_ms
+        self.health_interval = health_interval
+        self.failure_threshold = failure_threshold
+        self.state = UNKNOWN
+        self.failures = 0
+        self.last_error = None
+        self._client = None
+        self._thread = None
+        self._pid = None
+        self._probed = threading.Event()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+
+    def configure(self, **settings):
+        """Change settings; takes effect on the next client created"""
+        self.close()
+        for name, value in settings.items():
+            if value is not None:
+                setattr(self, name, value)
+
+    @property
+    def available(self):
+        return self.state == HEALTHY
+
+    def start(self):
+        """Create the client and start health checks without blocking"""
+        self._ensure_client()
+
+    def get_db(self):
+        """The database, or None while the breaker is open"""
+        self._ensure_client()
+        if self.state == UNKNOWN:
+            self._probed.wait(self.timeout_ms / 1000.0 + 1)
+        if self.state != HEALTHY:
+            return None
+        return self._client[self.db_name]
+
+    def check(self):
+        """Ping the server once and update the breaker. Returns True when healthy."""
+        client = self._client
+        if client is None:
+            return False
+        try:
+            client.admin.command('ping')
+        except PyMongoError as e:
+            self._record(client, False, e)
+            return False
+        self._record(client, True)
+        return True
+
+    def _record(self, client, ok, error=None):
+        with self._lock:
+            if client is not self._client:
+                # A ping from before configure()/close(); it says nothing about the current client
+                return
+            previous = self.state
+            if ok:
+                self.failures = 0
+                self.last_error = None
+                self.state = HEALTHY
+            else:
+                self.failures += 1
+                self.last_error = str(error)
+                if previous != HEALTHY or self.failures >= self.failure_threshold:
+                    self.state = UNHEALTHY
+        self._probed.set()
+
+        if self.state != previous:
+            if self.state == HEALTHY:
+                print("✅ MongoDB connected!")
+            else:
+                print("❌ MongoDB not connected - using local mode only")
+
+    def _ensure_client(self):
+        # Built lazily, and again after a fork (MongoClient and threads don't survive one)
+        if self._client is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.state = UNKNOWN
+            self.failures = 0
+            self._probed.clear()
+            self._wakeup = threading.Event()
+            self._client = MongoClient(
+                self.uri,
+                maxPoolSize=self.max_pool_size,
+                minPoolSize=self.min_pool_size,
+                serverSelectionTimeoutMS=self.timeout_ms,
+                connectTimeoutMS=self.timeout_ms,
+                event_listeners=[mongo_listener]
+            )
+            self._thread = threading.Thread(target=self._run, args=(self._wakeup,), name='mongo-health', daemon=True)
+            self._thread.start()
+
+    def _run(self, wakeup):
+        me = threading.current_thread()
+        while self._thread is me:
+            self.check()
+            wakeup.wait(self.health_interval)
+
+    def close(self):
+        with self._lock:
+            client = self._client
+            self._client = None
+            self._thread = None
+            self.state = UNKNOWN
+            self._wakeup.set()
+        if client is not None and self._pid == os.getpid():
+            client.close()
+
+    def status(self):
+        return {
+            'state': self.state,
+            'consecutive_failures': self.failures,
+            'last_error': self.last_error
+        }
+
+
+mongo = MongoConnection()
+
 
 def get_mongo_db():
-    """Get MongoDB database instance"""
-    return mongo_db
\ No newline at end of file
+    """Get MongoDB database instance, or None while Mongo is unavailable"""
+    return mongo.get_db()
+
+
+def init_mongo(app):
+    """Configure the Mongo connection from app config; it connects on first use"""
+    mongo.configure(
+        uri=app.config.get('MONGO_URI'),
+        max_pool_size=app.config.get('MONGO_MAX_POOL_SIZE'),
+        min_pool_size=app.config.get('MONGO_MIN_POOL_SIZE'),
+        timeout_ms=app.config.get('MONGO_TIMEOUT_MS'),
+        health_interval=app.config.get('MONGO_HEALTH_INTERVAL'),
+        failure_threshold=app.config.get('MONGO_BREAKER_THRESHOLD')
+    )
+
+
+@click.group('mongo')
+def mongo_cli():
+    """Manage MongoDB collections"""
+
+
+@mongo_cli.command('indexes')
+@with_appcontext
+def indexes_command():
+    """Create the declared indexes; safe to run on every deploy"""
+    from app.models_mongo import ensure_indexes
+
+    db = get_mongo_db()
+    if db is None:
+        raise click.ClickException(f'MongoDB is unavailable: {mongo.last_error}')
+    for collection, names in ensure_indexes(db).items():
+        click.echo(f'{collection}: {", ".join(names)}')
+
+
+@mongo_cli.command('audit')
+@with_appcontext
+def audit_command():
+    """Explain every repository query and fail if any scans a whole collection"""
+    from app.models_mongo import audit_queries
+
+    db = get_mongo_db()
+    if db is None:
+        raise click.ClickException(f'MongoDB is unavailable: {mongo.last_error}')
+    scans = audit_queries(db)
+    for name, stages in scans:
+        click.echo(f'COLLSCAN: {name} ({" -> ".join(stages)})')
+    if scans:
+        raise click.ClickException(f'{len(scans)} queries scan a whole collection')
+    click.echo('Every audited query uses an index')
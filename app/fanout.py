@@ -0,0 +1,110 @@
+import atexit
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import pymongo
+
+TIMEOUT = 'timeout'
+
+
+class FanOut:
+    """
+    Runs independent lookups for one request on a shared thread pool.
+
+    Each source gets its own timeout; a source that is slow or fails is
+    reported in `errors` and the others are still returned, so a page costs
+    roughly its slowest source instead of the sum. A source that has
+    started cannot be cancelled and keeps its thread until it finishes, so
+    sources should bound their own work (see mongo_deadline). workers=0
+    runs sources inline, in order.
+    """
+
+    def __init__(self, workers=8):
+        self.workers = workers
+        self.timeouts = 0
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def configure(self, workers=None):
+        self.close()
+        if workers is not None:
+            self.workers = workers
+
+    def _executor(self):
+        # A forked worker inherits the parent's pool object but not its threads
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='fanout')
+                self._pid = os.getpid()
+            return self._pool
+
+    def gather(self, app, sources):
+        """
+        Run sources given as {name: (fn, timeout_seconds)} inside app contexts.
+
+        Returns (results, errors): results maps each source that finished
+        to its return value, errors maps the rest to 'timeout' or the
+        exception's message.
+        """
+        results, errors = {}, {}
+        if not self.workers:
+            for name, (fn, _) in sources.items():
+                try:
+                    results[name] = _in_context(app, fn)
+                except Exception as e:
+                    errors[name] = str(e)
+            return results, errors
+
+        started = time.monotonic()
+        pool = self._executor()
+        futures = {name: pool.submit(_in_context, app, fn) for name, (fn, _) in sources.items()}
+        for name, future in futures.items():
+            remaining = started + sources[name][1] - time.monotonic()
+            try:
+                results[name] = future.result(timeout=max(remaining, 0))
+            except FutureTimeout:
+                # Only stops a source still queued behind busy workers
+                future.cancel()
+                with self._lock:
+                    self.timeouts += 1
+                errors[name] = TIMEOUT
+            except Exception as e:
+                errors[name] = str(e)
+        return results, errors
+
+    def close(self):
+        pool = self._pool
+        self._pool = None
+        if pool is not None and self._pid == os.getpid():
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def mongo_deadline(fn, seconds):
+    """
+    Wrap a source so its MongoDB operations give up when its fan-out
+    timeout does (measured from now), instead of running on after the
+    caller has stopped waiting.
+    """
+    deadline = time.monotonic() + seconds
+
+    def source():
+        with pymongo.timeout(max(deadline - time.monotonic(), 0.001)):
+            return fn()
+    return source
+
+
+def _in_context(app, fn):
+    # Each source gets its own app context, and with it its own SQL session
+    with app.app_context():
+        return fn()
+
+
+fanout = FanOut()
+
+
+def init_fanout(app):
+    """Configure the fan-out pool from app config"""
+    fanout.configure(workers=app.config.get('FANOUT_WORKERS'))
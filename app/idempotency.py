@@ -0,0 +1,162 @@
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+import click
+from flask import current_app, request, jsonify, make_response
+from flask.cli import with_appcontext
+from flask_login import current_user
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint():
+    """Hash of what the client asked for, so a reused key with a different body is caught"""
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.path.encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _replay(row):
+    response = current_app.response_class(row.response_body, status=row.status_code, mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _claim(user_id, key, fingerprint):
+    """
+    Reserve a key for this request.
+
+    Returns (claim, None) when the caller should run the request, or
+    (None, response) when an earlier request with the same key decides
+    the outcome. The unique (user_id, key) index makes the claim atomic
+    across workers. A claim left unfinished for longer than
+    IDEMPOTENCY_CLAIM_LEASE (its worker died mid-request) is taken over.
+    """
+    ttl = current_app.config.get('IDEMPOTENCY_KEY_TTL', 86400)
+    lease = current_app.config.get('IDEMPOTENCY_CLAIM_LEASE', 45)
+
+    for _ in range(2):
+        now = datetime.utcnow()
+        row = IdempotencyKey(user_id=user_id, key=key, request_hash=fingerprint,
+                             claimed_at=now, expires_at=now + timedelta(seconds=ttl))
+        db.session.add(row)
+        try:
+            db.session.commit()
+            return (row.id, now), None
+        except IntegrityError:
+            db.session.rollback()
+
+        existing = IdempotencyKey.query.filter_by(user_id=user_id, key=key).first()
+        if existing is None:
+            continue
+        if existing.expires_at <= now:
+            # Expired keys are free to reuse
+            db.session.delete(existing)
+            db.session.commit()
+            continue
+        if existing.request_hash != fingerprint:
+            return None, (jsonify({'error': f'{HEADER} was already used for a different request'}), 422)
+        if existing.status_code is None:
+            claimed_at = existing.claimed_at or existing.created_at
+            if claimed_at is not None and claimed_at > now - timedelta(seconds=lease):
+                return None, (jsonify({'error': f'A request with this {HEADER} is still in progress'}), 409)
+            if _take_over(existing.id, existing.claimed_at, now):
+                return (existing.id, now), None
+            continue
+        return None, _replay(existing)
+
+    return None, (jsonify({'error': f'Could not reserve {HEADER}, please retry'}), 409)
+
+
+def _take_over(row_id, claimed_at, now):
+    """Move a stale claim to this request; False if another request got there first"""
+    taken = IdempotencyKey.query.filter(
+        IdempotencyKey.id == row_id,
+        IdempotencyKey.status_code.is_(None),
+        IdempotencyKey.claimed_at.is_(None) if claimed_at is None else IdempotencyKey.claimed_at == claimed_at
+    ).update({IdempotencyKey.claimed_at: now}, synchronize_session=False)
+    db.session.commit()
+    return taken == 1
+
+
+def _owned(claim):
+    """Filter for the claimed row, as long as no other request has taken it over"""
+    row_id, claimed_at = claim
+    return IdempotencyKey.query.filter_by(id=row_id, claimed_at=claimed_at)
+
+
+def _release(claim):
+    """Forget a claim so the client can retry the request"""
+    db.session.rollback()
+    _owned(claim).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def _record(claim, response):
+    _owned(claim).update({
+        IdempotencyKey.status_code: response.status_code,
+        IdempotencyKey.response_body: response.get_data(as_text=True)
+    }, synchronize_session=False)
+    db.session.commit()
+
+
+def idempotent(view):
+    """
+    Replay the stored response for a repeated Idempotency-Key.
+
+    Requests without the header run as usual. Server errors are not stored,
+    so a retry after a 5xx runs the request again. Must be applied after
+    login_required; keys are scoped to the current user.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'}), 400
+
+        claim, response = _claim(current_user.id, key, request_fingerprint())
+        if response is not None:
+            return response
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            _release(claim)
+            raise
+
+        if response.status_code >= 500:
+            _release(claim)
+        else:
+            _record(claim, response)
+        return response
+
+    return wrapper
+
+
+def purge_expired(now=None):
+    """Delete expired keys. Returns rows removed."""
+    count = IdempotencyKey.query.filter(
+        IdempotencyKey.expires_at <= (now or datetime.utcnow())
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+@click.group('idempotency')
+def idempotency_cli():
+    """Maintain stored idempotency keys"""
+
+
+@idempotency_cli.command('purge')
+@with_appcontext
+def purge_command():
+    """Delete idempotency keys past their TTL"""
+    click.echo(f'Removed {purge_expired()} expired keys')
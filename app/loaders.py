@@ -0,0 +1,33 @@
+from app.models import User, Game
+
+
+def load_by_ids(model, ids):
+    """
+    Fetch many rows of a model in a single IN query.
+
+    Returns a dict of id -> object. Missing ids are simply absent.
+    """
+    wanted = {i for i in ids if i is not None}
+    if not wanted:
+        return {}
+    rows = model.query.filter(model.id.in_(wanted)).all()
+    return {row.id: row for row in rows}
+
+
+def serialize_reviews(reviews):
+    """Serialize reviews with their authors loaded in one query"""
+    users = load_by_ids(User, (r.user_id for r in reviews))
+    return [r.to_dict(user=users.get(r.user_id)) for r in reviews]
+
+
+def serialize_orders(orders):
+    """Serialize orders with their games loaded in one query"""
+    games = load_by_ids(Game, (o.game_id for o in orders))
+    result = []
+    for order in orders:
+        game = games.get(order.game_id)
+        order_dict = order.to_dict()
+        order_dict['game'] = game.to_dict() if game else None
+        result.append(order_dict)
+    return result
+
@@ -0,0 +1,159 @@
+import logging
+import time
+from flask import Response, current_app, g, has_request_context, request
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from pymongo import monitoring
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+slow_log = logging.getLogger('gaming.slow_requests')
+
+registry = CollectorRegistry()
+
+REQUEST_LATENCY = Histogram(
+    'gaming_http_request_duration_seconds',
+    'Request latency by endpoint',
+    ['blueprint', 'endpoint', 'method', 'status'],
+    registry=registry
+)
+SQL_QUERIES = Histogram(
+    'gaming_sql_queries_per_request',
+    'SQL statements issued per request',
+    ['blueprint', 'endpoint'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+    registry=registry
+)
+SQL_TIME = Histogram(
+    'gaming_sql_time_per_request_seconds',
+    'Total time spent in SQL per request',
+    ['blueprint', 'endpoint'],
+    registry=registry
+)
+MONGO_COMMANDS = Histogram(
+    'gaming_mongo_command_duration_seconds',
+    'MongoDB command latency',
+    ['blueprint', 'endpoint', 'command', 'outcome'],
+    registry=registry
+)
+SLOW_REQUESTS = Counter(
+    'gaming_slow_requests_total',
+    'Requests slower than SLOW_REQUEST_MS',
+    ['blueprint', 'endpoint'],
+    registry=registry
+)
+
+# How many statements a slow request log entry carries at most
+SLOW_LOG_MAX_STATEMENTS = 20
+
+
+def _labels():
+    if not has_request_context():
+        return 'background', 'background'
+    return request.blueprint or '', request.endpoint or 'unknown'
+
+
+# SQL — listening on the Engine class covers every engine/bind the app creates
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    if not has_request_context() or 'metrics_start' not in g:
+        return
+    g.sql_count += 1
+    g.sql_time += elapsed
+    g.sql_statements.append((elapsed, statement))
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    conn = context.connection
+    if conn is not None and conn.info.get('query_start'):
+        conn.info['query_start'].pop()
+
+
+# Mongo — passed to MongoClient(event_listeners=[...]) in app.db_mongo
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Time every MongoDB command and attribute it to the current endpoint"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event, 'ok')
+
+    def failed(self, event):
+        self._record(event, 'error')
+
+    def _record(self, event, outcome):
+        seconds = event.duration_micros / 1e6
+        blueprint, endpoint = _labels()
+        MONGO_COMMANDS.labels(blueprint, endpoint, event.command_name, outcome).observe(seconds)
+        if has_request_context() and 'metrics_start' in g:
+            g.mongo_time += seconds
+
+
+mongo_listener = MongoCommandListener()
+
+
+def _start_request():
+    g.metrics_start = time.perf_counter()
+    g.sql_count = 0
+    g.sql_time = 0.0
+    g.sql_statements = []
+    g.mongo_time = 0.0
+
+
+def _finish_request(response):
+    if 'metrics_start' not in g:
+        return response
+
+    elapsed = time.perf_counter() - g.metrics_start
+    blueprint, endpoint = _labels()
+
+    REQUEST_LATENCY.labels(blueprint, endpoint, request.method, response.status_code).observe(elapsed)
+    SQL_QUERIES.labels(blueprint, endpoint).observe(g.sql_count)
+    SQL_TIME.labels(blueprint, endpoint).observe(g.sql_time)
+
+    threshold = _slow_threshold()
+    if threshold is not None and elapsed * 1000 >= threshold:
+        SLOW_REQUESTS.labels(blueprint, endpoint).inc()
+        _log_slow_request(endpoint, elapsed)
+
+    return response
+
+
+def _slow_threshold():
+    # None or 0 turns slow-request logging off
+    return current_app.config.get('SLOW_REQUEST_MS') or None
+
+
+def _log_slow_request(endpoint, elapsed):
+    worst = sorted(g.sql_statements, key=lambda item: item[0], reverse=True)
+    lines = [
+        f'  {seconds * 1000:.1f}ms  {" ".join(statement.split())}'
+        for seconds, statement in worst[:SLOW_LOG_MAX_STATEMENTS]
+    ]
+    slow_log.warning(
+        'Slow request %s %s (%s): %.1fms total, %d SQL queries in %.1fms, mongo %.1fms\n%s',
+        request.method, request.path, endpoint, elapsed * 1000,
+        g.sql_count, g.sql_time * 1000, g.mongo_time * 1000, '\n'.join(lines)
+    )
+
+
+def metrics_view():
+    """Prometheus scrape endpoint"""
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app):
+    """Install per-request instrumentation and the /metrics route on an app"""
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -1,11 +1,16 @@
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from app import db
+from app.passwords import passwords
 from datetime import datetime
 
 class User(UserMixin, db.Model):
     """A user in the system"""
     __tablename__ = 'users'
+    __table_args__ = (
+        # Admin user list and counts filter by role
+        db.Index('ix_users_role', 'role'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
@@ -17,7 +22,7 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, method=passwords.method)
     
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -36,6 +41,11 @@ class User(UserMixin, db.Model):
 class Game(db.Model):
     """A game in the platform"""
     __tablename__ = 'games'
+    __table_args__ = (
+        # Genre listings, paged by id
+        db.Index('ix_games_genre_id', 'genre', 'id'),
+        db.Index('ix_games_developer_id', 'developer_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -64,6 +74,17 @@ class Game(db.Model):
 class Order(db.Model):
     """A purchase order"""
     __tablename__ = 'orders'
+    __table_args__ = (
+        # At most one completed order per (user, game), so concurrent checkouts cannot double-buy
+        db.Index(
+            'uq_orders_user_game_completed', 'user_id', 'game_id', unique=True,
+            sqlite_where=db.text("status = 'completed'"),
+            postgresql_where=db.text("status = 'completed'")
+        ),
+        # Purchase history and cart checkout; the partial index above is not
+        # usable when status is a bound parameter
+        db.Index('ix_orders_user_status_game', 'user_id', 'status', 'game_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
@@ -85,6 +106,13 @@ class Order(db.Model):
 class Review(db.Model):
     """A review for a game"""
     __tablename__ = 'reviews'
+    __table_args__ = (
+        # One per sort order of a game's review list, plus the "already reviewed" check
+        db.Index('ix_reviews_game_created', 'game_id', 'created_at'),
+        db.Index('ix_reviews_game_helpful', 'game_id', 'helpful_count'),
+        db.Index('ix_reviews_game_rating', 'game_id', 'rating'),
+        db.Index('ix_reviews_game_user', 'game_id', 'user_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     game_id = db.Column(db.Integer, db.ForeignKey('games.id'), nullable=False)
@@ -96,8 +124,10 @@ class Review(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    def to_dict(self):
-        user = User.query.get(self.user_id)
+    def to_dict(self, user=None):
+        # Pass the author in when serializing many reviews (see app.loaders)
+        if user is None:
+            user = User.query.get(self.user_id)
         return {
             'id': self.id,
             'game_id': self.game_id,
@@ -109,4 +139,98 @@ class Review(db.Model):
             'helpful_count': self.helpful_count,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
\ No newline at end of file
+        }
+
+class ReviewVote(db.Model):
+    """A user's "helpful" vote on a review; at most one per (review, user)"""
+    __tablename__ = 'review_votes'
+    __table_args__ = (
+        db.UniqueConstraint('review_id', 'user_id', name='uq_review_votes_review_user'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    review_id = db.Column(db.Integer, db.ForeignKey('reviews.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class GameRatingSummary(db.Model):
+    """Running review aggregates for a game, kept in step with the reviews table"""
+    __tablename__ = 'game_rating_summaries'
+    
+    game_id = db.Column(db.Integer, db.ForeignKey('games.id'), primary_key=True)
+    review_count = db.Column(db.Integer, default=0, nullable=False)
+    rating_sum = db.Column(db.Integer, default=0, nullable=False)
+    stars_1 = db.Column(db.Integer, default=0, nullable=False)
+    stars_2 = db.Column(db.Integer, default=0, nullable=False)
+    stars_3 = db.Column(db.Integer, default=0, nullable=False)
+    stars_4 = db.Column(db.Integer, default=0, nullable=False)
+    stars_5 = db.Column(db.Integer, default=0, nullable=False)
+    
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.review_count if self.review_count else 0
+    
+    def histogram(self):
+        return {str(star): getattr(self, f'stars_{star}') or 0 for star in range(1, 6)}
+    
+    def to_dict(self):
+        return {
+            'game_id': self.game_id,
+            'review_count': self.review_count,
+            'average_rating': round(self.average_rating, 1),
+            'histogram': self.histogram()
+        }
+
+
+class VersionStamp(db.Model):
+    """Monotonic version of a cacheable scope (a game, its reviews, a listing), bumped on every write"""
+    __tablename__ = 'version_stamps'
+    
+    scope = db.Column(db.String(120), primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class Entitlement(db.Model):
+    """A game a user owns; one row per (user, game), written alongside the completed order"""
+    __tablename__ = 'entitlements'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'game_id', name='uq_entitlements_user_game'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    game_id = db.Column(db.Integer, db.ForeignKey('games.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class IdempotencyKey(db.Model):
+    """A client-supplied Idempotency-Key and the response it produced, replayed until expires_at"""
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='uq_idempotency_user_key'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    # Null while the first request is still running
+    status_code = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # When the running request took the key; another request may take it over once the lease is up
+    claimed_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class RefreshToken(db.Model):
+    """One issued refresh token, by its jti; used_at is set when it is traded in, and a second use revokes the user's tokens"""
+    __tablename__ = 'refresh_tokens'
+    
+    jti = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    used_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
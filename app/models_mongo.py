@@ -1,15 +1,90 @@
-from app.db_mongo import get_mongo_db
+from app.db_mongo import get_mongo_db, MongoUnavailable
+from app.tags import tag_index
+from app.cache import catalog_cache
+from pymongo import ASCENDING, IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
 from datetime import datetime
 
+# Indexes each collection needs; `flask mongo indexes` creates them (create_indexes is idempotent).
+# The unique ones also make retried analytics flushes idempotent (see write_increments).
+INDEXES = {
+    'game_metadata': [
+        IndexModel([('game_id', ASCENDING)], name='game_id_unique', unique=True),
+        # Multikey: one entry per tag
+        IndexModel([('tags', ASCENDING)], name='tags'),
+    ],
+    'game_analytics': [
+        IndexModel([('game_id', ASCENDING)], name='game_id_unique', unique=True),
+    ],
+    'game_analytics_buckets': [
+        IndexModel([('game_id', ASCENDING), ('granularity', ASCENDING), ('bucket', ASCENDING)],
+                   name='game_granularity_bucket_unique', unique=True),
+        # compact_hourly deletes by period across all games
+        IndexModel([('granularity', ASCENDING), ('bucket', ASCENDING)], name='granularity_bucket'),
+    ],
+}
+
+# One representative of every query the repositories below issue, as
+# (name, collection, filter, sort), for audit_queries. all_tags reads the
+# whole collection on purpose and is left out.
+AUDITED_QUERIES = [
+    ('metadata by game', 'game_metadata', {'game_id': 1}, None),
+    ('metadata for many games', 'game_metadata', {'game_id': {'$in': [1, 2, 3]}}, None),
+    ('metadata by tags', 'game_metadata', {'tags': {'$in': ['rpg']}}, None),
+    ('analytics by game', 'game_analytics', {'game_id': 1}, None),
+    ('analytics range', 'game_analytics_buckets',
+     {'game_id': 1, 'granularity': 'day', 'bucket': {'$gte': datetime(2026, 1, 1), '$lt': datetime(2026, 2, 1)}},
+     [('bucket', ASCENDING)]),
+    ('hourly compaction', 'game_analytics_buckets',
+     {'granularity': 'hour', 'bucket': {'$lt': datetime(2026, 1, 1)}}, None),
+]
+
+
+def ensure_indexes(db):
+    """Create every declared index that is missing. Returns {collection: [index names]}."""
+    return {name: db[name].create_indexes(models) for name, models in INDEXES.items()}
+
+
+def plan_stages(plan):
+    """Every stage name in an explain() plan tree"""
+    stages = [plan.get('stage')]
+    for key in ('inputStage', 'queryPlan'):
+        if key in plan:
+            stages.extend(plan_stages(plan[key]))
+    for child in plan.get('inputStages', []):
+        stages.extend(plan_stages(child))
+    return [stage for stage in stages if stage]
+
+
+def audit_queries(db):
+    """Explain each audited query; returns [(name, stages)] for those whose winning plan has a COLLSCAN"""
+    scans = []
+    for name, collection, query, sort in AUDITED_QUERIES:
+        command = {'find': collection, 'filter': query}
+        if sort:
+            command['sort'] = dict(sort)
+        explained = db.command('explain', command, verbosity='queryPlanner')
+        stages = plan_stages(explained['queryPlanner']['winningPlan'])
+        if 'COLLSCAN' in stages:
+            scans.append((name, stages))
+    return scans
+
+
+# Metadata fields clients can ask for in bulk reads
+METADATA_FIELDS = ('tags', 'screenshots', 'videos', 'system_requirements', 'developer_notes')
+
 class GameMetadata:
     """Store game metadata in MongoDB"""
     
-    def __init__(self):
-        self.db = get_mongo_db()
-        if self.db is not None:
-            self.collection = self.db['game_metadata']
-        else:
-            self.collection = None
+    # Resolved per call, so a Mongo outage or recovery takes effect immediately
+    @property
+    def db(self):
+        return get_mongo_db()
+    
+    @property
+    def collection(self):
+        db = self.db
+        return db['game_metadata'] if db is not None else None
     
     def save_metadata(self, game_id, metadata):
         """Save game metadata to MongoDB"""
@@ -32,8 +107,23 @@ class GameMetadata:
             {'$set': doc},
             upsert=True
         )
+        tag_index.set_tags(game_id, doc['tags'])
+        catalog_cache.invalidate_metadata(game_id)
         return result.upserted_id or result.modified_count
     
+    def delete_metadata(self, game_id):
+        """Delete a game's metadata; False if MongoDB is unavailable and it was left in place"""
+        tag_index.remove_game(game_id)
+        catalog_cache.invalidate_metadata(game_id)
+        if self.db is None:
+            return False
+        
+        try:
+            self.collection.delete_one({'game_id': game_id})
+        except PyMongoError:
+            return False
+        return True
+    
     def get_metadata(self, game_id):
         """Get game metadata from MongoDB"""
         if self.db is None:
@@ -41,48 +131,226 @@ class GameMetadata:
         
         return self.collection.find_one({'game_id': game_id})
     
+    def get_many(self, game_ids, fields=METADATA_FIELDS):
+        """
+        Get {game_id: doc} for many games with one $in query, projected to `fields`.
+        
+        Games without metadata are left out. Returns None while MongoDB is unavailable.
+        """
+        if self.db is None:
+            return None
+        
+        projection = {'_id': 0, 'game_id': 1}
+        projection.update({field: 1 for field in fields})
+        return {
+            doc['game_id']: doc
+            for doc in self.collection.find({'game_id': {'$in': list(game_ids)}}, projection)
+        }
+    
+    def all_tags(self):
+        """Get {game_id: tags} for every game with metadata"""
+        if self.db is None:
+            return {}
+        
+        return {
+            doc['game_id']: doc.get('tags', [])
+            for doc in self.collection.find({}, {'_id': 0, 'game_id': 1, 'tags': 1})
+        }
+    
     def search_by_tags(self, tags):
-        """Search games by tags"""
+        """Search games by tags (any of them); app.tags.tag_index answers boolean queries without Mongo"""
         if self.db is None:
             return []
         
         return list(self.collection.find({'tags': {'$in': tags}}))
 
+HOURLY = 'hour'
+DAILY = 'day'
+GRANULARITIES = (HOURLY, DAILY)
+
+# Batch ids each analytics document remembers, so a retried flush is applied once
+APPLIED_BATCHES_KEPT = 32
+DUPLICATE_KEY = 11000
+
+
+def bucket_start(moment, granularity):
+    """Truncate a UTC datetime to the start of its hour or day bucket"""
+    if granularity == DAILY:
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
 class GameAnalytics:
     """Store game analytics in MongoDB"""
     
-    def __init__(self):
-        self.db = get_mongo_db()
-        if self.db is not None:
-            self.collection = self.db['game_analytics']
-        else:
-            self.collection = None
+    def __init__(self, buffer=None):
+        # Optional CounterBuffer; when set, increments are coalesced and bulk-written
+        self.buffer = buffer
     
-    def record_view(self, game_id):
-        """Record a game view"""
-        if self.db is None:
+    # Resolved per call, so a Mongo outage or recovery takes effect immediately
+    @property
+    def db(self):
+        return get_mongo_db()
+    
+    @property
+    def collection(self):
+        db = self.db
+        return db['game_analytics'] if db is not None else None
+    
+    @property
+    def buckets(self):
+        # One document per (game_id, granularity, bucket) holding that period's counts
+        db = self.db
+        return db['game_analytics_buckets'] if db is not None else None
+    
+    def _increment(self, game_id, field):
+        key = (game_id, bucket_start(datetime.utcnow(), HOURLY))
+        
+        if self.buffer is not None:
+            # Buffered even while Mongo is down; the flush retries until it is back
+            self.buffer.add(key, field)
             return
         
-        self.collection.update_one(
-            {'game_id': game_id},
-            {'$inc': {'views': 1}},
-            upsert=True
-        )
+        if self.db is None:
+            return
+        self.write_increments({key: {field: 1}})
+    
+    def record_view(self, game_id):
+        """Record a game view"""
+        self._increment(game_id, 'views')
     
     def record_download(self, game_id):
         """Record a game download"""
-        if self.db is None:
+        self._increment(game_id, 'downloads')
+    
+    def write_increments(self, batch):
+        """
+        Apply increments keyed by (game_id, hour) -> {field: n}.
+        
+        Each hour's counts are also rolled up into the lifetime totals and the
+        daily bucket as they are written, so range reads never scan raw events.
+        
+        A batch with an id (a FlushBatch) is applied at most once per document:
+        each document records the ids of the last batches it took, so a retry
+        after a partial failure only writes what is still missing.
+        """
+        if not batch:
             return
+        if self.db is None:
+            # Raising keeps the batch in the buffer for the next flush
+            raise MongoUnavailable('MongoDB is unavailable; analytics increments kept for retry')
         
-        self.collection.update_one(
-            {'game_id': game_id},
-            {'$inc': {'downloads': 1}},
-            upsert=True
-        )
+        lifetime = {}
+        periods = {}
+        for (game_id, hour), fields in batch.items():
+            for target in (lifetime.setdefault(game_id, {}),
+                           periods.setdefault((game_id, HOURLY, hour), {}),
+                           periods.setdefault((game_id, DAILY, bucket_start(hour, DAILY)), {})):
+                for field, amount in fields.items():
+                    target[field] = target.get(field, 0) + amount
+        
+        batch_id = getattr(batch, 'id', None)
+        self._apply_once(self.collection, batch_id, [
+            ({'game_id': game_id}, fields)
+            for game_id, fields in lifetime.items()
+        ])
+        self._apply_once(self.buckets, batch_id, [
+            ({'game_id': game_id, 'granularity': granularity, 'bucket': start}, fields)
+            for (game_id, granularity, start), fields in periods.items()
+        ])
+    
+    @staticmethod
+    def _apply_once(collection, batch_id, increments):
+        """Upsert each (filter, fields) increment, skipping documents that already took batch_id"""
+        def operation(match, fields):
+            if batch_id is None:
+                return UpdateOne(match, {'$inc': fields}, upsert=True)
+            return UpdateOne(
+                dict(match, batches={'$ne': batch_id}),
+                {'$inc': fields,
+                 '$push': {'batches': {'$each': [batch_id], '$slice': -APPLIED_BATCHES_KEPT}}},
+                upsert=True
+            )
+        
+        for attempt in range(2):
+            try:
+                collection.bulk_write([operation(match, fields) for match, fields in increments],
+                                      ordered=False)
+                return
+            except BulkWriteError as e:
+                errors = e.details.get('writeErrors', [])
+                if any(error.get('code') != DUPLICATE_KEY for error in errors):
+                    raise
+                # A duplicate key on upsert means the document exists but did not
+                # match: either it already took this batch, or another writer
+                # created it first. One retry tells the two apart.
+                if attempt:
+                    return
+                increments = [increments[error['index']] for error in errors]
+    
+    def _pending(self, game_id):
+        """Buffered, not yet flushed counts for a game as {hour: {field: n}}"""
+        if self.buffer is None:
+            return {}
+        return {
+            hour: fields
+            for (pending_game, hour), fields in self.buffer.snapshot().items()
+            if pending_game == game_id
+        }
     
     def get_stats(self, game_id):
         """Get game statistics"""
         if self.db is None:
             return {'views': 0, 'downloads': 0}
         
-        return self.collection.find_one({'game_id': game_id})
\ No newline at end of file
+        stats = self.collection.find_one({'game_id': game_id}, {'batches': 0})
+        
+        pending = self._pending(game_id)
+        if pending:
+            stats = stats or {'game_id': game_id}
+            for fields in pending.values():
+                for field, amount in fields.items():
+                    stats[field] = stats.get(field, 0) + amount
+        
+        return stats
+    
+    def get_range(self, game_id, start, end, granularity=DAILY):
+        """Get per-bucket counts for buckets starting in [start, end)"""
+        if self.db is None:
+            return []
+        
+        cursor = self.buckets.find(
+            {
+                'game_id': game_id,
+                'granularity': granularity,
+                'bucket': {'$gte': bucket_start(start, granularity), '$lt': end}
+            },
+            {'_id': 0, 'bucket': 1, 'views': 1, 'downloads': 1}
+        ).sort('bucket', 1)
+        
+        rows = {doc['bucket']: doc for doc in cursor}
+        
+        for hour, fields in self._pending(game_id).items():
+            period = bucket_start(hour, granularity)
+            if not bucket_start(start, granularity) <= period < end:
+                continue
+            row = rows.setdefault(period, {'bucket': period})
+            for field, amount in fields.items():
+                row[field] = row.get(field, 0) + amount
+        
+        return [
+            {
+                'start': period.isoformat(),
+                'views': rows[period].get('views', 0),
+                'downloads': rows[period].get('downloads', 0)
+            }
+            for period in sorted(rows)
+        ]
+    
+    def compact_hourly(self, before):
+        """Drop hourly buckets older than `before`; their counts live on in daily buckets"""
+        if self.db is None:
+            return 0
+        
+        result = self.buckets.delete_many({'granularity': HOURLY, 'bucket': {'$lt': before}})
+        return result.deleted_count
@@ -0,0 +1,148 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+from app.cache import MemoryBackend
+from app.models import Game, Order, Entitlement
+
+
+class OwnershipIndex:
+    """
+    Answers "does this user own this game" from the entitlements table.
+
+    Each user's owned game ids are loaded with one indexed query and kept in a
+    bounded, short-TTL in-process cache, so repeat checks are set lookups.
+    Grants invalidate the user's entry once the transaction commits.
+    """
+
+    def __init__(self, max_users=50000, ttl=30):
+        self.ttl = ttl
+        self._cache = MemoryBackend(max_users)
+
+    def configure(self, max_users=None, ttl=None):
+        if max_users is not None:
+            self._cache = MemoryBackend(max_users)
+        if ttl is not None:
+            self.ttl = ttl
+
+    def owned_ids(self, user_id, refresh=False):
+        """Set of game ids a user owns"""
+        owned = None if refresh else self._cache.get(user_id)
+        if owned is None:
+            owned = frozenset(
+                game_id for (game_id,) in
+                db.session.query(Entitlement.game_id).filter(Entitlement.user_id == user_id)
+            )
+            self._cache.set(user_id, owned, self.ttl)
+        return owned
+
+    def owns(self, user_id, game_id, verify=False):
+        """
+        Whether the user owns the game.
+
+        A cached "no" can be up to ttl seconds old in other workers; pass
+        verify=True where a false "no" would be user visible and it will be
+        re-checked against the table once.
+        """
+        if game_id in self.owned_ids(user_id):
+            return True
+        return verify and game_id in self.owned_ids(user_id, refresh=True)
+
+    def library(self, user_id):
+        """Games a user owns, in purchase order, with one query"""
+        return Game.query.join(Entitlement, Entitlement.game_id == Game.id).filter(
+            Entitlement.user_id == user_id
+        ).order_by(Entitlement.id).all()
+
+    def grant(self, user_id, game_id, order_id=None):
+        """Record ownership in the current transaction; the caller commits"""
+        db.session.add(Entitlement(user_id=user_id, game_id=game_id, order_id=order_id))
+        db.session.info.setdefault('ownership_dirty', set()).add(user_id)
+
+    def grant_many(self, user_id, order_ids_by_game):
+        """Record ownership of several games ({game_id: order_id}) with one batched insert"""
+        if not order_ids_by_game:
+            return
+        db.session.execute(Entitlement.__table__.insert(), [
+            {'user_id': user_id, 'game_id': game_id, 'order_id': order_id}
+            for game_id, order_id in order_ids_by_game.items()
+        ])
+        db.session.info.setdefault('ownership_dirty', set()).add(user_id)
+
+    def invalidate(self, user_id):
+        self._cache.delete(user_id)
+
+    def clear(self):
+        self._cache.clear()
+
+    def backfill(self):
+        """Create entitlements for completed orders that lack one. Returns rows added."""
+        existing = db.session.query(Entitlement.id).filter(
+            Entitlement.user_id == Order.user_id,
+            Entitlement.game_id == Order.game_id
+        )
+        missing = db.session.query(Order.user_id, Order.game_id, db.func.min(Order.id)).filter(
+            Order.status == 'completed',
+            Order.user_id.isnot(None),
+            Order.game_id.isnot(None),
+            ~existing.exists()
+        ).group_by(Order.user_id, Order.game_id)
+
+        rows = [
+            {'user_id': user_id, 'game_id': game_id, 'order_id': order_id}
+            for user_id, game_id, order_id in missing
+        ]
+        if rows:
+            db.session.execute(Entitlement.__table__.insert(), rows)
+        db.session.commit()
+        self.clear()
+        return len(rows)
+
+    def needs_backfill(self):
+        """True for databases that have orders but no entitlements yet"""
+        return (
+            db.session.query(Entitlement.id).first() is None
+            and db.session.query(Order.id).filter(Order.status == 'completed').first() is not None
+        )
+
+
+ownership = OwnershipIndex()
+
+
+# Dropping the table (tests, reseeding) invalidates every cached set
+event.listen(Entitlement.__table__, 'after_drop', lambda *args, **kwargs: ownership.clear())
+
+
+# Invalidate only once the grant is durable, so no reader can cache the old set afterwards
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    for user_id in session.info.pop('ownership_dirty', ()):
+        ownership.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _after_rollback(session, previous_transaction):
+    session.info.pop('ownership_dirty', None)
+
+
+def init_ownership(app):
+    """Configure the ownership cache from app config"""
+    ownership.configure(
+        max_users=app.config.get('OWNERSHIP_CACHE_SIZE'),
+        ttl=app.config.get('OWNERSHIP_CACHE_TTL')
+    )
+
+
+@click.group('ownership')
+def ownership_cli():
+    """Maintain the entitlements table"""
+
+
+@ownership_cli.command('backfill')
+@with_appcontext
+def backfill_command():
+    """Create entitlements for existing completed orders"""
+    count = ownership.backfill()
+    click.echo(f'Added {count} entitlements')
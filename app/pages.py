@@ -0,0 +1,32 @@
+from flask import Blueprint, jsonify, render_template
+from app.db_mongo import mongo
+
+pages_bp = Blueprint('pages', __name__)
+
+@pages_bp.route('/')
+def index():
+    return render_template('index.html')
+
+@pages_bp.route('/games')
+def games():
+    return render_template('games.html')
+
+@pages_bp.route('/login')
+def login():
+    return render_template('login.html')
+
+@pages_bp.route('/register')
+def register():
+    return render_template('register.html')
+
+@pages_bp.route('/api/health')
+def health():
+    return jsonify({'status': 'ok', 'mongo': mongo.state})
+
+@pages_bp.app_errorhandler(404)
+def not_found(error):
+    return jsonify({'error': 'Not found'}), 404
+
+@pages_bp.app_errorhandler(500)
+def server_error(error):
+    return jsonify({'error': 'Server error'}), 500
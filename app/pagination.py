@@ -0,0 +1,59 @@
+import base64
+import json
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def encode_cursor(last_id):
+    """Encode the last seen id into an opaque cursor string"""
+    raw = json.dumps({'id': last_id}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor string back into the last seen id"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return int(data['id'])
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def clamp_limit(limit):
+    """Keep the page size within sane bounds"""
+    if not limit or limit < 1:
+        return DEFAULT_LIMIT
+    return min(limit, MAX_LIMIT)
+
+
+def keyset_paginate(query, key_column, cursor=None, limit=DEFAULT_LIMIT):
+    """
+    Paginate a query by seeking past the last seen key instead of using OFFSET.
+
+    Rows are ordered by key_column ascending. One extra row is fetched to
+    know whether another page exists, so no COUNT(*) is needed.
+
+    Returns (items, next_cursor).
+    """
+    limit = clamp_limit(limit)
+    last_id = decode_cursor(cursor)
+
+    if last_id is not None:
+        query = query.filter(key_column > last_id)
+
+    rows = query.order_by(key_column.asc()).limit(limit + 1).all()
+
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(getattr(items[-1], key_column.key))
+
+    return items, next_cursor
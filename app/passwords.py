@@ -0,0 +1,122 @@
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HasherBusy(Exception):
+    """Every hashing slot is taken; the caller should answer 503"""
+
+
+def _verify_and_update(stored_hash, password, method, current_prefix):
+    """Runs in a pool worker: check the password and rehash it if its parameters are stale"""
+    if not check_password_hash(stored_hash, password):
+        return False, None
+    if stored_hash.split('$', 1)[0] != current_prefix:
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+
+class PasswordHasher:
+    """
+    Runs password hashing and verification on a small process pool.
+
+    KDFs are deliberately CPU heavy; doing them in request threads lets a
+    burst of logins starve every other request. At most `workers` hashes
+    run at once and at most `queue_size` more wait; anything past that
+    raises HasherBusy immediately instead of queueing. workers=0 hashes
+    inline, which is what tests and one-off scripts want.
+    """
+
+    def __init__(self, method='scrypt', workers=0, queue_size=16, timeout=10):
+        self.method = method
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.rejected = 0
+        self._prefix = None
+        self._pool = None
+        self._pid = None
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def configure(self, method=None, workers=None, queue_size=None, timeout=None):
+        self.close()
+        if method is not None:
+            self.method = method
+            self._prefix = None
+        if workers is not None:
+            self.workers = workers
+        if queue_size is not None:
+            self.queue_size = queue_size
+        if timeout is not None:
+            self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+
+    @property
+    def prefix(self):
+        """The 'method:params' prefix new hashes get, e.g. scrypt:32768:8:1"""
+        if self._prefix is None:
+            self._prefix = generate_password_hash('', method=self.method).split('$', 1)[0]
+        return self._prefix
+
+    def _executor(self):
+        # A forked worker inherits the parent's pool object but not its processes
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                self._pid = os.getpid()
+            return self._pool
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HasherBusy()
+        try:
+            future = self._executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HasherBusy()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, stored_hash, password):
+        """
+        Check a password. Returns (ok, new_hash).
+
+        new_hash is set when the password was right but was hashed with
+        other parameters than the configured ones; store it.
+        """
+        return self._run(_verify_and_update, stored_hash, password, self.method, self.prefix)
+
+    def needs_rehash(self, stored_hash):
+        return stored_hash.split('$', 1)[0] != self.prefix
+
+    def close(self):
+        pool = self._pool
+        self._pool = None
+        if pool is not None and self._pid == os.getpid():
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+passwords = PasswordHasher()
+
+
+def init_passwords(app):
+    """Configure password hashing from app config"""
+    passwords.configure(
+        method=app.config.get('PASSWORD_HASH_METHOD'),
+        workers=app.config.get('PASSWORD_HASH_WORKERS'),
+        queue_size=app.config.get('PASSWORD_HASH_QUEUE'),
+        timeout=app.config.get('PASSWORD_HASH_TIMEOUT')
+    )
@@ -0,0 +1,153 @@
+import threading
+import time
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+from app.cache import MemoryBackend, RedisBackend
+from app.models import User, VersionStamp
+from app.versions import PRINCIPALS_SCOPE, bump, read, token_scope
+
+
+class Principal(UserMixin):
+    """
+    The logged-in user as seen by request handlers: a read-only snapshot
+    of the users row (the same fields as User.to_dict) plus the user's
+    token revocation epoch.
+
+    Handlers that need to change the user must load the User row.
+    """
+
+    def __init__(self, data, token_epoch=0):
+        self._data = data
+        self.token_epoch = token_epoch
+
+    id = property(lambda self: self._data['id'])
+    email = property(lambda self: self._data['email'])
+    username = property(lambda self: self._data['username'])
+    display_name = property(lambda self: self._data['display_name'])
+    role = property(lambda self: self._data['role'])
+
+    @property
+    def is_active(self):
+        return bool(self._data['is_active'])
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class PrincipalCache:
+    """
+    Short-TTL cache of session principals keyed by user id.
+
+    Saves the users query Flask-Login would otherwise run on every
+    authenticated request. Role and suspension changes and token
+    revocation drop the entry once they commit. A shared backend sees the
+    drop in every worker at once. A per-worker backend (check_interval > 0)
+    also relies on those changes bumping PRINCIPALS_SCOPE: each worker
+    reads that stamp at most once per check_interval seconds and empties
+    its cache when it has moved, so other workers are at most that stale.
+    """
+
+    def __init__(self, backend=None, ttl=30, check_interval=1.0):
+        self.backend = backend if backend is not None else MemoryBackend(50000)
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._seen_version = None
+        self._checked_at = None
+        self._check_lock = threading.Lock()
+
+    def configure(self, backend=None, ttl=None, check_interval=None):
+        if backend is not None:
+            self.backend = backend
+        if ttl is not None:
+            self.ttl = ttl
+        if check_interval is not None:
+            self.check_interval = check_interval
+            self._checked_at = None
+
+    def load(self, user_id):
+        """Principal for a session's user id, or None if missing or suspended"""
+        self._poll()
+        key = str(user_id)
+        entry = self.backend.get(key)
+        if entry is None:
+            # The user row and the token epoch in one query
+            row = (
+                db.session.query(User, VersionStamp.version)
+                .outerjoin(VersionStamp, VersionStamp.scope == token_scope(user_id))
+                .filter(User.id == user_id)
+                .first()
+            )
+            if row is None:
+                return None
+            user, epoch = row
+            entry = {'user': user.to_dict(), 'token_epoch': epoch or 0}
+            self.backend.set(key, entry, self.ttl)
+        principal = Principal(entry['user'], entry['token_epoch'])
+        return principal if principal.is_active else None
+
+    def _poll(self):
+        """Empty the cache if another worker changed a principal since the last check"""
+        if not self.check_interval:
+            return
+        now = time.monotonic()
+        checked_at = self._checked_at
+        if checked_at is not None and now - checked_at < self.check_interval:
+            return
+        if not self._check_lock.acquire(blocking=False):
+            # Another thread is checking; serve from the cache meanwhile
+            return
+        try:
+            version = read([PRINCIPALS_SCOPE])[PRINCIPALS_SCOPE][0]
+            if version != self._seen_version:
+                self.backend.clear()
+                self._seen_version = version
+            self._checked_at = now
+        finally:
+            self._check_lock.release()
+
+    def invalidate(self, user_id):
+        self.backend.delete(str(user_id))
+
+    def invalidate_on_commit(self, user_id):
+        """Drop the user's entry once the current transaction commits, in other workers too"""
+        db.session.info.setdefault('principals_dirty', set()).add(user_id)
+        bump(PRINCIPALS_SCOPE)
+
+    def clear(self):
+        self.backend.clear()
+        self._checked_at = None
+
+
+principals = PrincipalCache()
+
+event.listen(User.__table__, 'after_drop', lambda *args, **kwargs: principals.clear())
+
+
+# Dropping the entry before commit would let a concurrent request re-cache the old row
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    for user_id in session.info.pop('principals_dirty', ()):
+        principals.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _after_rollback(session, previous_transaction):
+    session.info.pop('principals_dirty', None)
+
+
+def init_principals(app):
+    """Configure the principal cache from app config"""
+    url = app.config.get('PRINCIPAL_CACHE_URL')
+    backend = (
+        RedisBackend(url, prefix='gaming:principal:') if url
+        else MemoryBackend(app.config.get('PRINCIPAL_CACHE_SIZE', 50000))
+    )
+    principals.configure(
+        backend=backend,
+        ttl=app.config.get('PRINCIPAL_CACHE_TTL'),
+        # A shared cache needs no polling
+        check_interval=0 if url else app.config.get('PRINCIPAL_CACHE_CHECK_MS', 1000) / 1000.0
+    )
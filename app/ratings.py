@@ -0,0 +1,155 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, case
+from app import db
+from app.models import Game, Review, GameRatingSummary
+from app.versions import bump, GLOBAL_SCOPE
+
+
+def _star_column(rating):
+    return getattr(GameRatingSummary, f'stars_{rating}')
+
+
+def apply_rating_change(game_id, old_rating=None, new_rating=None):
+    """
+    Adjust a game's rating aggregates inside the current transaction.
+
+    old_rating=None means a review was added, new_rating=None means one was
+    removed, both set means a review changed its rating. The caller commits.
+    """
+    if old_rating == new_rating:
+        return
+
+    changes = {}
+    count_delta = (new_rating is not None) - (old_rating is not None)
+    sum_delta = (new_rating or 0) - (old_rating or 0)
+
+    if count_delta:
+        changes[GameRatingSummary.review_count] = GameRatingSummary.review_count + count_delta
+    if sum_delta:
+        changes[GameRatingSummary.rating_sum] = GameRatingSummary.rating_sum + sum_delta
+    if old_rating is not None:
+        changes[_star_column(old_rating)] = _star_column(old_rating) - 1
+    if new_rating is not None:
+        changes[_star_column(new_rating)] = _star_column(new_rating) + 1
+
+    updated = GameRatingSummary.query.filter_by(game_id=game_id).update(
+        changes, synchronize_session=False
+    )
+
+    if not updated:
+        # First review for this game (or summary not backfilled yet):
+        # seed the row from the reviews table, which already includes this change.
+        db.session.flush()
+        summary = _compute_summary(game_id)
+        db.session.add(summary)
+        db.session.flush()
+    else:
+        summary = db.session.get(GameRatingSummary, game_id, populate_existing=True)
+
+    Game.query.filter_by(id=game_id).update(
+        {Game.rating: round(summary.average_rating, 1)}, synchronize_session=False
+    )
+
+
+def get_rating_summary(game_id):
+    """Get the stored rating aggregates for a game (empty if it has no reviews)"""
+    summary = db.session.get(GameRatingSummary, game_id)
+    return summary if summary is not None else _empty_summary(game_id)
+
+
+def _empty_summary(game_id):
+    return GameRatingSummary(game_id=game_id, review_count=0, rating_sum=0,
+                             stars_1=0, stars_2=0, stars_3=0, stars_4=0, stars_5=0)
+
+
+def _aggregate_query():
+    columns = [
+        Review.game_id,
+        func.count(Review.id),
+        func.coalesce(func.sum(Review.rating), 0)
+    ]
+    for star in range(1, 6):
+        columns.append(func.sum(case((Review.rating == star, 1), else_=0)))
+    return db.session.query(*columns).group_by(Review.game_id)
+
+
+def _summary_from_row(row):
+    game_id, count, total, s1, s2, s3, s4, s5 = row
+    return GameRatingSummary(
+        game_id=game_id, review_count=count, rating_sum=total,
+        stars_1=s1 or 0, stars_2=s2 or 0, stars_3=s3 or 0, stars_4=s4 or 0, stars_5=s5 or 0
+    )
+
+
+def _compute_summary(game_id):
+    row = _aggregate_query().filter(Review.game_id == game_id).first()
+    if row is None:
+        return _empty_summary(game_id)
+    return _summary_from_row(row)
+
+
+def rebuild_rating_summaries():
+    """Recompute every game's aggregates from the reviews table. Returns rows written."""
+    GameRatingSummary.query.delete(synchronize_session=False)
+
+    summaries = [_summary_from_row(row) for row in _aggregate_query().all()]
+    db.session.add_all(summaries)
+
+    Game.query.update({Game.rating: 0}, synchronize_session=False)
+    for summary in summaries:
+        Game.query.filter_by(id=summary.game_id).update(
+            {Game.rating: round(summary.average_rating, 1)}, synchronize_session=False
+        )
+
+    # Game.rating changed behind the API's back, so every catalog ETag is stale
+    bump(GLOBAL_SCOPE)
+    db.session.commit()
+    return len(summaries)
+
+
+def find_rating_drift():
+    """Compare stored aggregates against the reviews table. Returns drifted game ids."""
+    expected = {row[0]: _summary_from_row(row) for row in _aggregate_query().all()}
+    stored = {s.game_id: s for s in GameRatingSummary.query.all()}
+
+    def key(summary):
+        return (summary.review_count, summary.rating_sum, summary.histogram())
+
+    drifted = []
+    for game_id in set(expected) | set(stored):
+        want = expected.get(game_id) or _empty_summary(game_id)
+        have = stored.get(game_id) or _empty_summary(game_id)
+        if key(want) != key(have):
+            drifted.append(game_id)
+
+    return sorted(drifted)
+
+
+@click.group('ratings')
+def ratings_cli():
+    """Maintain stored review aggregates"""
+
+
+@ratings_cli.command('rebuild')
+@with_appcontext
+def rebuild_command():
+    """Backfill rating aggregates from existing reviews"""
+    count = rebuild_rating_summaries()
+    click.echo(f'Rebuilt rating summaries for {count} games')
+
+
+@ratings_cli.command('check')
+@click.option('--fix', is_flag=True, help='Rebuild if any drift is found')
+@with_appcontext
+def check_command(fix):
+    """Report games whose stored aggregates disagree with their reviews"""
+    drifted = find_rating_drift()
+    if not drifted:
+        click.echo('Rating summaries are consistent')
+        return
+
+    click.echo(f'{len(drifted)} games drifted: {", ".join(map(str, drifted))}')
+    if fix:
+        count = rebuild_rating_summaries()
+        click.echo(f'Rebuilt rating summaries for {count} games')
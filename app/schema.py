@@ -0,0 +1,112 @@
+import click
+import sqlalchemy as sa
+from flask.cli import with_appcontext
+from app import db
+
+
+class DuplicateRows(Exception):
+    """Existing rows break a unique index that is about to be created"""
+
+
+def create_schema():
+    """
+    Create missing tables, columns, indexes and the search index, and
+    backfill entitlements for databases that predate them. Safe to run
+    repeatedly. Returns the names of columns and indexes added to existing
+    tables.
+    """
+    from app.search import search_index
+    from app.ownership import ownership
+
+    db.create_all()
+    added = create_missing_columns() + create_missing_indexes()
+    search_index.create()
+    if ownership.needs_backfill():
+        ownership.backfill()
+    return added
+
+
+def create_missing_columns():
+    """
+    Add nullable columns that an existing table lacks.
+
+    Like indexes, columns added to the models after a table was created
+    never reach it through create_all(). Only nullable columns are added
+    this way; anything else needs a backfill written for it.
+    """
+    inspector = sa.inspect(db.engine)
+    added = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as conn:
+                conn.execute(sa.text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            added.append(f'{table.name}.{column.name}')
+    return added
+
+
+def create_missing_indexes():
+    """
+    Create declared indexes that an existing table lacks.
+
+    create_all() only builds indexes together with a new table, so this is
+    how indexes added to the models reach databases created before them.
+    Raises DuplicateRows instead of creating a unique index that existing
+    rows would break.
+    """
+    existing = {}
+    inspector = sa.inspect(db.engine)
+    added = []
+    for table in db.metadata.sorted_tables:
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            if table.name not in existing:
+                existing[table.name] = {ix['name'] for ix in inspector.get_indexes(table.name)}
+            if index.name not in existing[table.name]:
+                if index.unique:
+                    _check_duplicates(table, index)
+                index.create(db.engine)
+                added.append(index.name)
+    return added
+
+
+def _check_duplicates(table, index):
+    columns = [column.name for column in index.columns]
+    # Partial indexes (sqlite_where/postgresql_where) only need their own rows to be unique
+    where = index.dialect_kwargs.get(f'{db.engine.dialect.name}_where')
+    sql = 'SELECT {cols}, count(*) FROM {table}{where} GROUP BY {cols} HAVING count(*) > 1'.format(
+        cols=', '.join(columns),
+        table=table.name,
+        where=f' WHERE {where}' if where is not None else ''
+    )
+    with db.engine.connect() as conn:
+        duplicates = conn.execute(sa.text(sql)).all()
+    if duplicates:
+        examples = ', '.join(str(tuple(row[:-1])) for row in duplicates[:5])
+        raise DuplicateRows(
+            f'Cannot create unique index {index.name}: {len(duplicates)} ({", ".join(columns)}) '
+            f'values appear more than once in {table.name}, e.g. {examples}. '
+            f'Resolve them and run this again; to list them: {sql}'
+        )
+
+
+@click.group('schema')
+def schema_cli():
+    """Manage the SQL schema"""
+
+
+@schema_cli.command('create')
+@with_appcontext
+def create_command():
+    """Create the SQL schema; run once per deploy, before starting workers"""
+    try:
+        added = create_schema()
+    except DuplicateRows as e:
+        raise click.ClickException(str(e))
+    if added:
+        click.echo(f'Added columns and indexes: {", ".join(added)}')
+    click.echo('Database created!')
@@ -0,0 +1,200 @@
+import re
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import DDL, event, text
+from app import db
+from app.models import Game
+
+# bm25 column weights: a title hit outranks a tag hit, which outranks the description
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+TAGS_WEIGHT = 5.0
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE game_search USING fts5("
+    "title, description, tags, tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+# Keep the FTS table in step with create_all()/drop_all() on SQLite
+event.listen(Game.__table__, 'after_create', DDL(CREATE_SQL).execute_if(dialect='sqlite'))
+event.listen(Game.__table__, 'before_drop', DDL('DROP TABLE IF EXISTS game_search').execute_if(dialect='sqlite'))
+
+
+def _tokens(query):
+    return TOKEN_RE.findall(query or '')
+
+
+def _tags_text(tags):
+    return ' '.join(str(tag) for tag in tags or [])
+
+
+class GameSearchIndex:
+    """
+    Ranked full-text search over game title, description and metadata tags.
+
+    Backed by an SQLite FTS5 table whose rowid is the game id, written in the
+    same transaction as the game row. On other databases it falls back to an
+    unranked LIKE scan over title and description.
+    """
+
+    TABLE = 'game_search'
+
+    def enabled(self):
+        """Whether the current engine has the FTS index"""
+        return db.engine.dialect.name == 'sqlite'
+
+    def create(self):
+        """Create the FTS table on an existing database and fill it from the games table"""
+        if not self.enabled():
+            return False
+
+        exists = db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': self.TABLE}
+        ).first()
+        if exists:
+            return False
+
+        db.session.execute(text(CREATE_SQL))
+        db.session.execute(text(
+            f"INSERT INTO {self.TABLE} (rowid, title, description, tags) "
+            "SELECT id, title, coalesce(description, ''), '' FROM games"
+        ))
+        db.session.commit()
+        return True
+
+    def index_game(self, game):
+        """Add a game or refresh its title and description, keeping its tags"""
+        if not self.enabled():
+            return
+
+        params = {'id': game.id, 'title': game.title or '', 'description': game.description or ''}
+        updated = db.session.execute(
+            text(f"UPDATE {self.TABLE} SET title = :title, description = :description WHERE rowid = :id"),
+            params
+        ).rowcount
+        if not updated:
+            db.session.execute(
+                text(f"INSERT INTO {self.TABLE} (rowid, title, description, tags) "
+                     "VALUES (:id, :title, :description, '')"),
+                params
+            )
+
+    def set_tags(self, game_id, tags):
+        """Replace the tags indexed for a game"""
+        if not self.enabled():
+            return
+
+        updated = db.session.execute(
+            text(f"UPDATE {self.TABLE} SET tags = :tags WHERE rowid = :id"),
+            {'id': game_id, 'tags': _tags_text(tags)}
+        ).rowcount
+        if not updated:
+            game = db.session.get(Game, game_id)
+            if game is not None:
+                self.index_game(game)
+                self.set_tags(game_id, tags)
+
+    def remove_game(self, game_id):
+        """Drop a game from the index"""
+        if not self.enabled():
+            return
+
+        db.session.execute(text(f"DELETE FROM {self.TABLE} WHERE rowid = :id"), {'id': game_id})
+
+    def search(self, query, genre=None, min_price=None, max_price=None, limit=20, offset=0):
+        """Return (games, total) best match first. Every search term must match (prefixes allowed)."""
+        terms = _tokens(query)
+        if not terms:
+            return [], 0
+
+        if not self.enabled():
+            return self._search_like(terms, genre, min_price, max_price, limit, offset)
+
+        match = ' '.join(f'"{term}"*' for term in terms)
+        filters = []
+        params = {'match': match, 'limit': limit, 'offset': offset}
+        if genre:
+            filters.append('g.genre = :genre')
+            params['genre'] = genre
+        if min_price is not None:
+            filters.append('g.price >= :min_price')
+            params['min_price'] = min_price
+        if max_price is not None:
+            filters.append('g.price <= :max_price')
+            params['max_price'] = max_price
+        where = f"WHERE {' AND '.join(filters)} " if filters else ''
+
+        # bm25() is only usable directly against the FTS table, so rank in a CTE first
+        rows = db.session.execute(text(
+            f"WITH hits AS MATERIALIZED ("
+            f"SELECT rowid AS game_id, "
+            f"bm25({self.TABLE}, {TITLE_WEIGHT}, {DESCRIPTION_WEIGHT}, {TAGS_WEIGHT}) AS score "
+            f"FROM {self.TABLE} WHERE {self.TABLE} MATCH :match) "
+            "SELECT g.id, count(*) OVER () AS total FROM hits JOIN games g ON g.id = hits.game_id "
+            f"{where}ORDER BY hits.score, g.id LIMIT :limit OFFSET :offset"
+        ), params).all()
+
+        if not rows:
+            return [], 0
+
+        ids = [row[0] for row in rows]
+        games = {g.id: g for g in Game.query.filter(Game.id.in_(ids)).all()}
+        return [games[i] for i in ids if i in games], rows[0][1]
+
+    def _search_like(self, terms, genre, min_price, max_price, limit, offset):
+        query = Game.query
+        for term in terms:
+            pattern = f'%{term}%'
+            query = query.filter(Game.title.ilike(pattern) | Game.description.ilike(pattern))
+        if genre:
+            query = query.filter(Game.genre == genre)
+        if min_price is not None:
+            query = query.filter(Game.price >= min_price)
+        if max_price is not None:
+            query = query.filter(Game.price <= max_price)
+        total = query.count()
+        return query.order_by(Game.id).limit(limit).offset(offset).all(), total
+
+    def rebuild(self, metadata=None):
+        """Re-index every game, pulling tags from Mongo metadata when given"""
+        if not self.enabled():
+            return 0
+
+        tags = metadata.all_tags() if metadata is not None else {}
+        rows = [
+            {'id': game_id, 'title': title or '', 'description': description or '',
+             'tags': _tags_text(tags.get(game_id))}
+            for game_id, title, description in db.session.query(Game.id, Game.title, Game.description)
+        ]
+
+        db.session.execute(text(f"DELETE FROM {self.TABLE}"))
+        if rows:
+            db.session.execute(
+                text(f"INSERT INTO {self.TABLE} (rowid, title, description, tags) "
+                     "VALUES (:id, :title, :description, :tags)"),
+                rows
+            )
+        db.session.commit()
+        return len(rows)
+
+
+search_index = GameSearchIndex()
+
+
+@click.group('search')
+def search_cli():
+    """Maintain the game search index"""
+
+
+@search_cli.command('rebuild')
+@with_appcontext
+def rebuild_command():
+    """Re-index all games, including tags from MongoDB metadata"""
+    from app.api.games import game_metadata
+
+    search_index.create()
+    count = search_index.rebuild(game_metadata)
+    click.echo(f'Indexed {count} games')
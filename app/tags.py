@@ -0,0 +1,177 @@
+import threading
+import time
+from collections import Counter
+
+
+def normalize_tag(tag):
+    return str(tag).strip().lower()
+
+
+def parse_tags(value):
+    """Comma-separated query arg -> normalized tags"""
+    return [normalize_tag(tag) for tag in (value or '').split(',') if tag.strip()]
+
+
+class TagIndex:
+    """
+    In-memory inverted index from metadata tags to game ids.
+
+    Holds one posting set per tag, built from the game_metadata collection
+    (tags only, never whole documents) and updated in place by
+    GameMetadata.save_metadata. Other workers' saves show up when the index
+    is rebuilt, at most `ttl` seconds later. Tags are matched case-insensitively.
+
+    Changes made while a rebuild is reading MongoDB are recorded and
+    replayed onto the new index, so the rebuild cannot undo them.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._postings = {}
+        self._tags_by_game = {}
+        self._loaded_at = None
+        # (game_id, tags or None) changes made during a rebuild; None when not rebuilding
+        self._changes = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+
+    def configure(self, ttl=None):
+        if ttl is not None:
+            self.ttl = ttl
+
+    def load(self, tags_by_game):
+        """Replace the whole index from {game_id: tags}"""
+        postings = {}
+        by_game = {}
+        for game_id, tags in tags_by_game.items():
+            normalized = frozenset(normalize_tag(tag) for tag in tags or [])
+            by_game[game_id] = normalized
+            for tag in normalized:
+                postings.setdefault(tag, set()).add(game_id)
+        with self._lock:
+            self._postings = postings
+            self._tags_by_game = by_game
+            self._loaded_at = time.monotonic()
+            changes, self._changes = self._changes, None
+            for game_id, tags in changes or ():
+                self._apply(game_id, tags)
+
+    def refresh(self, metadata, live_ids=None):
+        """
+        Load from MongoDB if the index is empty or older than ttl. Returns
+        True if it reloaded. live_ids, if given, returns the ids of games
+        that still exist; metadata left behind by deleted games is skipped.
+        """
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < self.ttl:
+            return False
+        if metadata.db is None:
+            # Keep serving what we have rather than an empty index while Mongo is down
+            return False
+        if not self._reload_lock.acquire(blocking=False):
+            # Another thread is already rebuilding
+            return False
+        try:
+            with self._lock:
+                self._changes = []
+            try:
+                tags_by_game = metadata.all_tags()
+                if live_ids is not None:
+                    existing = live_ids()
+                    tags_by_game = {g: tags for g, tags in tags_by_game.items() if g in existing}
+            except Exception:
+                with self._lock:
+                    self._changes = None
+                raise
+            self.load(tags_by_game)
+        finally:
+            self._reload_lock.release()
+        return True
+
+    def set_tags(self, game_id, tags):
+        """Replace one game's tags"""
+        normalized = frozenset(normalize_tag(tag) for tag in tags or [])
+        with self._lock:
+            self._apply(game_id, normalized)
+            if self._changes is not None:
+                self._changes.append((game_id, normalized))
+
+    def remove_game(self, game_id):
+        with self._lock:
+            self._apply(game_id, None)
+            if self._changes is not None:
+                self._changes.append((game_id, None))
+
+    def _apply(self, game_id, tags):
+        self._unindex(game_id)
+        if tags:
+            self._tags_by_game[game_id] = tags
+            for tag in tags:
+                self._postings.setdefault(tag, set()).add(game_id)
+
+    def _unindex(self, game_id):
+        for tag in self._tags_by_game.pop(game_id, ()):
+            posting = self._postings.get(tag)
+            if posting is not None:
+                posting.discard(game_id)
+                if not posting:
+                    del self._postings[tag]
+
+    def clear(self):
+        with self._lock:
+            self._postings = {}
+            self._tags_by_game = {}
+            self._loaded_at = None
+            self._changes = None
+
+    def query(self, all_of=(), any_of=(), none_of=()):
+        """
+        Sorted ids of games that have every tag in all_of, at least one in
+        any_of and none in none_of. Empty groups are ignored; with no
+        positive tags at all, every tagged game is the starting set.
+        """
+        with self._lock:
+            if all_of:
+                postings = sorted((self._postings.get(normalize_tag(t), set()) for t in all_of), key=len)
+                result = set(postings[0])
+                for posting in postings[1:]:
+                    result &= posting
+            elif any_of:
+                result = set()
+            else:
+                result = set(self._tags_by_game)
+
+            if any_of:
+                union = set().union(*(self._postings.get(normalize_tag(t), ()) for t in any_of))
+                result = union if not all_of else result & union
+
+            for tag in none_of:
+                result -= self._postings.get(normalize_tag(tag), set())
+
+        return sorted(result)
+
+    def facets(self, game_ids, limit=20):
+        """{tag: number of the given games carrying it}, most common first"""
+        counts = Counter()
+        with self._lock:
+            for game_id in game_ids:
+                counts.update(self._tags_by_game.get(game_id, ()))
+        return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit])
+
+    def browse(self, all_of=(), any_of=(), none_of=(), page=1, per_page=20, facet_limit=20):
+        """One page of matching ids plus the total and facet counts over the whole result"""
+        ids = self.query(all_of, any_of, none_of)
+        start = (page - 1) * per_page
+        return {
+            'ids': ids[start:start + per_page],
+            'total': len(ids),
+            'facets': self.facets(ids, facet_limit)
+        }
+
+
+tag_index = TagIndex()
+
+
+def init_tags(app):
+    """Configure the tag index from app config"""
+    tag_index.configure(ttl=app.config.get('TAG_INDEX_TTL'))
@@ -0,0 +1,142 @@
+import uuid
+from datetime import datetime, timedelta
+import click
+from flask.cli import with_appcontext
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+from app import db
+from app.models import RefreshToken
+from app.principals import principals
+from app.versions import bump, token_scope
+
+ACCESS = 'access'
+REFRESH = 'refresh'
+
+
+class TokenService:
+    """
+    Signed, stateless bearer tokens for API clients that do not keep cookies.
+
+    A token carries the user id, role and the user's revocation epoch.
+    Checking one needs only the cached principal, never the users table;
+    revoking bumps the epoch so every token issued before stops working.
+    Access tokens are short lived. Refresh tokens are single use: each one
+    is recorded by jti and traded for a new pair exactly once, and trading
+    one in a second time (it was stolen, or replayed) revokes all of the
+    user's tokens.
+    """
+
+    def __init__(self, secret_key='dev-key', access_ttl=900, refresh_ttl=30 * 86400):
+        self.access_ttl = access_ttl
+        self.refresh_ttl = refresh_ttl
+        self._serializer = URLSafeTimedSerializer(secret_key, salt='gaming-api-token')
+
+    def configure(self, secret_key=None, access_ttl=None, refresh_ttl=None):
+        if secret_key is not None:
+            self._serializer = URLSafeTimedSerializer(secret_key, salt='gaming-api-token')
+        if access_ttl is not None:
+            self.access_ttl = access_ttl
+        if refresh_ttl is not None:
+            self.refresh_ttl = refresh_ttl
+
+    def issue(self, principal):
+        """Access/refresh token pair for a user or principal; records the refresh token, the caller commits"""
+        claims = {'uid': principal.id, 'role': principal.role, 'epoch': principal.token_epoch}
+        jti = uuid.uuid4().hex
+        db.session.add(RefreshToken(jti=jti, user_id=principal.id,
+                                    expires_at=datetime.utcnow() + timedelta(seconds=self.refresh_ttl)))
+        return {
+            'token_type': 'Bearer',
+            'access_token': self._serializer.dumps(dict(claims, typ=ACCESS)),
+            'refresh_token': self._serializer.dumps(dict(claims, typ=REFRESH, jti=jti)),
+            'expires_in': self.access_ttl
+        }
+
+    def verify(self, token, kind=ACCESS):
+        """Principal a token was issued to, or None if forged, expired, revoked or suspended"""
+        principal, _ = self._verify(token, kind)
+        return principal
+
+    def refresh(self, token):
+        """
+        Trade a refresh token for a new pair, or None if it is invalid or
+        already used. A reused token revokes every token of its user.
+        Commits.
+        """
+        principal, claims = self._verify(token, REFRESH)
+        if principal is None or not claims.get('jti'):
+            return None
+
+        now = datetime.utcnow()
+        taken = RefreshToken.query.filter(
+            RefreshToken.jti == claims['jti'],
+            RefreshToken.user_id == principal.id,
+            RefreshToken.used_at.is_(None)
+        ).update({RefreshToken.used_at: now}, synchronize_session=False)
+        if taken != 1:
+            if db.session.get(RefreshToken, claims['jti']) is not None:
+                self.revoke(principal.id)
+            db.session.commit()
+            return None
+
+        pair = self.issue(principal)
+        db.session.commit()
+        return pair
+
+    def _verify(self, token, kind):
+        max_age = self.access_ttl if kind == ACCESS else self.refresh_ttl
+        try:
+            claims = self._serializer.loads(token, max_age=max_age)
+        except BadSignature:
+            return None, None
+        if not isinstance(claims, dict) or claims.get('typ') != kind:
+            return None, None
+
+        principal = principals.load(claims['uid'])
+        if principal is None or principal.token_epoch != claims.get('epoch'):
+            return None, None
+        return principal, claims
+
+    def from_request(self, request):
+        """Principal for an 'Authorization: Bearer' header, if any"""
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not token:
+            return None
+        return self.verify(token.strip())
+
+    def revoke(self, user_id):
+        """Invalidate every token issued to a user so far; the caller commits"""
+        bump(token_scope(user_id))
+        principals.invalidate_on_commit(user_id)
+
+
+tokens = TokenService()
+
+
+def purge_expired(now=None):
+    """Delete refresh token records past their expiry. Returns rows removed."""
+    count = RefreshToken.query.filter(
+        RefreshToken.expires_at <= (now or datetime.utcnow())
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+@click.group('tokens')
+def tokens_cli():
+    """Maintain issued refresh tokens"""
+
+
+@tokens_cli.command('purge')
+@with_appcontext
+def purge_command():
+    """Delete refresh token records past REFRESH_TOKEN_TTL"""
+    click.echo(f'Removed {purge_expired()} expired refresh tokens')
+
+
+def init_tokens(app):
+    """Configure token signing from app config"""
+    tokens.configure(
+        secret_key=app.config['SECRET_KEY'],
+        access_ttl=app.config.get('ACCESS_TOKEN_TTL'),
+        refresh_ttl=app.config.get('REFRESH_TOKEN_TTL')
+    )
@@ -0,0 +1,132 @@
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import request, make_response
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.models import VersionStamp
+
+# Bumped by out-of-band maintenance (rebuild commands); part of every ETag
+GLOBAL_SCOPE = 'catalog'
+
+# Bumped with every principal invalidation; per-worker principal caches poll it
+PRINCIPALS_SCOPE = 'principals'
+
+_UPSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def game_scope(game_id):
+    return f'game:{game_id}'
+
+
+def metadata_scope(game_id):
+    return f'game:{game_id}:metadata'
+
+
+def reviews_scope(game_id):
+    return f'game:{game_id}:reviews'
+
+
+def listing_scope(genre=None):
+    return f'games:genre:{genre}' if genre else 'games'
+
+
+def token_scope(user_id):
+    """Revocation epoch of a user's access and refresh tokens"""
+    return f'user:{user_id}:tokens'
+
+
+def game_write_scopes(game_id, *genres):
+    """Everything a change to a game's row can make stale"""
+    scopes = [game_scope(game_id), listing_scope()]
+    scopes.extend(listing_scope(g) for g in {g for g in genres if g})
+    return scopes
+
+
+def bump(*scopes):
+    """Increment the given stamps inside the current transaction; the caller commits"""
+    scopes = sorted(set(scopes))
+    if not scopes:
+        return
+    now = datetime.utcnow()
+    insert = _UPSERTS.get(db.engine.dialect.name)
+
+    if insert is not None:
+        stmt = insert(VersionStamp).values([
+            {'scope': scope, 'version': 1, 'updated_at': now} for scope in scopes
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[VersionStamp.scope],
+            set_={'version': VersionStamp.version + 1, 'updated_at': now}
+        )
+        db.session.execute(stmt)
+        return
+
+    VersionStamp.query.filter(VersionStamp.scope.in_(scopes)).update(
+        {VersionStamp.version: VersionStamp.version + 1, VersionStamp.updated_at: now},
+        synchronize_session=False
+    )
+    existing = {s for (s,) in db.session.query(VersionStamp.scope).filter(VersionStamp.scope.in_(scopes))}
+    db.session.add_all(
+        VersionStamp(scope=scope, version=1, updated_at=now) for scope in scopes if scope not in existing
+    )
+
+
+def read(scopes):
+    """Get {scope: (version, updated_at)} in one query; unknown scopes are version 0"""
+    rows = VersionStamp.query.filter(VersionStamp.scope.in_(scopes)).all()
+    found = {row.scope: (row.version, row.updated_at) for row in rows}
+    return {scope: found.get(scope, (0, None)) for scope in scopes}
+
+
+def _etag(stamps):
+    parts = [f'{scope}={version}' for scope, (version, _) in sorted(stamps.items())]
+    # Different query strings are different representations of the same scopes
+    args = sorted(request.args.items(multi=True))
+    parts.append('&'.join(f'{k}={v}' for k, v in args))
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:20]
+
+
+def conditional(scopes_for):
+    """
+    Serve a GET view with a strong ETag and Last-Modified built from version stamps.
+
+    scopes_for receives the view's keyword arguments and returns the scopes the
+    response depends on. A matching If-None-Match (or, without one, a fresh
+    enough If-Modified-Since) short-circuits to 304 before the view runs.
+    Last-Modified only has whole seconds, so If-Modified-Since is not
+    trusted while the newest stamp is under a second old: another write in
+    that second would not change it.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            stamps = read(list(scopes_for(**kwargs)) + [GLOBAL_SCOPE])
+            etag = _etag(stamps)
+            times = [updated for _, updated in stamps.values() if updated is not None]
+            newest = max(times) if times else None
+            last_modified = newest.replace(microsecond=0) if newest else None
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = (
+                    since is not None and last_modified is not None
+                    and last_modified <= since.replace(tzinfo=None)
+                    and datetime.utcnow() - newest >= timedelta(seconds=1)
+                )
+
+            if not_modified:
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            return response
+        return wrapper
+    return decorator
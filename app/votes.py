@@ -0,0 +1,171 @@
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam, exists, func, or_, select
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.analytics_buffer import CounterBuffer
+from app.models import Review, ReviewVote
+from app.versions import bump, reviews_scope
+
+HELPFUL = 'helpful'
+
+
+class AlreadyVoted(Exception):
+    """The user has already marked this review helpful"""
+
+
+class HelpfulVotes:
+    """
+    Records "helpful" votes on reviews.
+
+    Each vote inserts a (review, user) row whose unique constraint rejects
+    repeat votes from any worker. The helpful_count increments themselves
+    are summed in a CounterBuffer and written as one
+    UPDATE ... SET helpful_count = helpful_count + n per review, so a review
+    getting many votes is updated once per flush instead of once per vote,
+    and concurrent votes cannot overwrite each other.
+    """
+
+    def __init__(self, interval_ms=1000, max_events=1000, max_keys=10000):
+        self.app = None
+        self.buffer = CounterBuffer(self._write, interval_ms=interval_ms,
+                                    max_events=max_events, max_keys=max_keys)
+
+    def configure(self, app, interval_ms=None, max_events=None, max_keys=None):
+        self.app = app
+        if interval_ms is not None:
+            self.buffer.interval = interval_ms / 1000.0
+        if max_events is not None:
+            self.buffer.max_events = max_events
+        if max_keys is not None:
+            self.buffer.max_keys = max_keys
+
+    def vote(self, review, user_id):
+        """
+        Record the user's vote and buffer the increment. Returns the count
+        including votes not yet flushed. Raises AlreadyVoted.
+        """
+        db.session.add(ReviewVote(review_id=review.id, user_id=user_id))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            raise AlreadyVoted()
+
+        # Flushes write through the app that recorded the votes
+        self.app = current_app._get_current_object()
+        self.buffer.add(review.id, HELPFUL)
+        return self.count(review)
+
+    def count(self, review):
+        """Stored count plus this worker's pending votes"""
+        return (review.helpful_count or 0) + self.buffer.pending(review.id).get(HELPFUL, 0)
+
+    def flush(self):
+        return self.buffer.flush()
+
+    def _write(self, batch):
+        # Runs on the flusher thread as well as inline, so it needs its own app context
+        with self.app.app_context():
+            rows = [{'review_id': review_id, 'amount': fields.get(HELPFUL, 0)}
+                    for review_id, fields in batch.items()]
+            table = Review.__table__
+            db.session.execute(
+                table.update()
+                .where(table.c.id == bindparam('review_id'))
+                # A vote is not an edit: keep updated_at instead of firing its onupdate
+                .values(helpful_count=func.coalesce(table.c.helpful_count, 0) + bindparam('amount'),
+                        updated_at=table.c.updated_at),
+                rows
+            )
+            game_ids = {
+                game_id for (game_id,) in
+                db.session.query(Review.game_id).filter(Review.id.in_(list(batch)))
+            }
+            if game_ids:
+                bump(*(reviews_scope(game_id) for game_id in game_ids))
+            db.session.commit()
+
+
+helpful_votes = HelpfulVotes()
+
+
+def init_votes(app):
+    """Configure helpful-vote buffering from app config"""
+    helpful_votes.configure(
+        app,
+        interval_ms=app.config.get('HELPFUL_VOTE_FLUSH_INTERVAL_MS'),
+        max_events=app.config.get('HELPFUL_VOTE_FLUSH_MAX_EVENTS'),
+        max_keys=app.config.get('HELPFUL_VOTE_BUFFER_MAX_KEYS')
+    )
+
+
+def find_helpful_drift(settle_seconds=60):
+    """
+    Reviews whose helpful_count disagrees with their review_votes rows, as
+    [(review id, stored count, vote rows)]. Reviews voted on in the last
+    settle_seconds are skipped: their increments may still be buffered.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=settle_seconds)
+    votes = db.session.query(
+        ReviewVote.review_id,
+        func.count(ReviewVote.id).label('votes'),
+        func.max(ReviewVote.created_at).label('latest')
+    ).group_by(ReviewVote.review_id).subquery()
+    counted = func.coalesce(votes.c.votes, 0)
+
+    return [tuple(row) for row in db.session.query(Review.id, func.coalesce(Review.helpful_count, 0), counted)
+            .outerjoin(votes, votes.c.review_id == Review.id)
+            .filter(or_(votes.c.latest.is_(None), votes.c.latest < cutoff))
+            .filter(func.coalesce(Review.helpful_count, 0) != counted)
+            .order_by(Review.id)]
+
+
+def fix_helpful_counts(review_ids, settle_seconds=60):
+    """Set helpful_count to the number of vote rows for these reviews. Returns rows updated."""
+    if not review_ids:
+        return 0
+    cutoff = datetime.utcnow() - timedelta(seconds=settle_seconds)
+    table = Review.__table__
+    votes = ReviewVote.__table__
+
+    result = db.session.execute(
+        table.update()
+        .where(table.c.id.in_(review_ids))
+        # A vote since the check may still be buffered; leave its review for the next run
+        .where(~exists().where(votes.c.review_id == table.c.id, votes.c.created_at >= cutoff))
+        .values(helpful_count=select(func.count()).where(votes.c.review_id == table.c.id).scalar_subquery(),
+                updated_at=table.c.updated_at)
+    )
+    game_ids = {game_id for (game_id,) in db.session.query(Review.game_id).filter(Review.id.in_(review_ids))}
+    if game_ids:
+        bump(*(reviews_scope(game_id) for game_id in game_ids))
+    db.session.commit()
+    return result.rowcount
+
+
+@click.group('votes')
+def votes_cli():
+    """Maintain helpful-vote counts"""
+
+
+@votes_cli.command('check')
+@click.option('--fix', is_flag=True, help='Recount the reviews that drifted')
+@click.option('--settle-seconds', default=60, show_default=True,
+              help='Skip reviews voted on this recently; their votes may not be flushed yet')
+@with_appcontext
+def check_command(fix, settle_seconds):
+    """Report reviews whose helpful_count disagrees with their votes"""
+    drifted = find_helpful_drift(settle_seconds)
+    if not drifted:
+        click.echo('Helpful counts are consistent')
+        return
+
+    click.echo(f'{len(drifted)} reviews drifted: ' + ', '.join(
+        f'{review_id} ({stored} stored, {counted} votes)' for review_id, stored, counted in drifted
+    ))
+    if fix:
+        count = fix_helpful_counts([review_id for review_id, _, _ in drifted], settle_seconds)
+        click.echo(f'Recounted helpful votes for {count} reviews')
@@ -0,0 +1,222 @@
+"""
+Load benchmark for the hot API endpoints.
+
+    python -m benchmarks.run                        # tiny dataset, compare to baseline
+    python -m benchmarks.run --scale full           # 50k games, 500k users, 5M reviews/orders
+    python -m benchmarks.run --update-baseline      # record current numbers as the baseline
+
+The dataset is seeded into its own SQLite file (BENCH_DATABASE_URI, default
+/tmp/gaming_bench.db) and reused between runs of the same scale. Every
+endpoint is driven through the Flask test client; latency percentiles,
+throughput and SQL statements per request are reported and compared against
+benchmarks/baseline.json. The exit code is 1 when something regressed.
+
+A baseline update that makes a metric worse needs a reason: add it under
+"notes" in baseline.json, keyed by endpoint. Updates keep existing notes.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+DEFAULT_DB_URI = 'sqlite:////tmp/gaming_bench.db'
+
+# Allowed slowdown against the baseline before a run counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class QueryCounter:
+    """Counts SQL statements executed on an engine"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._record)
+
+    def _record(self, *args):
+        self.count += 1
+
+
+def build_scenarios(scale):
+    from benchmarks.seed import HOT_GAME_ID, LIBRARY_SIZE
+
+    games = scale['games']
+    deep_page = max(games // 10 - 1, 1)
+    state = {'next_game': min(LIBRARY_SIZE, games) + 1}
+
+    def deep_cursor(client):
+        from app.pagination import encode_cursor
+        return client.get(f'/api/games?limit=10&cursor={encode_cursor(games - 20)}')
+
+    def checkout(client):
+        game_id = state['next_game']
+        state['next_game'] = game_id + 1 if game_id < games else min(LIBRARY_SIZE, games) + 1
+        return client.post('/api/purchases/checkout', json={'game_id': game_id})
+
+    return [
+        ('get_games first page', lambda c: c.get('/api/games')),
+        ('get_games deep offset page', lambda c: c.get(f'/api/games?page={deep_page}')),
+        ('get_games deep cursor page', deep_cursor),
+        ('get_games genre filter', lambda c: c.get('/api/games?genre=RPG&limit=20')),
+        ('get_game_reviews hot game', lambda c: c.get(f'/api/reviews/game/{HOT_GAME_ID}')),
+        ('get_game_reviews helpful sort', lambda c: c.get(f'/api/reviews/game/{HOT_GAME_ID}?sort=helpful')),
+        ('purchase_history', lambda c: c.get('/api/purchases/history')),
+        ('checkout', checkout),
+    ]
+
+
+def run_scenario(client, counter, fn, requests, warmup):
+    for _ in range(warmup):
+        fn(client)
+
+    latencies = []
+    queries = 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        before = counter.count
+        t0 = time.perf_counter()
+        response = fn(client)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        queries += counter.count - before
+        if response.status_code >= 500:
+            raise RuntimeError(f'{response.status_code}: {response.get_data(as_text=True)[:200]}')
+    elapsed = time.perf_counter() - started
+
+    return {
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(statistics.mean(latencies), 3),
+        'throughput_rps': round(requests / elapsed, 1),
+        'queries_per_request': round(queries / requests, 2),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of human readable regressions"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(
+                f'{name}: p95 {current["p95_ms"]}ms vs baseline {previous["p95_ms"]}ms'
+            )
+        if current['queries_per_request'] > previous['queries_per_request']:
+            regressions.append(
+                f'{name}: {current["queries_per_request"]} queries/request vs baseline '
+                f'{previous["queries_per_request"]}'
+            )
+    return regressions
+
+
+def main(argv=None):
+    from benchmarks.seed import SCALES, BENCH_PASSWORD, LIBRARY_SIZE
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='tiny')
+    parser.add_argument('--games', type=int)
+    parser.add_argument('--users', type=int)
+    parser.add_argument('--reviews', type=int)
+    parser.add_argument('--orders', type=int)
+    parser.add_argument('--requests', type=int, default=200, help='Timed requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--reseed', action='store_true', help='Seed even if the dataset already exists')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    scale = dict(SCALES[args.scale])
+    for key in scale:
+        if getattr(args, key):
+            scale[key] = getattr(args, key)
+
+    os.environ['SQLALCHEMY_DATABASE_URI'] = os.environ.get('BENCH_DATABASE_URI', DEFAULT_DB_URI)
+    os.environ.setdefault('SLOW_REQUEST_MS', '100000')
+
+    from main import app, db
+    from app.models import Order, Entitlement
+    from benchmarks.seed import seed
+
+    app.config['TESTING'] = True
+    marker = os.environ['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '') + '.scale.json'
+
+    with app.app_context():
+        seeded = None
+        if os.path.exists(marker):
+            with open(marker) as f:
+                seeded = json.load(f)
+
+        if args.reseed or seeded != scale:
+            print(f'Seeding {scale} ...')
+            seed(db, **scale)
+            with open(marker, 'w') as f:
+                json.dump(scale, f)
+
+        # Undo purchases made by the checkout scenario of earlier runs; without
+        # the entitlements every later checkout would answer 'already owned'
+        Entitlement.query.filter(Entitlement.user_id == 1, Entitlement.game_id > LIBRARY_SIZE).delete(synchronize_session=False)
+        Order.query.filter(Order.user_id == 1, Order.game_id > LIBRARY_SIZE).delete(synchronize_session=False)
+        db.session.commit()
+
+        counter = QueryCounter(db.engine)
+        client = app.test_client()
+        response = client.post('/auth/login', json={'email_or_username': 'user1', 'password': BENCH_PASSWORD})
+        if response.status_code != 200:
+            raise RuntimeError(f'Benchmark login failed: {response.get_json()}')
+
+        results = {}
+        print(f'\n{"endpoint":34} {"p50":>9} {"p95":>9} {"p99":>9} {"req/s":>9} {"queries":>8}')
+        for name, fn in build_scenarios(scale):
+            result = run_scenario(client, counter, fn, args.requests, args.warmup)
+            results[name] = result
+            print(f'{name:34} {result["p50_ms"]:8.2f}ms {result["p95_ms"]:8.2f}ms '
+                  f'{result["p99_ms"]:8.2f}ms {result["throughput_rps"]:9.1f} {result["queries_per_request"]:8.2f}')
+
+    baseline = {}
+    notes = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        notes = stored.get('notes', {})
+        if stored.get('scale') == scale:
+            baseline = stored.get('results', {})
+        else:
+            print(f'\nBaseline was recorded at {stored.get("scale")}; not comparing.')
+
+    if args.update_baseline:
+        # notes: why each metric that got worse was accepted; kept across updates, edited by hand
+        with open(args.baseline, 'w') as f:
+            json.dump({'scale': scale, 'requests': args.requests, 'results': results, 'notes': notes},
+                      f, indent=2)
+            f.write('\n')
+        print(f'\nBaseline written to {args.baseline}')
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print('\nRegressions:')
+        for line in regressions:
+            print(f'  {line}')
+        return 1
+
+    if baseline:
+        print('\nNo regressions against baseline.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
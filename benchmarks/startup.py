@@ -0,0 +1,85 @@
+"""
+Cold start benchmark: how long a fresh worker takes to import main and build the app.
+
+    python -m benchmarks.startup                 # 5 cold starts, fail if the median is over budget
+    python -m benchmarks.startup --budget-ms 400
+
+Each sample is a new interpreter, so nothing is shared between runs. The
+import must not connect to SQL or MongoDB; the probe reports whether it did.
+The exit code is 1 when the median exceeds the budget or a connection was opened.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Median cold import + create_app allowed, in milliseconds
+DEFAULT_BUDGET_MS = 1000
+
+PROBE = '''
+import json, time
+started = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+connections = []
+event.listen(Pool, 'connect', lambda *args: connections.append(1))
+
+import main
+elapsed = (time.perf_counter() - started) * 1000
+
+from app.db_mongo import mongo
+from app.passwords import passwords
+print(json.dumps({
+    'ms': elapsed,
+    'mongo_client': mongo._client is not None,
+    'hash_pool': passwords._pool is not None,
+    'sql_connections': len(connections)
+}))
+'''
+
+
+def cold_start(env):
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE], env=env, capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    # Point at a database that may not exist: a cold start must not need it
+    env.setdefault('SQLALCHEMY_DATABASE_URI', 'sqlite:////tmp/gaming_startup_probe.db')
+
+    samples = [cold_start(env) for _ in range(args.runs)]
+    times = [s['ms'] for s in samples]
+    median = statistics.median(times)
+    print(f'cold start: median {median:.1f}ms, min {min(times):.1f}ms, max {max(times):.1f}ms '
+          f'over {args.runs} runs (budget {args.budget_ms:.0f}ms)')
+
+    problems = []
+    if median > args.budget_ms:
+        problems.append(f'median {median:.1f}ms is over the {args.budget_ms:.0f}ms budget')
+    for key, label in (('mongo_client', 'MongoDB client'), ('hash_pool', 'password hashing pool')):
+        if any(s[key] for s in samples):
+            problems.append(f'{label} was created during startup')
+    if any(s['sql_connections'] for s in samples):
+        problems.append('a SQL connection was opened during startup')
+
+    if problems:
+        print('\nStartup regressions:')
+        for line in problems:
+            print(f'  {line}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
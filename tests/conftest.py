@@ -0,0 +1,7 @@
+from main import app
+from app.schema import create_schema
+
+# The app no longer creates tables when imported; the script-style test
+# modules (test_auth, test_games, test_purchases) need them at collection time
+with app.app_context():
+    create_schema()
@@ -0,0 +1,111 @@
+import threading
+from app.analytics_buffer import CounterBuffer
+
+class RecordingSink:
+    """Collects flushed batches like bulk_write would receive them"""
+
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+
+    def __call__(self, batch):
+        if self.fail:
+            raise RuntimeError('mongo down')
+        self.batches.append(batch)
+
+def test_increments_coalesce_per_game():
+    """Test many events for a hot game become one write"""
+    sink = RecordingSink()
+    buffer = CounterBuffer(sink, interval_ms=60000, max_events=10000)
+
+    for _ in range(1000):
+        buffer.add(1, 'views')
+    buffer.add(1, 'downloads')
+    buffer.add(2, 'views')
+
+    assert sink.batches == []
+    assert buffer.pending(1) == {'views': 1000, 'downloads': 1}
+
+    assert buffer.flush() == 2
+    assert sink.batches == [{1: {'views': 1000, 'downloads': 1}, 2: {'views': 1}}]
+    assert buffer.pending(1) == {}
+    buffer.close()
+
+def test_flush_after_max_events():
+    """Test the buffer flushes itself once max_events is reached"""
+    sink = RecordingSink()
+    buffer = CounterBuffer(sink, interval_ms=60000, max_events=10)
+
+    for _ in range(10):
+        buffer.add(7, 'views')
+
+    assert sink.batches == [{7: {'views': 10}}]
+    buffer.close()
+
+def test_background_flush_on_interval():
+    """Test the background thread flushes without being asked"""
+    flushed = threading.Event()
+    buffer = CounterBuffer(lambda batch: flushed.set(), interval_ms=20)
+
+    buffer.add(3, 'views')
+
+    assert flushed.wait(2)
+    buffer.close()
+
+def test_failed_flush_is_retried_and_bounded():
+    """Test failed writes are kept for later but memory stays bounded"""
+    sink = RecordingSink()
+    buffer = CounterBuffer(sink, interval_ms=60000, max_events=10000, max_keys=3)
+
+    sink.fail = True
+    buffer.add(1, 'views')
+    buffer.add(2, 'views')
+    try:
+        buffer.flush()
+    except RuntimeError:
+        pass
+    assert buffer.pending(1) == {'views': 1}
+
+    sink.fail = False
+    buffer.close()
+    assert sink.batches == [{1: {'views': 1}, 2: {'views': 1}}]
+
+def test_inline_flush_failure_does_not_raise():
+    """Test a full buffer whose store is down keeps the counts instead of failing the caller"""
+    sink = RecordingSink()
+    buffer = CounterBuffer(sink, interval_ms=60000, max_events=2)
+
+    sink.fail = True
+    buffer.add(5, 'views')
+    buffer.add(5, 'views')
+    assert buffer.pending(5) == {'views': 2}
+
+    sink.fail = False
+    buffer.close()
+    assert sink.batches == [{5: {'views': 2}}]
+
+def test_retry_reuses_the_failed_batch():
+    """Test a failed batch is retried whole, with its id, before newer counts"""
+    sink = RecordingSink()
+    attempts = []
+    buffer = CounterBuffer(lambda batch: (attempts.append(batch.id), sink(batch)),
+                           interval_ms=60000, max_events=10000, max_keys=2)
+
+    sink.fail = True
+    buffer.add(1, 'views')
+    try:
+        buffer.flush()
+    except RuntimeError:
+        pass
+    buffer.add(1, 'views')
+    buffer.add(2, 'views')
+    buffer.add(3, 'views')
+    assert buffer.pending(1) == {'views': 2}
+    assert buffer.dropped == 1
+
+    sink.fail = False
+    assert buffer.flush() == 3
+    first, second = sink.batches
+    assert first == {1: {'views': 1}} and first.id == attempts[0]
+    assert second == {1: {'views': 1}, 2: {'views': 1}} and second.id != first.id
+    buffer.close()
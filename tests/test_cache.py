@@ -0,0 +1,146 @@
+import time
+import pytest
+from main import app, db
+from app.models import User
+from app.cache import MemoryBackend, CatalogCache, catalog_cache
+
+@pytest.fixture
+def client():
+    """Create test client logged in as a developer"""
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        dev = User(email='cachedev@test.com', username='cachedev', role='developer')
+        dev.set_password('DevPass123')
+        db.session.add(dev)
+        db.session.commit()
+
+        client = app.test_client()
+        client.post('/auth/login', json={'email_or_username': 'cachedev', 'password': 'DevPass123'})
+        yield client
+        db.session.remove()
+        db.drop_all()
+
+def test_memory_backend_lru_and_ttl():
+    """Test the memory backend evicts least recently used and expired entries"""
+    backend = MemoryBackend(max_entries=2)
+    backend.set('a', 1)
+    backend.set('b', 2)
+    backend.get('a')
+    backend.set('c', 3)
+
+    assert backend.get('b') is None
+    assert backend.get('a') == 1
+    assert backend.evictions == 1
+
+    backend.set('short', 1, ttl=0.01)
+    time.sleep(0.02)
+    assert backend.get('short') is None
+
+def test_game_detail_cached_and_invalidated(client):
+    """Test repeated detail reads hit the cache until the game is edited"""
+    game_id = client.post('/api/games', json={'title': 'Cached', 'genre': 'RPG'}).get_json()['id']
+    before = catalog_cache.stats()
+
+    client.get(f'/api/games/{game_id}')
+    client.get(f'/api/games/{game_id}')
+    stats = catalog_cache.stats()
+    assert stats['misses'] == before['misses'] + 1
+    assert stats['hits'] == before['hits'] + 1
+
+    client.put(f'/api/games/{game_id}', json={'title': 'Renamed'})
+    assert client.get(f'/api/games/{game_id}').get_json()['title'] == 'Renamed'
+
+def test_listing_invalidation_is_scoped_to_genre(client):
+    """Test a write only invalidates listings of the genres it touches"""
+    rpg = client.post('/api/games', json={'title': 'Quest', 'genre': 'RPG'}).get_json()['id']
+    client.post('/api/games', json={'title': 'Racer', 'genre': 'Racing'})
+
+    client.get('/api/games?genre=RPG')
+    client.get('/api/games?genre=Racing')
+
+    client.put(f'/api/games/{rpg}', json={'genre': 'Strategy'})
+
+    hits = catalog_cache.stats()['hits']
+    client.get('/api/games?genre=Racing')
+    assert catalog_cache.stats()['hits'] == hits + 1
+
+    assert client.get('/api/games?genre=RPG').get_json()['total'] == 0
+    assert client.get('/api/games?genre=Strategy').get_json()['total'] == 1
+    assert client.get('/api/games').get_json()['games'][0]['genre'] == 'Strategy'
+
+def test_delete_drops_cached_game(client):
+    """Test a deleted game is no longer served from cache"""
+    game_id = client.post('/api/games', json={'title': 'Doomed'}).get_json()['id']
+    client.get(f'/api/games/{game_id}')
+
+    client.delete(f'/api/games/{game_id}')
+    assert client.get(f'/api/games/{game_id}').status_code == 404
+
+def test_metadata_many_caches_per_game():
+    """Test bulk metadata reads only load uncached games and honour invalidation"""
+    cache = CatalogCache()
+    store = {1: {'game_id': 1, 'tags': ['rpg']}, 2: {'game_id': 2, 'tags': ['action']}}
+    calls = []
+
+    def loader(ids):
+        calls.append(sorted(ids))
+        return {i: dict(store[i]) for i in ids if i in store}
+
+    assert cache.metadata_many([1, 2, 3], ['tags'], loader) == {1: store[1], 2: store[2], 3: None}
+    assert cache.metadata_many([1, 2, 3], ['tags'], loader)[3] is None
+    assert calls == [[1, 2, 3]]
+
+    # Another field set is cached separately
+    cache.metadata_many([1], ['tags', 'videos'], loader)
+    assert calls[-1] == [1]
+
+    store[2] = {'game_id': 2, 'tags': ['puzzle']}
+    cache.invalidate_metadata(2)
+    assert cache.metadata_many([1, 2], ['tags'], loader)[2]['tags'] == ['puzzle']
+    assert calls[-1] == [2]
+
+    # An unavailable source is not cached
+    assert cache.metadata_many([4], ['tags'], lambda ids: None) is None
+    assert cache.metadata_many([4], ['tags'], loader) == {4: None}
+
+class CountingBackend(MemoryBackend):
+    """MemoryBackend that counts calls, each of which would be a Redis round trip"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def get_many(self, keys):
+        self.calls.append('get_many')
+        return super().get_many(keys)
+
+    def set_many(self, values, ttl=None):
+        self.calls.append('set_many')
+        return super().set_many(values, ttl)
+
+    def counter_many(self, keys):
+        self.calls.append('counter_many')
+        return super().counter_many(keys)
+
+def test_metadata_many_batches_backend_calls():
+    """Test a bulk read costs a fixed number of backend calls however many ids it asks for"""
+    backend = CountingBackend()
+    cache = CatalogCache(backend=backend)
+    ids = list(range(1, 51))
+
+    cache.metadata_many(ids, ['tags'], lambda missing: {i: {'game_id': i} for i in missing})
+    assert backend.calls == ['counter_many', 'get_many', 'set_many']
+
+    backend.calls.clear()
+    assert len(cache.metadata_many(ids, ['tags'], lambda missing: {})) == 50
+    assert backend.calls == ['counter_many', 'get_many']
+
+def test_bulk_metadata_validation(client):
+    """Test the bulk metadata endpoint rejects bad ids and fields"""
+    assert client.get('/api/games/metadata').status_code == 400
+    assert client.get('/api/games/metadata?ids=1,x').status_code == 400
+    assert client.get('/api/games/metadata?ids=1&fields=password').status_code == 400
+    assert client.get('/api/games/metadata?ids=' + ','.join(map(str, range(101)))).status_code == 400
@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy import event
+from main import app, db
+from app.models import User, Game, Order, Entitlement
+
+@pytest.fixture
+def client():
+    """Create test client logged in as a player, with a catalog of 30 games"""
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        dev = User(email='cartdev@test.com', username='cartdev', role='developer')
+        dev.set_password('DevPass123')
+        player = User(email='shopper@test.com', username='shopper')
+        player.set_password('Password123')
+        db.session.add_all([dev, player])
+        db.session.commit()
+        db.session.add_all([Game(title=f'Bundle {i}', price=2.5, developer_id=dev.id) for i in range(30)])
+        db.session.commit()
+
+        client = app.test_client()
+        client.post('/auth/login', json={'email_or_username': 'shopper', 'password': 'Password123'})
+        yield client
+        db.session.remove()
+        db.drop_all()
+
+def all_game_ids():
+    with app.app_context():
+        return [g.id for g in Game.query.order_by(Game.id)]
+
+def count_statements(fn):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return result, len(statements)
+
+def test_cart_reports_each_item(client):
+    """Test a cart mixes purchased, owned, missing and duplicate items"""
+    ids = all_game_ids()
+    client.post('/api/purchases/checkout', json={'game_id': ids[0]})
+
+    response = client.post('/api/purchases/cart/checkout', json={'game_ids': [ids[0], ids[1], 99999, ids[1]]})
+    assert response.status_code == 201
+    data = response.get_json()
+
+    assert [item['status'] for item in data['items']] == ['already_owned', 'purchased', 'not_found', 'duplicate']
+    assert data['items'][1]['order']['game_id'] == ids[1]
+    assert data['total_paid'] == 2.5
+
+    with app.app_context():
+        assert Order.query.count() == 2
+        assert Entitlement.query.count() == 2
+
+def test_cart_query_count_does_not_grow_with_size(client):
+    """Test buying 25 games costs no more statements than buying 2"""
+    ids = all_game_ids()
+
+    client.post('/api/purchases/cart/checkout', json={'game_ids': ids[:1]})
+    _, small = count_statements(lambda: client.post('/api/purchases/cart/checkout', json={'game_ids': ids[1:3]}))
+    response, large = count_statements(lambda: client.post('/api/purchases/cart/checkout', json={'game_ids': ids[3:28]}))
+
+    assert response.status_code == 201
+    assert len(response.get_json()['items']) == 25
+    assert large == small
+
+    library = client.get('/api/purchases/library').get_json()
+    assert library['total'] == 28
+
+def test_cart_with_nothing_to_buy(client):
+    """Test a cart of owned games purchases nothing"""
+    ids = all_game_ids()
+    client.post('/api/purchases/cart/checkout', json={'game_ids': ids[:3]})
+
+    response = client.post('/api/purchases/cart/checkout', json={'game_ids': ids[:3]})
+    assert response.status_code == 400
+    assert {item['status'] for item in response.get_json()['items']} == {'already_owned'}
+
+def test_cart_validation(client):
+    """Test malformed carts are rejected"""
+    assert client.post('/api/purchases/cart/checkout', json={}).status_code == 400
+    assert client.post('/api/purchases/cart/checkout', json={'game_ids': ['x']}).status_code == 400
+    assert client.post('/api/purchases/cart/checkout', json={'game_ids': list(range(101))}).status_code == 400
@@ -0,0 +1,104 @@
+import pytest
+from main import app, db
+from app.ownership import ownership
+from datetime import datetime, timedelta
+from app.models import User, Order, VersionStamp
+
+@pytest.fixture
+def client():
+    """Create test client logged in as a developer who owns a game"""
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        dev = User(email='etagdev@test.com', username='etagdev', role='developer')
+        dev.set_password('DevPass123')
+        db.session.add(dev)
+        db.session.commit()
+
+        client = app.test_client()
+        client.post('/auth/login', json={'email_or_username': 'etagdev', 'password': 'DevPass123'})
+        yield client
+        db.session.remove()
+        db.drop_all()
+
+def revalidate(client, url, etag):
+    return client.get(url, headers={'If-None-Match': etag})
+
+def test_unchanged_game_returns_304(client):
+    """Test a repeat request with the ETag gets an empty 304"""
+    game_id = client.post('/api/games', json={'title': 'Tagged', 'genre': 'RPG'}).get_json()['id']
+
+    first = client.get(f'/api/games/{game_id}')
+    assert first.status_code == 200
+    assert first.headers['ETag']
+    assert first.headers['Last-Modified']
+
+    second = revalidate(client, f'/api/games/{game_id}', first.headers['ETag'])
+    assert second.status_code == 304
+    assert second.data == b''
+    assert second.headers['ETag'] == first.headers['ETag']
+
+def test_write_changes_etag(client):
+    """Test editing a game changes its ETag and its listing's ETag"""
+    game_id = client.post('/api/games', json={'title': 'Before', 'genre': 'RPG'}).get_json()['id']
+    detail = client.get(f'/api/games/{game_id}').headers['ETag']
+    listing = client.get('/api/games?genre=RPG').headers['ETag']
+    other = client.get('/api/games?genre=Racing').headers['ETag']
+
+    client.put(f'/api/games/{game_id}', json={'title': 'After'})
+
+    response = revalidate(client, f'/api/games/{game_id}', detail)
+    assert response.status_code == 200
+    assert response.get_json()['title'] == 'After'
+    assert revalidate(client, '/api/games?genre=RPG', listing).status_code == 200
+    assert revalidate(client, '/api/games?genre=Racing', other).status_code == 304
+
+def test_query_args_are_separate_representations(client):
+    """Test page 1 and page 2 do not share an ETag"""
+    first = client.get('/api/games?page=1').headers['ETag']
+    second = client.get('/api/games?page=2&per_page=5')
+    assert second.headers.get('ETag') != first
+
+def test_reviews_etag_follows_review_writes(client):
+    """Test the review list ETag changes when a review is added"""
+    game_id = client.post('/api/games', json={'title': 'Reviewed'}).get_json()['id']
+    with app.app_context():
+        dev = User.query.filter_by(username='etagdev').first()
+        db.session.add(Order(user_id=dev.id, game_id=game_id, amount_paid=0, status='completed'))
+        db.session.commit()
+        ownership.backfill()
+
+    etag = client.get(f'/api/reviews/game/{game_id}').headers['ETag']
+    assert revalidate(client, f'/api/reviews/game/{game_id}', etag).status_code == 304
+
+    client.post(f'/api/reviews/{game_id}', json={'rating': 4})
+    response = revalidate(client, f'/api/reviews/game/{game_id}', etag)
+    assert response.status_code == 200
+    assert response.get_json()['total'] == 1
+
+def age_stamps(seconds):
+    """Move every version stamp into the past, as if the last write was `seconds` ago"""
+    with app.app_context():
+        VersionStamp.query.update({VersionStamp.updated_at: datetime.utcnow() - timedelta(seconds=seconds)})
+        db.session.commit()
+
+def test_if_modified_since(client):
+    """Test Last-Modified round-trips through If-Modified-Since"""
+    game_id = client.post('/api/games', json={'title': 'Dated'}).get_json()['id']
+    age_stamps(5)
+    last_modified = client.get(f'/api/games/{game_id}').headers['Last-Modified']
+
+    response = client.get(f'/api/games/{game_id}', headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 304
+
+def test_if_modified_since_within_the_same_second(client):
+    """Test a second write in the same second as Last-Modified is not answered with 304"""
+    game_id = client.post('/api/games', json={'title': 'Busy'}).get_json()['id']
+    last_modified = client.get(f'/api/games/{game_id}').headers['Last-Modified']
+
+    client.put(f'/api/games/{game_id}', json={'title': 'Busier'})
+    response = client.get(f'/api/games/{game_id}', headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 200
+    assert response.get_json()['title'] == 'Busier'
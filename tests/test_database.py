@@ -0,0 +1,91 @@
+import os
+import pytest
+from sqlalchemy import text
+from main import app, db
+from app import create_app
+from app.cache import catalog_cache
+from flask import g
+from app.database import REPLICA, engine_options, primary
+from app.models import User, Game
+
+PRIMARY_PATH = '/tmp/gaming_routing_primary.db'
+REPLICA_PATH = '/tmp/gaming_routing_replica.db'
+
+@pytest.fixture
+def routed_app():
+    """Create an app with a primary and a replica that hold different games"""
+    for path in (PRIMARY_PATH, REPLICA_PATH):
+        if os.path.exists(path):
+            os.remove(path)
+
+    routed = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{PRIMARY_PATH}',
+        'SQLALCHEMY_REPLICA_URI': f'sqlite:///{REPLICA_PATH}',
+    })
+    with routed.app_context():
+        db.create_all()
+        db.metadata.create_all(routed.extensions[REPLICA])
+
+        dev = User(email='route@test.com', username='routedev', role='developer')
+        dev.set_password('DevPass123')
+        db.session.add(dev)
+        db.session.add(Game(title='Primary Game', developer_id=1))
+        db.session.commit()
+        with routed.extensions[REPLICA].begin() as conn:
+            conn.execute(text("INSERT INTO games (title, price, rating, is_featured) VALUES ('Replica Game', 0, 0, 0)"))
+
+    catalog_cache.clear()
+    yield routed
+
+    with routed.app_context():
+        db.session.remove()
+        for engine in list(db.engines.values()) + [routed.extensions[REPLICA]]:
+            engine.dispose()
+    catalog_cache.clear()
+
+def test_sqlite_pragmas_applied():
+    """Test every SQLite connection runs in WAL mode with the configured pragmas"""
+    with app.app_context():
+        assert db.session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert db.session.execute(text('PRAGMA synchronous')).scalar() == 1
+        assert db.session.execute(text('PRAGMA busy_timeout')).scalar() == app.config['SQLITE_BUSY_TIMEOUT_MS']
+
+def test_engine_options_by_backend():
+    """Test pool settings are passed where the pool accepts them"""
+    config = {'DB_POOL_SIZE': 7, 'DB_MAX_OVERFLOW': 3}
+    assert engine_options('postgresql://db/gaming', config)['pool_size'] == 7
+    assert engine_options('sqlite:////tmp/x.db', config)['max_overflow'] == 3
+    assert 'pool_size' not in engine_options('sqlite://', config)
+
+def test_read_only_views_use_replica(routed_app):
+    """Test reads inside read_only go to the replica, other reads and writes to the primary"""
+    with routed_app.test_request_context('/api/games'):
+        g.db_read_only = True
+        assert [game.title for game in Game.query.all()] == ['Replica Game']
+        with primary():
+            assert [game.title for game in Game.query.all()] == ['Primary Game']
+        db.session.remove()
+
+    client = routed_app.test_client()
+    client.post('/auth/login', json={'email_or_username': 'routedev', 'password': 'DevPass123'})
+    response = client.post('/api/games', json={'title': 'Written Game'})
+    assert response.status_code == 201
+
+    with routed_app.app_context():
+        assert {g.title for g in Game.query.all()} == {'Primary Game', 'Written Game'}
+        with routed_app.extensions[REPLICA].connect() as conn:
+            assert conn.execute(text('SELECT COUNT(*) FROM games')).scalar() == 1
+
+def test_cached_listing_not_filled_from_lagging_replica(routed_app):
+    """Test a listing read right after a write is cached with the write, not the replica's older rows"""
+    client = routed_app.test_client()
+    client.post('/auth/login', json={'email_or_username': 'routedev', 'password': 'DevPass123'})
+    assert client.get('/api/games').status_code == 200
+
+    # The replica never receives this write: it is lagging for the rest of the test
+    assert client.post('/api/games', json={'title': 'Written Game'}).status_code == 201
+
+    for _ in range(2):
+        titles = {game['title'] for game in client.get('/api/games').get_json()['games']}
+        assert titles == {'Primary Game', 'Written Game'}
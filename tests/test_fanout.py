@@ -0,0 +1,87 @@
+import time
+import pytest
+from main import app, db
+from app.fanout import FanOut, TIMEOUT
+from app.models import User, Game, Review
+from app.ratings import apply_rating_change
+
+@pytest.fixture
+def client():
+    """Create test client with one reviewed game"""
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        dev = User(email='fandev@test.com', username='fandev', role='developer')
+        dev.set_password('DevPass123')
+        db.session.add(dev)
+        db.session.commit()
+
+        game = Game(title='Fan Game', genre='RPG', price=4.99, developer_id=dev.id)
+        db.session.add(game)
+        db.session.commit()
+        db.session.add(Review(game_id=game.id, user_id=dev.id, rating=4))
+        apply_rating_change(game.id, new_rating=4)
+        db.session.commit()
+
+        yield app.test_client()
+        db.session.remove()
+        db.drop_all()
+
+def sleeper(seconds, value):
+    def source():
+        time.sleep(seconds)
+        return value
+    return source
+
+def test_sources_run_concurrently():
+    """Test the fan-out costs about the slowest source, not the sum"""
+    pool = FanOut(workers=4)
+    started = time.monotonic()
+    results, errors = pool.gather(app, {name: (sleeper(0.3, name), 2) for name in 'abcd'})
+    elapsed = time.monotonic() - started
+    pool.close()
+
+    assert results == {name: name for name in 'abcd'}
+    assert errors == {}
+    assert elapsed < 0.9
+
+def test_slow_and_failing_sources_are_partial():
+    """Test a timed-out or raising source does not hold back the others"""
+    def broken():
+        raise RuntimeError('down')
+
+    pool = FanOut(workers=4)
+    started = time.monotonic()
+    results, errors = pool.gather(app, {
+        'fast': (sleeper(0, 1), 1),
+        'slow': (sleeper(1, 2), 0.1),
+        'broken': (broken, 1)
+    })
+    elapsed = time.monotonic() - started
+    pool.close()
+
+    assert results == {'fast': 1}
+    assert errors == {'slow': TIMEOUT, 'broken': 'down'}
+    assert elapsed < 0.5
+    assert pool.timeouts == 1
+
+def test_game_full(client):
+    """Test the composite endpoint returns the game and its rating summary"""
+    with app.app_context():
+        game_id = Game.query.first().id
+
+    response = client.get(f'/api/games/{game_id}/full')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['game']['title'] == 'Fan Game'
+    assert data['rating']['review_count'] == 1
+    assert data['rating']['histogram']['4'] == 1
+    # Without a MongoDB server these come back empty or as timeouts, never a 500
+    assert set(data['errors']) <= {'metadata', 'analytics'}
+    assert data['metadata'] is None
+    assert data['analytics'] in (None, {'views': 0, 'downloads': 0})
+
+    assert client.get('/api/games/9999/full').status_code == 404
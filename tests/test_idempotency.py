@@ -0,0 +1,123 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from main import app, db
+from app.models import User, Game, Order, IdempotencyKey
+from app.idempotency import purge_expired, request_fingerprint
+
+@pytest.fixture
+def client():
+    """Create test client logged in as a player, with two games for sale"""
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        dev = User(email='idemdev@test.com', username='idemdev', role='developer')
+        dev.set_password('DevPass123')
+        player = User(email='retrier@test.com', username='retrier')
+        player.set_password('Password123')
+        db.session.add_all([dev, player])
+        db.session.commit()
+        db.session.add_all([Game(title=f'Retry {i}', price=7.5, developer_id=dev.id) for i in range(2)])
+        db.session.commit()
+
+        client = app.test_client()
+        client.post('/auth/login', json={'email_or_username': 'retrier', 'password': 'Password123'})
+        yield client
+        db.session.remove()
+        db.drop_all()
+
+def game_ids():
+    with app.app_context():
+        return [g.id for g in Game.query.order_by(Game.id)]
+
+def checkout(client, game_id, key):
+    return client.post('/api/purchases/checkout', json={'game_id': game_id}, headers={'Idempotency-Key': key})
+
+def test_retry_replays_original_response(client):
+    """Test a retried checkout returns the first response without a second order"""
+    first_id = game_ids()[0]
+
+    first = checkout(client, first_id, 'abc-1')
+    retry = checkout(client, first_id, 'abc-1')
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.get_json() == first.get_json()
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    with app.app_context():
+        assert Order.query.count() == 1
+
+def test_key_reused_for_different_request(client):
+    """Test a key cannot be replayed against another body"""
+    first_id, second_id = game_ids()
+    checkout(client, first_id, 'abc-2')
+
+    response = checkout(client, second_id, 'abc-2')
+    assert response.status_code == 422
+
+def test_key_in_progress_and_expired(client):
+    """Test an unfinished claim blocks retries and an expired one is reusable"""
+    first_id = game_ids()[0]
+    body = client.post('/api/purchases/checkout', json={'game_id': first_id})
+    assert body.status_code == 201
+
+    with app.test_request_context('/api/purchases/checkout', method='POST', json={'game_id': first_id}):
+        fingerprint = request_fingerprint()
+
+    with app.app_context():
+        user_id = User.query.filter_by(username='retrier').first().id
+        db.session.add(IdempotencyKey(user_id=user_id, key='busy', request_hash=fingerprint,
+                                      expires_at=datetime.utcnow() + timedelta(hours=1)))
+        db.session.add(IdempotencyKey(user_id=user_id, key='old', request_hash=fingerprint, status_code=201,
+                                      response_body='{}', expires_at=datetime.utcnow() - timedelta(hours=1)))
+        db.session.commit()
+
+    assert checkout(client, first_id, 'busy').status_code == 409
+    # The expired key runs again; the player already owns the game
+    assert checkout(client, first_id, 'old').status_code == 400
+
+    with app.app_context():
+        assert purge_expired(datetime.utcnow() + timedelta(days=2)) == 2
+
+def test_abandoned_claim_is_taken_over(client):
+    """Test a claim left behind by a crashed worker stops blocking once its lease is up"""
+    first_id = game_ids()[0]
+    with app.test_request_context('/api/purchases/checkout', method='POST', json={'game_id': first_id}):
+        fingerprint = request_fingerprint()
+
+    with app.app_context():
+        user_id = User.query.filter_by(username='retrier').first().id
+        stale = datetime.utcnow() - timedelta(seconds=app.config['IDEMPOTENCY_CLAIM_LEASE'] + 1)
+        db.session.add(IdempotencyKey(user_id=user_id, key='crashed', request_hash=fingerprint,
+                                      created_at=stale, claimed_at=stale,
+                                      expires_at=datetime.utcnow() + timedelta(hours=1)))
+        db.session.commit()
+
+    first = checkout(client, first_id, 'crashed')
+    assert first.status_code == 201
+    retry = checkout(client, first_id, 'crashed')
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert retry.get_json() == first.get_json()
+    with app.app_context():
+        assert Order.query.count() == 1
+
+def test_one_completed_order_per_game(client):
+    """Test the database refuses a second completed order for the same game"""
+    first_id = game_ids()[0]
+    with app.app_context():
+        user_id = User.query.filter_by(username='retrier').first().id
+        db.session.add(Order(user_id=user_id, game_id=first_id, amount_paid=0, status='completed'))
+        db.session.add(Order(user_id=user_id, game_id=first_id, amount_paid=0, status='refunded'))
+        db.session.commit()
+
+        db.session.add(Order(user_id=user_id, game_id=first_id, amount_paid=0, status='completed'))
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+
+    # No entitlement exists yet, so only the orders index can stop this checkout
+    response = client.post('/api/purchases/checkout', json={'game_id': first_id})
+    assert response.status_code == 400
+    with app.app_context():
+        assert Order.query.filter_by(status='completed').count() == 1
@@ -0,0 +1,88 @@
+import pytest
+from contextlib import contextmanager
+from sqlalchemy import event
+from main import app, db
+from app.ownership import ownership
+from app.models import User, Game, Order, Review
+
+@pytest.fixture
+def client():
+    """Create test client with one player owning and reviewing many games"""
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        dev = User(email='loaddev@test.com', username='loaddev', role='developer')
+        dev.set_password('DevPass123')
+        player = User(email='loader@test.com', username='loader')
+        player.set_password('Password123')
+        db.session.add_all([dev, player])
+        db.session.commit()
+
+        games = [Game(title=f'Game {i}', price=5.0, developer_id=dev.id) for i in range(8)]
+        db.session.add_all(games)
+        db.session.commit()
+
+        for i, game in enumerate(games):
+            db.session.add(Order(user_id=player.id, game_id=game.id, amount_paid=5.0, status='completed'))
+            reviewer = User(email=f'rev{i}@test.com', username=f'rev{i}')
+            reviewer.set_password('Password123')
+            db.session.add(reviewer)
+            db.session.commit()
+            db.session.add(Review(game_id=games[0].id, user_id=reviewer.id, rating=4))
+        db.session.commit()
+        ownership.backfill()
+
+        yield app.test_client()
+        db.session.remove()
+        db.drop_all()
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+def login(client):
+    client.post('/auth/login', json={'email_or_username': 'loader', 'password': 'Password123'})
+
+def test_review_page_loads_authors_in_one_query(client):
+    """Test a page of reviews does not query users once per review"""
+    with app.app_context():
+        game_id = Game.query.order_by(Game.id).first().id
+
+    with count_queries() as statements:
+        data = client.get(f'/api/reviews/game/{game_id}').get_json()
+
+    assert len(data['reviews']) == 8
+    assert all(r['username'].startswith('rev') for r in data['reviews'])
+    assert sum('FROM users' in s for s in statements) == 1
+
+def test_history_and_library_load_games_in_one_query(client):
+    """Test history and library cost a constant number of queries"""
+    login(client)
+
+    for url in ('/api/purchases/history', '/api/purchases/library'):
+        with count_queries() as statements:
+            response = client.get(url)
+        assert response.status_code == 200
+        assert response.get_json()['total'] == 8
+        assert sum('FROM games' in s for s in statements) == 1
+
+def test_order_detail_joins_game(client):
+    """Test a single order comes back with its game"""
+    login(client)
+    with app.app_context():
+        order_id = Order.query.first().id
+
+    data = client.get(f'/api/purchases/{order_id}').get_json()
+    assert data['game']['title'].startswith('Game')
@@ -0,0 +1,74 @@
+import logging
+import pytest
+from main import app, db
+from app.models import User, Game
+
+@pytest.fixture
+def client():
+    """Create test client with a couple of games"""
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        dev = User(email='metricsdev@test.com', username='metricsdev', role='developer')
+        dev.set_password('DevPass123')
+        db.session.add(dev)
+        db.session.commit()
+        db.session.add_all([Game(title=f'Metric Game {i}', developer_id=dev.id) for i in range(3)])
+        db.session.commit()
+
+        yield app.test_client()
+        db.session.remove()
+        db.drop_all()
+
+def sample(body, name, endpoint):
+    """Read a metric sample for an endpoint out of the exposition text"""
+    for line in body.splitlines():
+        if line.startswith(name) and f'endpoint="{endpoint}"' in line:
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+def test_metrics_endpoint_reports_latency_and_sql(client):
+    """Test /metrics exposes per-endpoint latency and query counts"""
+    client.get('/api/games')
+    client.get('/api/games')
+
+    body = client.get('/metrics').get_data(as_text=True)
+
+    assert sample(body, 'gaming_http_request_duration_seconds_count', 'games.get_games') >= 2
+    assert sample(body, 'gaming_sql_queries_per_request_count', 'games.get_games') >= 2
+    assert sample(body, 'gaming_sql_queries_per_request_sum', 'games.get_games') >= 4
+
+def test_slow_request_log_includes_sql(client, caplog):
+    """Test slow requests are logged with the statements they ran"""
+    app.config['SLOW_REQUEST_MS'] = 0.001
+    try:
+        with caplog.at_level(logging.WARNING, logger='gaming.slow_requests'):
+            client.get('/api/games')
+    finally:
+        app.config['SLOW_REQUEST_MS'] = 500
+
+    messages = [r.getMessage() for r in caplog.records if r.name == 'gaming.slow_requests']
+    assert messages
+    assert 'games.get_games' in messages[0]
+    assert 'FROM games' in messages[0]
+
+def test_slow_request_log_can_be_disabled(client, caplog):
+    """Test a SLOW_REQUEST_MS of 0 turns the slow request log off"""
+    app.config['SLOW_REQUEST_MS'] = 0
+    try:
+        with caplog.at_level(logging.WARNING, logger='gaming.slow_requests'):
+            client.get('/api/games')
+    finally:
+        app.config['SLOW_REQUEST_MS'] = 500
+
+    assert not [r for r in caplog.records if r.name == 'gaming.slow_requests']
+
+def test_failed_statement_does_not_leak_timing(client):
+    """Test a statement that errors leaves no start time behind on its connection"""
+    with app.app_context():
+        with db.engine.connect() as conn:
+            with pytest.raises(Exception):
+                conn.exec_driver_sql('SELECT * FROM no_such_table')
+            assert conn.info.get('query_start') == []
@@ -0,0 +1,72 @@
+import time
+import pytest
+from app.analytics_buffer import CounterBuffer
+from app.db_mongo import MongoConnection, MongoUnavailable, HEALTHY, UNHEALTHY, UNKNOWN
+from app.models_mongo import GameMetadata, GameAnalytics
+
+UNREACHABLE = 'mongodb://127.0.0.1:1/'
+
+def test_nothing_connects_until_first_use():
+    """Test creating the connection object does not build a client"""
+    conn = MongoConnection(uri=UNREACHABLE)
+    assert conn._client is None
+    assert conn.state == UNKNOWN
+
+def test_unreachable_server_opens_breaker_quickly():
+    """Test a dead server is detected by the first ping and later calls fail fast"""
+    conn = MongoConnection(uri=UNREACHABLE, timeout_ms=200, health_interval=0.1)
+    try:
+        assert conn.get_db() is None
+        assert conn.state == UNHEALTHY
+        assert conn.status()['last_error']
+
+        started = time.perf_counter()
+        assert conn.get_db() is None
+        assert time.perf_counter() - started < 0.05
+    finally:
+        conn.close()
+
+def test_breaker_threshold_and_recovery():
+    """Test a healthy connection tolerates one failed ping and recovers on success"""
+    conn = MongoConnection(uri=UNREACHABLE, timeout_ms=200, health_interval=60, failure_threshold=2)
+    try:
+        conn.start()
+        client = conn._client
+        conn._record(client, True)
+        assert conn.get_db() is not None
+
+        conn._record(client, False, 'timeout')
+        assert conn.state == HEALTHY
+        conn._record(client, False, 'timeout')
+        assert conn.state == UNHEALTHY
+        assert conn.get_db() is None
+
+        conn._record(client, True)
+        assert conn.get_db() is not None
+    finally:
+        conn.close()
+
+def test_models_use_local_mode_while_open(monkeypatch):
+    """Test metadata reads return their empty defaults while Mongo is down"""
+    conn = MongoConnection(uri=UNREACHABLE, timeout_ms=200)
+    monkeypatch.setattr('app.models_mongo.get_mongo_db', conn.get_db)
+    try:
+        metadata = GameMetadata()
+        assert metadata.get_metadata(1) is None
+        assert metadata.all_tags() == {}
+        assert metadata.search_by_tags(['rpg']) == []
+    finally:
+        conn.close()
+
+def test_analytics_buffered_while_open(monkeypatch):
+    """Test views recorded while Mongo is down stay buffered instead of being lost"""
+    monkeypatch.setattr('app.models_mongo.get_mongo_db', lambda: None)
+    analytics = GameAnalytics()
+    analytics.buffer = CounterBuffer(analytics.write_increments, interval_ms=60000)
+
+    analytics.record_view(4)
+    analytics.record_view(4)
+    with pytest.raises(MongoUnavailable):
+        analytics.buffer.flush()
+    assert sum(fields['views'] for fields in analytics._pending(4).values()) == 2
+    analytics.buffer.discard()
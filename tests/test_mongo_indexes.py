@@ -0,0 +1,30 @@
+import pytest
+from app.db_mongo import get_mongo_db
+from app.models_mongo import INDEXES, AUDITED_QUERIES, ensure_indexes, audit_queries, plan_stages
+
+def test_plan_stages_walks_every_shape():
+    """Test stages are found through single, multiple and wrapped inputs"""
+    plan = {
+        'stage': 'FETCH',
+        'inputStage': {
+            'stage': 'OR',
+            'inputStages': [{'stage': 'IXSCAN'}, {'stage': 'COLLSCAN'}]
+        }
+    }
+    assert plan_stages(plan) == ['FETCH', 'OR', 'IXSCAN', 'COLLSCAN']
+    # Slot-based engine plans nest the classic tree under queryPlan
+    assert plan_stages({'queryPlan': {'stage': 'IXSCAN'}}) == ['IXSCAN']
+
+def test_every_audited_collection_has_indexes():
+    """Test each audited query targets a collection with declared indexes"""
+    assert {collection for _, collection, _, _ in AUDITED_QUERIES} <= set(INDEXES)
+
+def test_repository_queries_use_indexes():
+    """Test no repository query needs a collection scan once indexes exist"""
+    db = get_mongo_db()
+    if db is None:
+        pytest.skip('MongoDB is not available')
+
+    first = ensure_indexes(db)
+    assert ensure_indexes(db) == first
+    assert audit_queries(db) == []
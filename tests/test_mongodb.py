@@ -1,7 +1,10 @@
 import pytest
 from main import app, db
 from app.models import User, Game
-from app.models_mongo import GameMetadata, GameAnalytics
+from app.analytics_buffer import FlushBatch
+from app.db_mongo import get_mongo_db
+from app.models_mongo import GameMetadata, GameAnalytics, bucket_start, ensure_indexes, HOURLY, DAILY
+from datetime import datetime, timedelta
 
 @pytest.fixture
 def client():
@@ -128,4 +131,60 @@ def test_mongodb_integration():
     game_analytics = GameAnalytics()
     
     assert game_metadata is not None
-    assert game_analytics is not None
\ No newline at end of file
+    assert game_analytics is not None
+
+def test_bucket_start():
+    """Test timestamps truncate to their hour and day buckets"""
+    moment = datetime(2026, 3, 14, 15, 9, 26)
+    assert bucket_start(moment, HOURLY) == datetime(2026, 3, 14, 15)
+    assert bucket_start(moment, DAILY) == datetime(2026, 3, 14)
+
+def test_game_analytics_time_buckets():
+    """Test views land in hourly and daily buckets"""
+    game_analytics = GameAnalytics()
+    
+    game_analytics.record_view(3)
+    game_analytics.record_view(3)
+    
+    now = datetime.utcnow()
+    hours = game_analytics.get_range(3, now - timedelta(hours=1), now + timedelta(hours=1), HOURLY)
+    days = game_analytics.get_range(3, now - timedelta(days=1), now + timedelta(days=1), DAILY)
+    
+    assert isinstance(hours, list)
+    if hours:
+        assert hours[-1]['views'] >= 2
+        assert days[-1]['views'] >= hours[-1]['views']
+
+def test_game_analytics_retried_batch_counts_once():
+    """Test writing the same flush batch twice leaves totals and buckets counted once"""
+    if get_mongo_db() is None:
+        pytest.skip('MongoDB is not available')
+    ensure_indexes(get_mongo_db())
+    
+    game_analytics = GameAnalytics()
+    hour = bucket_start(datetime.utcnow(), HOURLY)
+    game_id = 900000 + hour.hour
+    before = (game_analytics.get_stats(game_id) or {}).get('views', 0)
+    
+    batch = FlushBatch({(game_id, hour): {'views': 3}})
+    game_analytics.write_increments(batch)
+    game_analytics.write_increments(batch)
+    
+    stats = game_analytics.get_stats(game_id)
+    assert stats['views'] == before + 3
+    assert 'batches' not in stats
+
+def test_game_analytics_range_validation(client):
+    """Test the range endpoint rejects bad arguments"""
+    response = client.get('/api/games/1/analytics?granularity=week')
+    assert response.status_code == 400
+    
+    response = client.get('/api/games/1/analytics?from=yesterday')
+    assert response.status_code == 400
+    
+    response = client.get('/api/games/1/analytics?from=2026-01-02&to=2026-01-01')
+    assert response.status_code == 400
+    
+    response = client.get('/api/games/1/analytics?from=2026-01-01&to=2026-01-08&granularity=day')
+    assert response.status_code == 200
+    assert response.get_json()['granularity'] == 'day'
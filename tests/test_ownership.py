@@ -0,0 +1,100 @@
+import pytest
+from main import app, db
+from app.models import User, Game, Order, Entitlement
+from app.ownership import ownership
+
+@pytest.fixture
+def client():
+    """Create test client logged in as a player, with a small catalog"""
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        dev = User(email='owndev@test.com', username='owndev', role='developer')
+        dev.set_password('DevPass123')
+        player = User(email='owner@test.com', username='owner')
+        player.set_password('Password123')
+        db.session.add_all([dev, player])
+        db.session.commit()
+        db.session.add_all([Game(title=f'Owned {i}', price=4.99, developer_id=dev.id) for i in range(3)])
+        db.session.commit()
+
+        client = app.test_client()
+        client.post('/auth/login', json={'email_or_username': 'owner', 'password': 'Password123'})
+        yield client
+        db.session.remove()
+        db.drop_all()
+
+def game_ids():
+    return [g.id for g in Game.query.order_by(Game.id)]
+
+def test_checkout_grants_entitlement_and_blocks_repeat(client):
+    """Test a purchase is visible to the next ownership check immediately"""
+    with app.app_context():
+        first = game_ids()[0]
+
+    assert client.post('/api/purchases/checkout', json={'game_id': first}).status_code == 201
+    response = client.post('/api/purchases/checkout', json={'game_id': first})
+    assert response.status_code == 400
+
+    with app.app_context():
+        assert Entitlement.query.count() == 1
+        assert Order.query.count() == 1
+
+def test_library_and_review_gate_use_entitlements(client):
+    """Test library lists owned games and only owners can review"""
+    with app.app_context():
+        first, second, third = game_ids()
+
+    client.post('/api/purchases/checkout', json={'game_id': first})
+    client.post('/api/purchases/checkout', json={'game_id': second})
+
+    library = client.get('/api/purchases/library').get_json()
+    assert [g['id'] for g in library['games']] == [first, second]
+
+    assert client.post(f'/api/reviews/{first}', json={'rating': 5}).status_code == 201
+    assert client.post(f'/api/reviews/{third}', json={'rating': 5}).status_code == 403
+
+def test_stale_cache_is_caught_by_unique_index(client):
+    """Test a purchase made elsewhere is caught even if this worker's cache missed it"""
+    with app.app_context():
+        first = game_ids()[0]
+        player = User.query.filter_by(username='owner').first()
+        assert not ownership.owns(player.id, first)
+
+        # Another worker sells the game; this worker's cached set is now stale
+        db.session.add(Entitlement(user_id=player.id, game_id=first))
+        db.session.commit()
+        assert not ownership.owns(player.id, first)
+
+    response = client.post('/api/purchases/checkout', json={'game_id': first})
+    assert response.status_code == 400
+    with app.app_context():
+        assert Order.query.count() == 0
+        assert ownership.owns(player.id, first)
+
+def test_verify_rechecks_a_cached_no(client):
+    """Test verify=True sees ownership granted after the set was cached"""
+    with app.app_context():
+        first = game_ids()[0]
+        player = User.query.filter_by(username='owner').first()
+        assert not ownership.owns(player.id, first)
+
+        db.session.add(Entitlement(user_id=player.id, game_id=first))
+        db.session.commit()
+        assert ownership.owns(player.id, first, verify=True)
+
+def test_backfill_from_existing_orders(client):
+    """Test backfill creates one entitlement per owned game"""
+    with app.app_context():
+        first = game_ids()[0]
+        player = User.query.filter_by(username='owner').first()
+        db.session.add(Order(user_id=player.id, game_id=first, amount_paid=1, status='refunded'))
+        db.session.add(Order(user_id=player.id, game_id=first, amount_paid=1, status='completed'))
+        db.session.add(Order(user_id=player.id, game_id=game_ids()[1], amount_paid=1, status='pending'))
+        db.session.commit()
+
+        assert ownership.backfill() == 1
+        assert ownership.backfill() == 0
+        assert ownership.owns(player.id, first)
@@ -0,0 +1,68 @@
+import pytest
+from main import app, db
+from app.models import User, Game
+from app.pagination import encode_cursor, decode_cursor, InvalidCursor
+
+@pytest.fixture
+def client():
+    """Create test client with a small catalog"""
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        dev = User(email='pagedev@test.com', username='pagedev', role='developer')
+        dev.set_password('DevPass123')
+        db.session.add(dev)
+        db.session.commit()
+
+        for i in range(25):
+            db.session.add(Game(
+                title=f'Game {i}',
+                genre='RPG' if i % 2 else 'Action',
+                price=9.99,
+                developer_id=dev.id
+            ))
+        db.session.commit()
+
+        yield app.test_client()
+        db.session.remove()
+        db.drop_all()
+
+def test_cursor_roundtrip():
+    """Test cursors decode to the id they were built from"""
+    assert decode_cursor(encode_cursor(42)) == 42
+    assert decode_cursor(None) is None
+
+def test_invalid_cursor():
+    """Test garbage cursors are rejected"""
+    with pytest.raises(InvalidCursor):
+        decode_cursor('not-a-cursor')
+
+def test_keyset_walks_whole_catalog(client):
+    """Test following next_cursor visits every game exactly once"""
+    seen = []
+    response = client.get('/api/games?limit=10')
+    data = response.get_json()
+    assert response.status_code == 200
+    assert 'total' not in data
+    seen.extend(g['id'] for g in data['games'])
+
+    while data['next_cursor']:
+        data = client.get(f"/api/games?limit=10&cursor={data['next_cursor']}").get_json()
+        seen.extend(g['id'] for g in data['games'])
+
+    assert len(seen) == 25
+    assert seen == sorted(seen)
+
+def test_keyset_genre_filter_and_total(client):
+    """Test genre filter is kept and total is only counted on request"""
+    data = client.get('/api/games?limit=5&genre=RPG&include_total=true').get_json()
+    assert data['total'] == 12
+    assert all(g['genre'] == 'RPG' for g in data['games'])
+    assert data['next_cursor'] is not None
+
+def test_keyset_bad_cursor_returns_400(client):
+    """Test an invalid cursor is a client error"""
+    response = client.get('/api/games?cursor=%%%')
+    assert response.status_code == 400
@@ -0,0 +1,77 @@
+import pytest
+from werkzeug.security import generate_password_hash
+from main import app, db
+from app.models import User
+from app.passwords import PasswordHasher, passwords
+
+@pytest.fixture
+def client():
+    """Create test client with a user whose password uses old hash parameters"""
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(email='legacy@test.com', username='legacy',
+                    password_hash=generate_password_hash('Password123', method='pbkdf2:sha256:1000'))
+        db.session.add(user)
+        db.session.commit()
+
+        yield app.test_client()
+        db.session.remove()
+        db.drop_all()
+
+def login(client, password='Password123'):
+    return client.post('/auth/login', json={'email_or_username': 'legacy', 'password': password})
+
+def test_pool_hashes_and_verifies():
+    """Test hashing round-trips through the worker processes"""
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1, queue_size=1)
+    try:
+        stored = hasher.hash('secret-pass')
+        assert stored.startswith('pbkdf2:sha256:1000$')
+        assert hasher.verify(stored, 'secret-pass') == (True, None)
+        assert hasher.verify(stored, 'wrong-pass') == (False, None)
+    finally:
+        hasher.close()
+
+def test_login_rehashes_stale_parameters(client):
+    """Test a correct login upgrades the stored hash and keeps working"""
+    assert login(client, 'WrongPass1').status_code == 401
+    with app.app_context():
+        assert passwords.needs_rehash(User.query.first().password_hash)
+
+    assert login(client).status_code == 200
+    with app.app_context():
+        stored = User.query.first().password_hash
+        assert stored.startswith(passwords.prefix + '$')
+        assert not passwords.needs_rehash(stored)
+
+    assert login(client).status_code == 200
+
+def test_saturated_pool_rejects_fast(client):
+    """Test logins get a 503 instead of queueing once every slot is taken"""
+    if not passwords.workers:
+        pytest.skip('password hashing runs inline')
+
+    held = 0
+    while passwords._slots.acquire(blocking=False):
+        held += 1
+    try:
+        rejected = passwords.rejected
+        response = login(client)
+        assert response.status_code == 503
+        assert response.headers['Retry-After']
+        assert passwords.rejected == rejected + 1
+    finally:
+        for _ in range(held):
+            passwords._slots.release()
+
+    assert login(client).status_code == 200
+
+def test_inline_hasher_never_rejects():
+    """Test workers=0 hashes in the calling thread"""
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=0, queue_size=0)
+    ok, new_hash = hasher.verify(generate_password_hash('x' * 8, method='pbkdf2:sha256:2000'), 'x' * 8)
+    assert ok
+    assert new_hash.startswith('pbkdf2:sha256:1000$')
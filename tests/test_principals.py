@@ -0,0 +1,112 @@
+import pytest
+from sqlalchemy import event
+from main import app, db
+from app.models import User
+from app.principals import principals
+import time
+from app.versions import PRINCIPALS_SCOPE, bump, token_scope
+
+@pytest.fixture
+def clients():
+    """Create an admin client and a player client, both logged in"""
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        admin = User(email='boss@test.com', username='boss', role='admin')
+        admin.set_password('Password123')
+        player = User(email='member@test.com', username='member')
+        player.set_password('Password123')
+        db.session.add_all([admin, player])
+        db.session.commit()
+        player_id = player.id
+
+    # Log in outside the app context so each client's requests get their own g
+    admin_client = app.test_client()
+    admin_client.post('/auth/login', json={'email_or_username': 'boss', 'password': 'Password123'})
+    player_client = app.test_client()
+    player_client.post('/auth/login', json={'email_or_username': 'member', 'password': 'Password123'})
+    yield admin_client, player_client, player_id
+
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+def captured(fn):
+    """(response, every statement fn ran)"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = fn()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return response, statements
+
+def users_queries(fn):
+    response, statements = captured(fn)
+    return response, sum('FROM users' in s for s in statements)
+
+def test_repeat_requests_skip_users_table(clients):
+    """Test only the first authenticated request loads the user row"""
+    _, player, _ = clients
+
+    player.get('/auth/profile')
+    response, queries = users_queries(lambda: player.get('/auth/profile'))
+    assert response.status_code == 200
+    assert response.get_json()['username'] == 'member'
+    assert queries == 0
+
+def test_role_change_applies_immediately(clients):
+    """Test a promoted player gets admin access on the very next request"""
+    admin, player, player_id = clients
+    assert player.get('/api/admin/users').status_code == 403
+
+    admin.put(f'/api/admin/users/{player_id}/role', json={'role': 'admin'})
+    assert player.get('/api/admin/users').status_code == 200
+
+    admin.put(f'/api/admin/users/{player_id}/role', json={'role': 'player'})
+    assert player.get('/api/admin/users').status_code == 403
+
+def test_suspension_ends_the_session(clients):
+    """Test a suspended player is treated as logged out until unsuspended"""
+    admin, player, player_id = clients
+    assert player.get('/auth/profile').status_code == 200
+
+    admin.post(f'/api/admin/users/{player_id}/suspend')
+    assert player.get('/auth/profile').status_code == 401
+
+    admin.post(f'/api/admin/users/{player_id}/unsuspend')
+    assert player.get('/auth/profile').status_code == 200
+
+def test_cache_hit_runs_no_sql(clients, monkeypatch):
+    """Test a request served from the principal cache issues no query at all"""
+    _, player, _ = clients
+    monkeypatch.setattr(principals, 'check_interval', 60)
+
+    player.get('/auth/profile')
+    response, statements = captured(lambda: player.get('/auth/profile'))
+    assert response.status_code == 200
+    assert statements == []
+
+def test_change_from_another_worker_is_seen(clients, monkeypatch):
+    """Test a worker drops its cached principals once another worker's change is seen"""
+    admin, player, player_id = clients
+    monkeypatch.setattr(principals, 'check_interval', 0.05)
+    assert player.get('/api/admin/users').status_code == 403
+
+    # Another worker's after-commit invalidation never reaches this process's cache
+    with app.app_context():
+        User.query.filter_by(id=player_id).update({User.role: 'admin'})
+        bump(token_scope(player_id), PRINCIPALS_SCOPE)
+        db.session.commit()
+    assert principals.backend.get(str(player_id)) is not None
+
+    time.sleep(0.06)
+    assert player.get('/api/admin/users').status_code == 200
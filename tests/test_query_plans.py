@@ -0,0 +1,141 @@
+import re
+import pytest
+from contextlib import contextmanager
+from sqlalchemy import event, text
+from main import app, db
+from app.ownership import ownership
+from app.schema import DuplicateRows, create_missing_columns, create_missing_indexes
+from app.models import User, Game, Order, Review
+
+# "SCAN games" reads the whole table; "SCAN games USING INDEX ..." walks a whole index
+FULL_SCAN = re.compile(r'^SCAN (\w+)')
+
+@pytest.fixture
+def client():
+    """Create test client with a developer, two players, games, orders and reviews"""
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        dev = User(email='plandev@test.com', username='plandev', role='developer')
+        dev.set_password('DevPass123')
+        admin = User(email='planadmin@test.com', username='planadmin', role='admin')
+        admin.set_password('Password123')
+        db.session.add_all([dev, admin])
+        db.session.commit()
+
+        games = [Game(title=f'Plan {i}', genre='RPG' if i % 2 else 'Puzzle', price=5.0, developer_id=dev.id)
+                 for i in range(6)]
+        db.session.add_all(games)
+        db.session.commit()
+
+        for name in ('planner', 'plotter'):
+            player = User(email=f'{name}@test.com', username=name)
+            player.set_password('Password123')
+            db.session.add(player)
+            db.session.commit()
+            db.session.add(Order(user_id=player.id, game_id=games[0].id, amount_paid=5.0, status='completed'))
+        db.session.add(Review(game_id=games[0].id, user_id=player.id, rating=4))
+        db.session.commit()
+        ownership.backfill()
+
+        yield app.test_client()
+        db.session.remove()
+        db.drop_all()
+
+@contextmanager
+def captured_selects():
+    """Collect (sql, params) of every SELECT the app runs"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+def full_scans(statements):
+    """[(sql, plan detail)] for every captured statement whose plan scans a table"""
+    scans = []
+    with app.app_context():
+        with db.engine.connect() as conn:
+            for statement, parameters in statements:
+                plan = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+                for row in plan:
+                    detail = row[-1]
+                    if FULL_SCAN.match(detail) or 'TEMP B-TREE' in detail:
+                        scans.append((statement, detail))
+    return scans
+
+def login(client, username, password='Password123'):
+    client.post('/auth/login', json={'email_or_username': username, 'password': password})
+
+def test_hot_endpoints_do_not_scan(client):
+    """Test every filtered read on the hot paths is answered from an index"""
+    with app.app_context():
+        game_id = Game.query.first().id
+
+    with captured_selects() as statements:
+        client.get('/api/games?genre=RPG')
+        client.get('/api/games?genre=Puzzle&limit=2')
+        for sort in ('recent', 'helpful', 'rating'):
+            client.get(f'/api/reviews/game/{game_id}?sort={sort}')
+
+        login(client, 'planner')
+        client.get('/api/purchases/history')
+        client.post('/api/purchases/cart/checkout', json={'game_ids': [game_id + 1, game_id + 2]})
+        assert client.post(f'/api/reviews/{game_id}', json={'rating': 5}).status_code == 201
+        client.post('/auth/logout')
+
+        login(client, 'planadmin')
+        client.get('/api/admin/users?role=player')
+        client.get(f'/api/admin/users/{game_id}')
+
+    assert len(statements) > 10
+    assert full_scans(statements) == []
+
+def test_missing_indexes_are_added(client):
+    """Test indexes declared after a table was created are added by the migration"""
+    with app.app_context():
+        db.session.execute(text('DROP INDEX ix_reviews_game_helpful'))
+        db.session.execute(text('DROP INDEX ix_games_genre_id'))
+        db.session.commit()
+
+        assert sorted(create_missing_indexes()) == ['ix_games_genre_id', 'ix_reviews_game_helpful']
+        assert create_missing_indexes() == []
+
+def test_unique_index_refused_over_duplicates(client):
+    """Test a unique index is not attempted while existing rows would break it"""
+    with app.app_context():
+        db.session.execute(text('DROP INDEX uq_orders_user_game_completed'))
+        order = Order.query.filter_by(status='completed').first()
+        db.session.add(Order(user_id=order.user_id, game_id=order.game_id, amount_paid=5.0, status='completed'))
+        db.session.add(Order(user_id=order.user_id, game_id=order.game_id, amount_paid=5.0, status='refunded'))
+        db.session.commit()
+
+        with pytest.raises(DuplicateRows) as e:
+            create_missing_indexes()
+        assert f'({order.user_id}, {order.game_id})' in str(e.value)
+        assert "WHERE status = 'completed'" in str(e.value)
+
+        db.session.query(Order).filter(Order.id > order.id, Order.user_id == order.user_id,
+                                       Order.status == 'completed').update({Order.status: 'refunded'})
+        db.session.commit()
+        assert create_missing_indexes() == ['uq_orders_user_game_completed']
+
+def test_missing_columns_are_added(client):
+    """Test nullable columns declared after a table was created are added by the migration"""
+    with app.app_context():
+        db.session.execute(text('ALTER TABLE idempotency_keys DROP COLUMN claimed_at'))
+        db.session.commit()
+
+        assert create_missing_columns() == ['idempotency_keys.claimed_at']
+        assert create_missing_columns() == []
@@ -0,0 +1,90 @@
+import pytest
+from main import app, db
+from app.ownership import ownership
+from app.models import User, Game, Order, Review, GameRatingSummary
+from app.ratings import rebuild_rating_summaries, find_rating_drift
+
+@pytest.fixture
+def client():
+    """Create test client with a game owned by two players"""
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        dev = User(email='revdev@test.com', username='revdev', role='developer')
+        dev.set_password('DevPass123')
+        db.session.add(dev)
+        db.session.commit()
+
+        game = Game(title='Reviewed Game', genre='RPG', price=9.99, developer_id=dev.id)
+        db.session.add(game)
+        db.session.commit()
+
+        for name in ('alice', 'bob'):
+            player = User(email=f'{name}@test.com', username=name)
+            player.set_password('Password123')
+            db.session.add(player)
+            db.session.commit()
+            db.session.add(Order(user_id=player.id, game_id=game.id, amount_paid=9.99, status='completed'))
+        db.session.commit()
+        ownership.backfill()
+
+        yield app.test_client()
+        db.session.remove()
+        db.drop_all()
+
+def login(client, username):
+    return client.post('/auth/login', json={'email_or_username': username, 'password': 'Password123'})
+
+def test_review_lifecycle_updates_summary(client):
+    """Test create/update/delete keep the stored aggregates in step"""
+    with app.app_context():
+        game_id = Game.query.first().id
+
+    login(client, 'alice')
+    response = client.post(f'/api/reviews/{game_id}', json={'rating': 5, 'title': 'Great'})
+    assert response.status_code == 201
+    review_id = response.get_json()['id']
+
+    login(client, 'bob')
+    client.post(f'/api/reviews/{game_id}', json={'rating': 2})
+
+    data = client.get(f'/api/reviews/game/{game_id}').get_json()
+    assert data['total'] == 2
+    assert data['average_rating'] == 3.5
+    assert data['rating_histogram'] == {'1': 0, '2': 1, '3': 0, '4': 0, '5': 1}
+
+    login(client, 'alice')
+    client.put(f'/api/reviews/{review_id}', json={'rating': 4})
+    data = client.get(f'/api/reviews/game/{game_id}').get_json()
+    assert data['average_rating'] == 3.0
+    assert data['rating_histogram']['4'] == 1
+    assert data['rating_histogram']['5'] == 0
+
+    client.delete(f'/api/reviews/{review_id}')
+    data = client.get(f'/api/reviews/game/{game_id}').get_json()
+    assert data['total'] == 1
+    assert data['average_rating'] == 2.0
+
+    with app.app_context():
+        assert Game.query.get(game_id).rating == 2.0
+        assert find_rating_drift() == []
+
+def test_rebuild_backfills_existing_reviews(client):
+    """Test the rebuild command recovers aggregates written outside the API"""
+    with app.app_context():
+        game = Game.query.first()
+        players = User.query.filter(User.username.in_(['alice', 'bob'])).all()
+        for player, rating in zip(players, (3, 5)):
+            db.session.add(Review(game_id=game.id, user_id=player.id, rating=rating))
+        db.session.commit()
+
+        assert find_rating_drift() == [game.id]
+
+        assert rebuild_rating_summaries() == 1
+        summary = db.session.get(GameRatingSummary, game.id)
+        assert summary.review_count == 2
+        assert summary.rating_sum == 8
+        assert find_rating_drift() == []
@@ -0,0 +1,76 @@
+import pytest
+from main import app, db
+from app.models import User, Game
+from app.search import search_index
+
+@pytest.fixture
+def client():
+    """Create test client logged in as a developer"""
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        dev = User(email='searchdev@test.com', username='searchdev', role='developer')
+        dev.set_password('DevPass123')
+        db.session.add(dev)
+        db.session.commit()
+
+        client = app.test_client()
+        client.post('/auth/login', json={'email_or_username': 'searchdev', 'password': 'DevPass123'})
+        yield client
+        db.session.remove()
+        db.drop_all()
+
+def create(client, **fields):
+    return client.post('/api/games', json=fields).get_json()['id']
+
+def search(client, query_string):
+    response = client.get(f'/api/games/search?{query_string}')
+    assert response.status_code == 200
+    return [g['title'] for g in response.get_json()['games']]
+
+def test_search_ranks_title_matches_first(client):
+    """Test a title hit outranks a description hit"""
+    create(client, title='Quiet Farm', description='Grow crops far from any dragon', genre='Sim', price=5)
+    create(client, title='Dragon Quest', description='A classic adventure', genre='RPG', price=20)
+
+    assert search(client, 'q=dragon') == ['Dragon Quest', 'Quiet Farm']
+    assert search(client, 'q=drag') == ['Dragon Quest', 'Quiet Farm']
+    assert search(client, 'q=dragon&genre=Sim') == ['Quiet Farm']
+    assert search(client, 'q=dragon&max_price=10') == ['Quiet Farm']
+
+def test_search_follows_updates_and_deletes(client):
+    """Test the index is kept current by update and delete"""
+    game_id = create(client, title='Space Miner', description='Dig asteroids')
+
+    client.put(f'/api/games/{game_id}', json={'title': 'Ocean Miner'})
+    assert search(client, 'q=space') == []
+    assert search(client, 'q=ocean miner') == ['Ocean Miner']
+
+    client.delete(f'/api/games/{game_id}')
+    assert search(client, 'q=miner') == []
+
+def test_search_indexes_tags(client):
+    """Test tags become searchable and survive title edits"""
+    game_id = create(client, title='Tagged Game')
+
+    with app.app_context():
+        search_index.set_tags(game_id, ['roguelike', 'pixel-art'])
+        db.session.commit()
+
+    client.put(f'/api/games/{game_id}', json={'description': 'Now with more levels'})
+    assert search(client, 'q=roguelike') == ['Tagged Game']
+
+def test_search_requires_query(client):
+    """Test an empty query is rejected"""
+    assert client.get('/api/games/search').status_code == 400
+
+def test_metadata_tags_not_indexed_when_mongo_is_down(client, monkeypatch):
+    """Test tags are left out of search when the metadata could not be saved"""
+    game_id = create(client, title='Offline Game')
+    monkeypatch.setattr('app.models_mongo.get_mongo_db', lambda: None)
+
+    response = client.post(f'/api/games/{game_id}/metadata', json={'tags': ['roguelike']})
+    assert response.status_code == 503
+    assert search(client, 'q=roguelike') == []
@@ -0,0 +1,5 @@
+from benchmarks import startup
+
+def test_cold_start_is_lazy_and_within_budget():
+    """Test importing main opens no connections and stays within a generous budget"""
+    assert startup.main(['--runs', '1', '--budget-ms', str(startup.DEFAULT_BUDGET_MS * 3)]) == 0
@@ -0,0 +1,116 @@
+import pytest
+from main import app, db
+from app.models import User, Game
+from app.tags import TagIndex, tag_index
+
+TAGS = {
+    1: ['RPG', 'fantasy', 'coop'],
+    2: ['rpg', 'sci-fi'],
+    3: ['action', 'coop'],
+    4: ['rpg', 'fantasy', 'early-access'],
+}
+
+@pytest.fixture
+def index():
+    index = TagIndex()
+    index.load(TAGS)
+    return index
+
+@pytest.fixture
+def client():
+    """Create test client with four games indexed by tag"""
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        dev = User(email='tagdev@test.com', username='tagdev', role='developer')
+        dev.set_password('DevPass123')
+        db.session.add(dev)
+        db.session.commit()
+        games = [Game(title=f'Tagged {i}', developer_id=dev.id) for i in TAGS]
+        db.session.add_all(games)
+        db.session.commit()
+        tag_index.load({game.id: TAGS[i] for i, game in zip(TAGS, games)})
+
+        yield app.test_client()
+        tag_index.clear()
+        db.session.remove()
+        db.drop_all()
+
+def test_boolean_queries(index):
+    """Test AND, OR and NOT combine as documented, case-insensitively"""
+    assert index.query(all_of=['rpg', 'fantasy']) == [1, 4]
+    assert index.query(any_of=['sci-fi', 'action']) == [2, 3]
+    assert index.query(all_of=['rpg'], none_of=['early-access']) == [1, 2]
+    assert index.query(all_of=['Coop'], any_of=['fantasy', 'sci-fi']) == [1]
+    assert index.query(none_of=['rpg']) == [3]
+    assert index.query(all_of=['missing']) == []
+
+def test_facets_and_paging(index):
+    """Test facets count the whole result while ids are paged in order"""
+    page = index.browse(all_of=['rpg'], page=2, per_page=2)
+    assert page['ids'] == [4]
+    assert page['total'] == 3
+    assert page['facets'] == {'rpg': 3, 'fantasy': 2, 'coop': 1, 'early-access': 1, 'sci-fi': 1}
+
+def test_set_tags_replaces_postings(index):
+    """Test re-tagging a game moves it between posting sets"""
+    index.set_tags(2, ['action'])
+    assert index.query(all_of=['rpg']) == [1, 4]
+    assert index.query(all_of=['action']) == [2, 3]
+    assert index.facets([2]) == {'action': 1}
+
+    index.remove_game(3)
+    assert index.query(all_of=['action']) == [2]
+
+def test_browse_endpoint(client):
+    """Test the browse endpoint returns games, paging and facets"""
+    response = client.get('/api/games/tags?all=rpg&not=early-access&per_page=1')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [g['title'] for g in data['games']] == ['Tagged 1']
+    assert data['total'] == 2
+    assert data['pages'] == 2
+    assert data['facets']['rpg'] == 2
+
+    data = client.get('/api/games/tags?any=action,sci-fi&page=2&per_page=1').get_json()
+    assert [g['title'] for g in data['games']] == ['Tagged 3']
+
+class RacingMetadata:
+    """Stands in for GameMetadata; a save lands while the rebuild is reading"""
+
+    db = object()
+
+    def __init__(self, index):
+        self.index = index
+
+    def all_tags(self):
+        snapshot = dict(TAGS)
+        self.index.set_tags(2, ['action'])
+        self.index.remove_game(4)
+        return snapshot
+
+def test_rebuild_keeps_changes_made_while_reading(index):
+    """Test a save or delete during a rebuild is not undone by the older snapshot"""
+    index.ttl = 0
+    assert index.refresh(RacingMetadata(index), live_ids=lambda: {1, 2, 4})
+
+    assert index.query(all_of=['action']) == [2]
+    # 3 no longer exists in SQL and 4 was removed during the rebuild
+    assert index.query() == [1, 2]
+
+def test_deleted_game_leaves_browse(client):
+    """Test deleting a game takes it out of tag results and facets"""
+    client.post('/auth/login', json={'email_or_username': 'tagdev', 'password': 'DevPass123'})
+    data = client.get('/api/games/tags?all=fantasy').get_json()
+    assert [g['title'] for g in data['games']] == ['Tagged 1', 'Tagged 4']
+
+    game_id = data['games'][0]['id']
+    assert client.delete(f'/api/games/{game_id}').status_code == 200
+
+    data = client.get('/api/games/tags?all=fantasy').get_json()
+    assert [g['title'] for g in data['games']] == ['Tagged 4']
+    assert data['total'] == 1
+    assert data['facets']['fantasy'] == 1
@@ -0,0 +1,109 @@
+import time
+import pytest
+from main import app, db
+from app.models import User
+from app.tokens import tokens
+
+@pytest.fixture
+def client():
+    """Create test client with an admin and a player, without logging in"""
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        admin = User(email='tokadmin@test.com', username='tokadmin', role='admin')
+        admin.set_password('Password123')
+        player = User(email='launcher@test.com', username='launcher')
+        player.set_password('Password123')
+        db.session.add_all([admin, player])
+        db.session.commit()
+
+    yield app.test_client()
+
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+def get_tokens(client, username='launcher'):
+    response = client.post('/auth/token', json={'email_or_username': username, 'password': 'Password123'})
+    assert response.status_code == 200
+    return response.get_json()
+
+def bearer(token):
+    return {'Authorization': f'Bearer {token}'}
+
+def test_bearer_token_authenticates_without_cookie(client):
+    """Test an access token works on its own and a bad one does not"""
+    pair = get_tokens(client)
+    assert pair['token_type'] == 'Bearer'
+    assert 'Set-Cookie' not in client.post('/auth/token', json={
+        'email_or_username': 'launcher', 'password': 'Password123'
+    }).headers
+
+    fresh = app.test_client()
+    response = fresh.get('/auth/profile', headers=bearer(pair['access_token']))
+    assert response.status_code == 200
+    assert response.get_json()['username'] == 'launcher'
+
+    assert fresh.get('/auth/profile', headers=bearer(pair['access_token'] + 'x')).status_code == 401
+    assert fresh.get('/auth/profile', headers=bearer(pair['refresh_token'])).status_code == 401
+
+def test_refresh_issues_new_pair(client):
+    """Test a refresh token trades for working tokens and access tokens cannot refresh"""
+    pair = get_tokens(client)
+
+    response = client.post('/auth/token/refresh', json={'refresh_token': pair['refresh_token']})
+    assert response.status_code == 200
+    new_access = response.get_json()['access_token']
+    assert app.test_client().get('/auth/profile', headers=bearer(new_access)).status_code == 200
+
+    assert client.post('/auth/token/refresh', json={'refresh_token': pair['access_token']}).status_code == 401
+
+def test_refresh_token_is_single_use(client):
+    """Test refreshing rotates the refresh token and replaying an old one revokes the user's tokens"""
+    pair = get_tokens(client)
+
+    rotated = client.post('/auth/token/refresh', json={'refresh_token': pair['refresh_token']}).get_json()
+    assert rotated['refresh_token'] != pair['refresh_token']
+
+    # The first token was already traded in: treat the replay as theft
+    assert client.post('/auth/token/refresh', json={'refresh_token': pair['refresh_token']}).status_code == 401
+    assert app.test_client().get('/auth/profile', headers=bearer(rotated['access_token'])).status_code == 401
+    assert client.post('/auth/token/refresh', json={'refresh_token': rotated['refresh_token']}).status_code == 401
+
+def test_revoke_invalidates_every_token(client):
+    """Test revoking bumps the epoch so old access and refresh tokens stop working"""
+    pair = get_tokens(client)
+    api = app.test_client()
+
+    assert api.post('/auth/token/revoke', headers=bearer(pair['access_token'])).status_code == 200
+    assert api.get('/auth/profile', headers=bearer(pair['access_token'])).status_code == 401
+    assert client.post('/auth/token/refresh', json={'refresh_token': pair['refresh_token']}).status_code == 401
+
+    again = get_tokens(client)
+    assert api.get('/auth/profile', headers=bearer(again['access_token'])).status_code == 200
+
+def test_role_change_revokes_tokens(client):
+    """Test an admin demotion ends the demoted user's token sessions"""
+    with app.app_context():
+        player_id = User.query.filter_by(username='launcher').first().id
+    player = get_tokens(client)
+    admin = get_tokens(client, 'tokadmin')
+
+    api = app.test_client()
+    response = api.put(f'/api/admin/users/{player_id}/role', json={'role': 'developer'},
+                       headers=bearer(admin['access_token']))
+    assert response.status_code == 200
+    assert api.get('/auth/profile', headers=bearer(player['access_token'])).status_code == 401
+
+def test_access_token_expires(client):
+    """Test access tokens are rejected after ACCESS_TOKEN_TTL"""
+    pair = get_tokens(client)
+    ttl = tokens.access_ttl
+    tokens.access_ttl = 0
+    try:
+        time.sleep(1)
+        assert app.test_client().get('/auth/profile', headers=bearer(pair['access_token'])).status_code == 401
+    finally:
+        tokens.access_ttl = ttl
@@ -0,0 +1,114 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from main import app, db
+from app.models import User, Game, Review, ReviewVote
+from app.votes import helpful_votes, find_helpful_drift, AlreadyVoted
+
+@pytest.fixture
+def client():
+    """Create test client with one review and a player who can vote on it"""
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        author = User(email='author@test.com', username='author', password_hash='x')
+        voter = User(email='voter@test.com', username='voter')
+        voter.set_password('Password123')
+        db.session.add_all([author, voter])
+        db.session.commit()
+
+        game = Game(title='Voted Game', developer_id=author.id)
+        db.session.add(game)
+        db.session.commit()
+        db.session.add(Review(game_id=game.id, user_id=author.id, rating=5))
+        db.session.commit()
+
+        yield app.test_client()
+        helpful_votes.buffer.discard()
+        db.session.remove()
+        db.drop_all()
+
+def stored_count(review_id):
+    with app.app_context():
+        return db.session.get(Review, review_id).helpful_count
+
+def test_vote_counts_once_per_user(client):
+    """Test a repeat vote is rejected and the answer includes buffered votes"""
+    with app.app_context():
+        review_id = Review.query.first().id
+
+    client.post('/auth/login', json={'email_or_username': 'voter', 'password': 'Password123'})
+    response = client.post(f'/api/reviews/{review_id}/helpful')
+    assert response.status_code == 200
+    assert response.get_json()['helpful_count'] == 1
+
+    response = client.post(f'/api/reviews/{review_id}/helpful')
+    assert response.status_code == 409
+    assert response.get_json()['helpful_count'] == 1
+
+    with app.app_context():
+        assert ReviewVote.query.count() == 1
+
+    helpful_votes.flush()
+    assert stored_count(review_id) == 1
+
+def test_votes_flush_as_one_update_per_review(client):
+    """Test many votes on a hot review reach the table in one increment"""
+    with app.app_context():
+        review = Review.query.first()
+        review_id = review.id
+        voters = [User(email=f'v{i}@test.com', username=f'v{i}', password_hash='x') for i in range(25)]
+        db.session.add_all(voters)
+        db.session.commit()
+
+        for voter in voters:
+            count = helpful_votes.vote(review, voter.id)
+        assert count == 25
+        with pytest.raises(AlreadyVoted):
+            helpful_votes.vote(review, voters[0].id)
+
+        updates = []
+        engine = db.engine
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('UPDATE reviews'):
+            updates.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        assert helpful_votes.flush() == 1
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    assert len(updates) == 1
+    assert 'helpful_count=(coalesce(reviews.helpful_count' in updates[0]
+    assert stored_count(review_id) == 25
+    assert helpful_votes.buffer.pending(review_id) == {}
+
+def test_check_recounts_drifted_reviews(client):
+    """Test votes check reports a wrong helpful_count and --fix recounts it from review_votes"""
+    with app.app_context():
+        review = Review.query.first()
+        review_id = review.id
+        voter_id = User.query.filter_by(username='voter').first().id
+        db.session.add(ReviewVote(review_id=review_id, user_id=voter_id,
+                                  created_at=datetime.utcnow() - timedelta(minutes=5)))
+        review.helpful_count = 4
+        db.session.commit()
+
+        assert find_helpful_drift() == [(review_id, 4, 1)]
+        # Recent votes may still be sitting in a worker's buffer
+        assert find_helpful_drift(settle_seconds=3600) == []
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['votes', 'check'])
+    assert f'{review_id} (4 stored, 1 votes)' in result.output
+    assert stored_count(review_id) == 4
+
+    result = runner.invoke(args=['votes', 'check', '--fix'])
+    assert 'Recounted helpful votes for 1 reviews' in result.output
+    assert stored_count(review_id) == 1
+    assert 'consistent' in runner.invoke(args=['votes', 'check']).output